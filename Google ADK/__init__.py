@@ -1,6 +1,26 @@
-from . import session_demo_agent
-from . import database_session_agent
-from . import shipping_agent
-from . import currency_agent
-from . import memory_reactive_agent
-from . import memory_proactive_agent
\ No newline at end of file
+import importlib
+
+# Agent packages are imported on first attribute access, so loading one agent
+# does not build every other agent (and its tools, clients and services).
+_AGENT_PACKAGES = (
+    "session_demo_agent",
+    "database_session_agent",
+    "shipping_agent",
+    "currency_agent",
+    "memory_reactive_agent",
+    "memory_proactive_agent",
+)
+
+__all__ = list(_AGENT_PACKAGES)
+
+
+def __getattr__(name):
+    if name in _AGENT_PACKAGES:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_AGENT_PACKAGES))
@@ -0,0 +1,353 @@
+"""Drive every ADK agent through fixed scenarios offline and report where turn time goes.
+
+Each agent plays the same scripted conversations against a model that needs
+no API key or network:
+
+- scripted (default): ScriptedLlm answers with the tool calls a model would
+  make for each message, so every run is identical
+- replay: RecordReplayLlm answers from cassettes recorded earlier
+- record: RecordReplayLlm calls the real model (needs GOOGLE_API_KEY) and
+  writes the cassettes that replay uses
+
+For each agent it reports turns/sec and turn latency, and splits turn time
+into phases: model (time inside the model), tools, session (session service
+calls), memory (memory service calls, including background ingestion, which
+each turn waits for) and framework (everything else: the runner, flows,
+callbacks and plugins). Phases are exclusive: a memory search made by a tool
+counts as memory, not tools. With --allocations, a second pass under
+tracemalloc reports peak and retained bytes per turn.
+
+Usage (from the "Google ADK" directory):
+    python -m adk_extensions.benchmarks.bench_agents --conversations 20
+    python -m adk_extensions.benchmarks.bench_agents --mode record --cassette-dir cassettes
+    python -m adk_extensions.benchmarks.bench_agents --mode replay --cassette-dir cassettes --allocations
+"""
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import functools
+import importlib
+import io
+import json
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+import warnings
+from collections import defaultdict
+
+from google.adk.apps import App
+from google.adk.models import BaseLlm, LlmRequest
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai.types import Content, Part
+
+from adk_extensions.bounded_sessions import BoundedInMemorySessionService
+from adk_extensions.delta_state import DeltaStateDatabaseSessionService
+from adk_extensions.memory_ingest import IncrementalMemoryIngestor
+from adk_extensions.replay_llm import RecordReplayLlm, ScriptedLlm, with_model
+from adk_extensions.sqlite_memory import SqliteMemoryService
+
+USER_ID = "bench_user"
+PHASES = ["model", "tools", "session", "memory", "framework"]
+SESSION_METHODS = ["get_session", "append_event"]  # create_session is per conversation, outside turns
+MEMORY_METHODS = ["search_memory", "add_session_to_memory"]
+
+MEMORY_RULES = [
+    (r"\bremember\b", [("manual_memory_search", {"query": "favourite food"})]),
+    (r"\bsearch the web\b", [("perform_google_search", {"query": "weather today"})]),
+    (r"\bmemory features\b", [("explain_memory_features", {})]),
+]
+MEMORY_MESSAGES = [
+    "Hi, my favourite food is ramen.",
+    "Can you explain your memory features?",
+    "Please search the web for the weather today.",
+    "Do you remember my favourite food?",
+    "Thanks, that's all.",
+]
+
+# Agent package -> rules for ScriptedLlm and the messages of one conversation.
+# Tools that need a gemini-2 code executor (calculation_agent) or an MCP server
+# (get_tiny_image) are left out, so scenarios run anywhere.
+SCENARIOS = {
+    "session_demo_agent": {
+        "rules": [
+            (r"\bexplain sessions\b", [("explain_session_concepts", {})]),
+            (r"\bstoring state\b", [("demonstrate_session_state_management", {"action": "example_set", "key": "user_name", "value": "John"})]),
+            (r"\bsession data\b", [("display_session_data", {})]),
+        ],
+        "messages": ["Hello there!", "Can you explain sessions?", "Show me an example of storing state.", "Show me the session data.", "Thanks, bye."],
+    },
+    "database_session_agent": {
+        "rules": [
+            (r"\bdatabase sessions\b", [("explain_database_session_concepts", {})]),
+            (r"\bcompaction\b", [("show_compaction_status", {})]),
+            (r"\bstored data\b", [("display_database_session_data", {})]),
+        ],
+        "messages": ["Hello there!", "How do database sessions work?", "What is the compaction status?", "Show me the stored data.", "Thanks, bye."],
+    },
+    "shipping_agent": {
+        "rules": [
+            (r"\bcontainers\b", [("coordinate_shipping", {"num_containers": 3})]),
+        ],
+        "messages": ["Hi, I need to ship something.", "Please ship 3 containers to Rotterdam.", "Great, thanks."],
+    },
+    "currency_agent": {
+        "rules": [
+            (r"\bfee\b", [("fees_percentage", {"card_type": "visa"})]),
+            (r"\brate\b", [("get_conversion_rate", {"from_currency": "USD", "to_currency": "EUR"})]),
+        ],
+        "messages": ["Hello!", "What is the fee for a visa card?", "What is the USD to EUR rate?", "Thanks."],
+    },
+    "memory_reactive_agent": {"rules": MEMORY_RULES, "messages": MEMORY_MESSAGES},
+    "memory_proactive_agent": {"rules": MEMORY_RULES, "messages": MEMORY_MESSAGES},
+}
+
+
+class PhaseClock:
+    """Accumulates exclusive time per phase; nested phases pause the outer one."""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self._frame = contextvars.ContextVar("phase_frame", default=None)
+
+    def enter(self, phase: str):
+        parent = self._frame.get()
+        frame = [phase, time.perf_counter(), 0.0, parent]
+        return frame, self._frame.set(frame)
+
+    def exit(self, entered):
+        frame, token = entered
+        phase, start, children, parent = frame
+        elapsed = time.perf_counter() - start
+        self.totals[phase] += elapsed - children
+        if parent is not None:
+            parent[2] += elapsed
+        self._frame.reset(token)
+
+    def wrap(self, obj, method: str, phase: str):
+        """Time every call of an async method of obj (patched on the instance only)."""
+        original = getattr(obj, method)
+
+        @functools.wraps(original)
+        async def timed(*args, **kwargs):
+            entered = self.enter(phase)
+            try:
+                return await original(*args, **kwargs)
+            finally:
+                self.exit(entered)
+
+        setattr(obj, method, timed)
+
+
+class TimedLlm(BaseLlm):
+    """Passes requests to inner, timing only the time spent inside it."""
+
+    model: str = "timed"
+    inner: BaseLlm
+    clock: PhaseClock
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False):
+        responses = self.inner.generate_content_async(llm_request, stream=stream)
+        while True:
+            entered = self.clock.enter("model")
+            try:
+                response = await responses.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                self.clock.exit(entered)
+            yield response
+
+
+class ToolTimer(BasePlugin):
+    """Times tool calls between the before and after tool callbacks."""
+
+    def __init__(self, clock: PhaseClock):
+        super().__init__(name="bench_tool_timer")
+        self.clock = clock
+        self._running = {}
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context):
+        self._running[tool_context.function_call_id] = self.clock.enter("tools")
+
+    async def after_tool_callback(self, *, tool, tool_args, tool_context, result):
+        entered = self._running.pop(tool_context.function_call_id, None)
+        if entered is not None:
+            self.clock.exit(entered)
+
+
+def make_model(mode: str, agent_name: str, scenario: dict, cassette_dir: str):
+    """Model factory for with_model(): one model per LLM agent of the tree."""
+    def factory(original):
+        if mode == "scripted":
+            return ScriptedLlm(rules=scenario["rules"], reply=f"{original.name} done.")
+        return RecordReplayLlm(
+            model=original.canonical_model.model,
+            cassette=os.path.join(cassette_dir, agent_name, f"{original.name}.jsonl"),
+            mode=mode,
+        )
+    return factory
+
+
+def build(agent_name: str, scenario: dict, args, workdir: str, clock: PhaseClock) -> tuple:
+    """Runner for one agent with fresh services; returns (runner, app name, models, cleanup)."""
+    module = importlib.import_module(f"{agent_name}.agent")
+    models = []
+
+    def timed_model(original):
+        model = make_model(args.mode, agent_name, scenario, args.cassette_dir)(original)
+        models.append(model)
+        return TimedLlm(inner=model, clock=clock)
+
+    agent = with_model(module.root_agent, timed_model)
+    plugins = [ToolTimer(clock)]
+    memory_service = None
+    if agent_name == "database_session_agent":
+        session_service = DeltaStateDatabaseSessionService(db_url=f"sqlite:///{os.path.join(workdir, 'sessions.db')}")
+    elif agent_name.startswith("memory_"):
+        session_service = BoundedInMemorySessionService()
+        memory_service = SqliteMemoryService(os.path.join(workdir, "memory_store.db"))
+        plugins.append(IncrementalMemoryIngestor(memory_service))
+    else:
+        session_service = InMemorySessionService()
+
+    for method in SESSION_METHODS:
+        clock.wrap(session_service, method, "session")
+    if memory_service is not None:
+        for method in MEMORY_METHODS:
+            clock.wrap(memory_service, method, "memory")
+
+    app_name = agent_name.replace("_agent", "")
+    runner = Runner(
+        app=App(name=app_name, root_agent=agent, plugins=plugins),
+        session_service=session_service,
+        memory_service=memory_service,
+    )
+
+    async def cleanup():
+        await runner.close()
+        if memory_service is not None:
+            memory_service.close()
+        if isinstance(session_service, BoundedInMemorySessionService):
+            session_service.close()
+        elif isinstance(session_service, DeltaStateDatabaseSessionService):
+            session_service.db_engine.dispose()
+
+    return runner, app_name, models, cleanup
+
+
+async def play(runner: Runner, app_name: str, messages: list, conversations: int, allocations: bool) -> list:
+    """Run the conversations; returns per-turn (seconds, peak bytes, retained bytes)."""
+    ingestors = [plugin for plugin in runner.plugin_manager.plugins if isinstance(plugin, IncrementalMemoryIngestor)]
+    turns = []
+    for _ in range(conversations):
+        session = await runner.session_service.create_session(app_name=app_name, user_id=USER_ID)
+        for message in messages:
+            content = Content(role="user", parts=[Part(text=message)])
+            if allocations:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            async for _ in runner.run_async(user_id=USER_ID, session_id=session.id, new_message=content):
+                pass
+            for ingestor in ingestors:
+                await ingestor.drain()
+            elapsed = time.perf_counter() - start
+            if allocations:
+                current, peak = tracemalloc.get_traced_memory()
+                turns.append((elapsed, peak - before, current - before))
+            else:
+                turns.append((elapsed, 0, 0))
+    return turns
+
+
+async def bench_agent(agent_name: str, args) -> dict:
+    scenario = SCENARIOS[agent_name]
+    result = {"agent": agent_name, "mode": args.mode}
+    for allocations in ([False, True] if args.allocations else [False]):
+        workdir = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        # Tools that look for files relative to the working directory (sessions.db) see this run's files
+        os.chdir(workdir)
+        clock = PhaseClock()
+        try:
+            runner, app_name, models, cleanup = build(agent_name, scenario, args, workdir, clock)
+            if allocations:
+                tracemalloc.start()
+            with contextlib.redirect_stdout(io.StringIO()):  # Tools print DEBUG lines
+                turns = await play(runner, app_name, scenario["messages"], args.conversations, allocations)
+            if allocations:
+                tracemalloc.stop()
+            await cleanup()
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if allocations:
+            result["peak_kib_per_turn"] = round(statistics.mean(t[1] for t in turns) / 1024, 1)
+            result["retained_kib_per_turn"] = round(statistics.mean(t[2] for t in turns) / 1024, 1)
+            continue
+        latencies = sorted(t[0] * 1000 for t in turns)
+        total = sum(latencies) / 1000
+        phases = {phase: clock.totals[phase] for phase in PHASES[:-1]}
+        phases["framework"] = max(total - sum(phases.values()), 0.0)
+        result.update({
+            "turns": len(turns),
+            "turns_per_sec": round(len(turns) / total, 1),
+            "turn_ms_p50": round(statistics.median(latencies), 2),
+            "turn_ms_p99": round(latencies[int(0.99 * (len(latencies) - 1))], 2),
+            "phase_ms_per_turn": {phase: round(seconds * 1000 / len(turns), 3) for phase, seconds in phases.items()},
+            "replay_misses": sum(getattr(model, "misses", 0) for model in models),
+        })
+    return result
+
+
+def report(result: dict):
+    phases = "  ".join(f"{phase} {ms:6.2f}" for phase, ms in result["phase_ms_per_turn"].items())
+    line = (
+        f"  {result['agent']:<24} {result['turns_per_sec']:7.1f} turns/s  "
+        f"p50 {result['turn_ms_p50']:6.2f} ms p99 {result['turn_ms_p99']:6.2f} ms  | ms/turn: {phases}"
+    )
+    if "peak_kib_per_turn" in result:
+        line += f"  | peak {result['peak_kib_per_turn']:7.1f} KiB retained {result['retained_kib_per_turn']:6.1f} KiB"
+    if result["replay_misses"]:
+        line += f"  | {result['replay_misses']} replay misses"
+    print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--conversations", type=int, default=20, help="conversations per agent")
+    parser.add_argument("--mode", choices=["scripted", "replay", "record"], default="scripted")
+    parser.add_argument("--cassette-dir", default="cassettes", help="cassettes for replay and record, one folder per agent")
+    parser.add_argument("--allocations", action="store_true", help="add a tracemalloc pass for bytes per turn")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+    args.cassette_dir = os.path.abspath(args.cassette_dir)
+    if args.mode == "record":
+        # Recording is for capturing cassettes, not for timing: one pass is enough
+        args.conversations, args.allocations = 1, False
+
+    print(f"{len(args.agents)} agents, {args.conversations} conversations each, {args.mode} model")
+    results = []
+    for agent_name in args.agents:
+        result = await bench_agent(agent_name, args)
+        results.append(result)
+        report(result)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.INFO)
+    asyncio.run(main())
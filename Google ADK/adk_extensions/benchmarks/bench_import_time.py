@@ -0,0 +1,81 @@
+"""Measure the cold import time of each ADK agent in a fresh interpreter.
+
+Each measurement runs in a new Python process, so nothing is cached in
+sys.modules. "bundle" loads the "Google ADK" package itself, and
+"bundle.<agent>" loads the package and then one agent through it.
+
+Usage (from the "Google ADK" directory):
+    python -m adk_extensions.benchmarks.bench_import_time --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+AGENTS = [
+    "session_demo_agent",
+    "database_session_agent",
+    "shipping_agent",
+    "currency_agent",
+    "memory_reactive_agent",
+    "memory_proactive_agent",
+]
+
+BUNDLE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The bundle directory name contains a space, so it is loaded from its path
+_PROBE = """
+import importlib, importlib.util, json, sys, time, warnings
+warnings.filterwarnings("ignore")
+sys.path.insert(0, {bundle_dir!r})
+target = {target!r}
+baseline = len(sys.modules)
+start = time.perf_counter()
+if target.startswith("bundle"):
+    spec = importlib.util.spec_from_file_location(
+        "adk_bundle", {init_path!r}, submodule_search_locations=[{bundle_dir!r}]
+    )
+    bundle = importlib.util.module_from_spec(spec)
+    sys.modules["adk_bundle"] = bundle
+    spec.loader.exec_module(bundle)
+    if "." in target:
+        getattr(bundle, target.split(".", 1)[1])
+else:
+    importlib.import_module(target)
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "modules": len(sys.modules) - baseline}}))
+"""
+
+
+def measure(target: str) -> dict:
+    """Import target in a fresh interpreter.
+
+    Args:
+        target (str): Agent package name, "bundle" or "bundle.<agent>"
+
+    Returns:
+        dict: Import time in seconds and number of modules loaded
+    """
+    code = _PROBE.format(bundle_dir=BUNDLE_DIR, init_path=os.path.join(BUNDLE_DIR, "__init__.py"), target=target)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per target")
+    args = parser.parse_args()
+
+    # A bare google.adk import is the floor every agent pays
+    targets = ["google.adk.agents", "bundle"] + AGENTS + ["bundle.session_demo_agent"]
+    print(f"{'target':<32} {'median ms':>10} {'min ms':>10} {'modules':>8}")
+    for target in targets:
+        runs = [measure(target) for _ in range(args.repeat)]
+        seconds = [r["seconds"] for r in runs]
+        print(f"{target:<32} {statistics.median(seconds) * 1000:>10.1f} {min(seconds) * 1000:>10.1f} {runs[-1]['modules']:>8}")
+
+
+if __name__ == "__main__":
+    main()
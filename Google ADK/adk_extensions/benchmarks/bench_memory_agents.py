@@ -0,0 +1,266 @@
+"""Compare reactive and proactive memory loading on scripted conversations.
+
+For each corpus size, a synthetic multi-session memory (Zipf-distributed
+chatter with planted personal facts) is loaded into a memory service, and
+the same scripted conversations are played through memory_reactive_agent
+(the model calls manual_memory_search when a message asks it to remember)
+and memory_proactive_agent (MemoryPreloader injects memories before model
+calls). Both agents run with a stub model, so the numbers cover retrieval
+only:
+
+- recall@k: share of recall turns where the planted fact reached the model
+- retrieval p50/p99: memory service search latency
+- memory tokens/turn: memory text in model requests (preloaded block or
+  manual_memory_search responses), summed over the turn's model calls
+- model calls/turn and memory searches/turn
+- footprint: memory service size after loading the corpus
+
+Everything is generated from --seed, so two runs differ only in timings;
+--json writes the results for comparing retrieval changes.
+
+Usage (from the "Google ADK" directory):
+    python -m adk_extensions.benchmarks.bench_memory_agents --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+from google.adk.memory import BaseMemoryService
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai.types import Content, FunctionCall, Part
+
+from adk_extensions.benchmarks.bench_memory_search import make_sentences, make_vocabulary
+from adk_extensions.bm25_memory import BM25MemoryService
+from adk_extensions.context_assembler import estimate_tokens
+from adk_extensions.memory_preload import MemoryPreloader
+from adk_extensions.sqlite_memory import SqliteMemoryService
+
+APP_NAME = "memory_bench"
+USER_ID = "bench_user"
+BACKENDS = ["sqlite", "bm25", "vector"]
+
+
+class TurnProbe:
+    """What the stub model saw during the current turn."""
+
+    def __init__(self):
+        self.expected = None
+        self.recalled = False
+        self.model_calls = 0
+        self.memory_tokens = 0
+
+
+class ScriptedMemoryLlm(BaseLlm):
+    """Stub model for the memory agents.
+
+    With reactive=True it calls manual_memory_search for any message that
+    asks it to remember something, like a model following the reactive
+    agent's instruction; otherwise it answers at once. It records in probe
+    how much memory text each request carried and whether the expected fact
+    was in it.
+    """
+
+    model: str = "scripted-memory"
+    reactive: bool = False
+    probe: TurnProbe
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False):
+        probe = self.probe
+        probe.model_calls += 1
+        memory_text = []
+        system = str(llm_request.config.system_instruction or "") if llm_request.config else ""
+        if "<PAST_CONVERSATIONS>" in system:
+            memory_text.append(system[system.index("<PAST_CONVERSATIONS>"):system.index("</PAST_CONVERSATIONS>")])
+        for content in llm_request.contents:
+            for part in content.parts or []:
+                if part.function_response and part.function_response.name == "manual_memory_search":
+                    memory_text.append(str(part.function_response.response))
+        memory_text = "\n".join(memory_text)
+        probe.memory_tokens += estimate_tokens(memory_text) if memory_text else 0
+        if probe.expected and probe.expected in memory_text:
+            probe.recalled = True
+
+        last = llm_request.contents[-1]
+        if any(part.function_response for part in last.parts or []):
+            yield LlmResponse(content=Content(role="model", parts=[Part(text="Here is what I found.")]))
+            return
+        text = " ".join(part.text for part in last.parts or [] if part.text)
+        if self.reactive and "remember" in text.lower():
+            call = FunctionCall(name="manual_memory_search", args={"query": text})
+            yield LlmResponse(content=Content(role="model", parts=[Part(function_call=call)]))
+            return
+        yield LlmResponse(content=Content(role="model", parts=[Part(text="ok")]))
+
+
+class TimedMemoryService(BaseMemoryService):
+    """Pass-through memory service that records search latency."""
+
+    def __init__(self, service: BaseMemoryService):
+        self.service = service
+        self.latencies = []
+
+    async def add_session_to_memory(self, session):
+        await self.service.add_session_to_memory(session)
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str):
+        start = time.perf_counter()
+        response = await self.service.search_memory(app_name=app_name, user_id=user_id, query=query)
+        self.latencies.append((time.perf_counter() - start) * 1000)
+        return response
+
+
+def make_corpus(size: int, facts: int, vocabulary: list, rng: random.Random) -> tuple:
+    """Chatter plus planted facts; returns (memory texts, [(question, fact text)])."""
+    rare = vocabulary[20000:]
+    keys = rng.sample(rare, facts)
+    planted = [(key, f"my {key} is {rng.choice(rare)}") for key in keys]
+    memories = make_sentences(size - facts, vocabulary, rng)
+    for _, text in planted:
+        memories.insert(rng.randrange(len(memories) + 1), text)
+    return memories, [(f"Do you remember what my {key} is?", text) for key, text in planted]
+
+
+def make_script(recalls: list, conversations: int, turns: int, recall_share: float, vocabulary: list, rng: random.Random) -> list:
+    """Conversations as lists of (message, expected fact text or None)."""
+    script = []
+    for _ in range(conversations):
+        conversation = []
+        for _ in range(turns):
+            if rng.random() < recall_share:
+                conversation.append(rng.choice(recalls))
+            else:
+                conversation.append((" ".join(rng.choices(vocabulary[:3000], k=8)), None))
+        script.append(conversation)
+    return script
+
+
+def load_backend(name: str, memories: list, workdir: str) -> tuple:
+    """Load memories into a fresh service; returns (service, footprint in bytes)."""
+    if name == "sqlite":
+        service = SqliteMemoryService(os.path.join(workdir, "memory_store.db"))
+        for start in range(0, len(memories), 10000):
+            service.add_memories(APP_NAME, USER_ID, memories[start:start + 10000])
+        service._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return service, service.stats()["db_bytes"]
+    if name == "bm25":
+        tracemalloc.start()
+        service = BM25MemoryService()
+        for text in memories:
+            service.index_text(APP_NAME, USER_ID, text, author="user")
+        footprint = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return service, footprint
+    from adk_extensions.vector_memory import VectorMemoryService
+    service = VectorMemoryService(storage_dir=os.path.join(workdir, "vectors"))
+    for start in range(0, len(memories), 10000):
+        batch = memories[start:start + 10000]
+        service.add_vectors(APP_NAME, USER_ID, service.embedder.embed_batch(batch), [{"text": t, "author": "user"} for t in batch])
+    service.flush()
+    footprint = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(workdir) for f in files)
+    return service, footprint
+
+
+async def play(agent_name: str, service: BaseMemoryService, script: list, top_k: int, drift_threshold: float) -> dict:
+    module = importlib.import_module(f"{agent_name}.agent")
+    probe = TurnProbe()
+    update = {"model": ScriptedMemoryLlm(reactive=agent_name == "memory_reactive_agent", probe=probe)}
+    preloader = None
+    if agent_name == "memory_proactive_agent":
+        # A fresh preloader per run, so its cache and counters start empty
+        preloader = MemoryPreloader(max_tokens=module.memory_preloader.max_tokens, drift_threshold=drift_threshold)
+        update["before_model_callback"] = [module.context_assembler.before_model_callback, preloader.before_model_callback]
+    timed = TimedMemoryService(service)
+    session_service = InMemorySessionService()
+    runner = Runner(
+        agent=module.root_agent.model_copy(update=update),
+        app_name=APP_NAME,
+        session_service=session_service,
+        memory_service=timed,
+    )
+
+    recall_turns = recalled = model_calls = memory_tokens = turns = 0
+    for conversation in script:
+        session = await session_service.create_session(app_name=APP_NAME, user_id=USER_ID)
+        for message, expected in conversation:
+            probe.expected, probe.recalled, probe.model_calls, probe.memory_tokens = expected, False, 0, 0
+            content = Content(role="user", parts=[Part(text=message)])
+            async for _ in runner.run_async(user_id=USER_ID, session_id=session.id, new_message=content):
+                pass
+            turns += 1
+            model_calls += probe.model_calls
+            memory_tokens += probe.memory_tokens
+            if expected:
+                recall_turns += 1
+                recalled += probe.recalled
+
+    latencies = sorted(timed.latencies)
+    return {
+        "agent": agent_name.replace("memory_", "").replace("_agent", ""),
+        f"recall@{top_k}": round(recalled / recall_turns, 3) if recall_turns else None,
+        "retrieval_ms_p50": round(statistics.median(latencies), 3) if latencies else 0.0,
+        "retrieval_ms_p99": round(latencies[int(0.99 * (len(latencies) - 1))], 3) if latencies else 0.0,
+        "searches_per_turn": round(len(latencies) / turns, 3),
+        "memory_tokens_per_turn": round(memory_tokens / turns, 1),
+        "model_calls_per_turn": round(model_calls / turns, 3),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="memories per corpus")
+    parser.add_argument("--backend", choices=BACKENDS, default="sqlite")
+    parser.add_argument("--facts", type=int, default=200, help="planted facts per corpus")
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=10, help="turns per conversation")
+    parser.add_argument("--recall-share", type=float, default=0.3, help="share of turns asking for a planted fact")
+    parser.add_argument("--drift-threshold", type=float, default=0.75, help="MemoryPreloader re-search threshold")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        rng = random.Random(args.seed)
+        vocabulary = make_vocabulary(50000, rng)
+        memories, recalls = make_corpus(size, min(args.facts, size), vocabulary, rng)
+        script = make_script(recalls, args.conversations, args.turns, args.recall_share, vocabulary, rng)
+
+        workdir = tempfile.mkdtemp()
+        service, footprint = load_backend(args.backend, memories, workdir)
+        top_k = service.top_k
+        print(f"{size} memories ({args.backend}, {footprint / 2**20:.1f} MiB), {args.conversations} conversations x {args.turns} turns")
+        for agent_name in ("memory_reactive_agent", "memory_proactive_agent"):
+            result = await play(agent_name, service, script, top_k, args.drift_threshold)
+            result.update({"memories": size, "backend": args.backend, "footprint_bytes": footprint})
+            results.append(result)
+            print(
+                f"  {result['agent']:<9} recall@{top_k} {result[f'recall@{top_k}']:.3f}  "
+                f"retrieval p50 {result['retrieval_ms_p50']:7.3f} ms p99 {result['retrieval_ms_p99']:7.3f} ms  "
+                f"searches/turn {result['searches_per_turn']:.2f}  memory tokens/turn {result['memory_tokens_per_turn']:6.1f}  "
+                f"model calls/turn {result['model_calls_per_turn']:.2f}"
+            )
+        if hasattr(service, "close"):
+            service.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+"""Measure how MinHash/LSH consolidation shrinks a memory store and its search results.
+
+Each user restates a set of personal facts across many sessions, worded a
+little differently each time ("I'm vegetarian", "btw i am vegetarian!"),
+mixed with one-off chatter. The benchmark stores the corpus in a
+SqliteMemoryService, runs MemoryConsolidator over it, and reports store size
+and how many top-k search hits are near-duplicates of a better-ranked hit,
+before and after.
+
+Usage (from the "Google ADK" directory):
+    python -m adk_extensions.benchmarks.bench_memory_consolidation --memories 200000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from adk_extensions.benchmarks.bench_memory_search import APP_NAME, make_sentences, make_vocabulary
+from adk_extensions.memory_consolidation import MemoryConsolidator, jaccard, shingles
+from adk_extensions.sqlite_memory import SqliteMemoryService
+
+TEMPLATES = [
+    "I'm {0} and I don't eat {1}",
+    "my {0} is called {1}",
+    "I live in {0} near the {1}",
+    "I work as a {0} at {1}",
+    "please remember that I prefer {0} over {1}",
+]
+FILLERS = ["", "btw ", "as I said, ", "just so you know ", "again, "]
+REWRITES = [("I'm", "I am"), ("don't", "do not"), ("I am", "I'm")]
+
+
+def restate(fact: str, rng: random.Random) -> str:
+    for old, new in REWRITES:
+        if old in fact and rng.random() < 0.5:
+            fact = fact.replace(old, new)
+    text = rng.choice(FILLERS) + fact + rng.choice(["", ".", "!", " :)"])
+    return text.lower() if rng.random() < 0.3 else text
+
+
+def redundancy(store: SqliteMemoryService, queries: list, threshold: float) -> float:
+    """Fraction of top-k hits that are near-duplicates of a better-ranked hit."""
+    redundant = total = 0
+    for user_id, query in queries:
+        kept = []
+        for _, _, text in store.search(APP_NAME, user_id, query):
+            hashes = shingles(text)
+            if any(jaccard(hashes, other) >= threshold for other in kept):
+                redundant += 1
+            kept.append(hashes)
+            total += 1
+    return redundant / total if total else 0.0
+
+
+def lsh_bytes(db_path: str) -> int:
+    """Bytes used by the LSH table, or 0 where SQLite was built without the dbstat table."""
+    try:
+        with sqlite3.connect(db_path) as db:
+            return db.execute("SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name = 'memory_lsh'").fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--memories", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--facts", type=int, default=100, help="distinct facts per user")
+    parser.add_argument("--repeat-share", type=float, default=0.4, help="share of memories that restate a fact")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    vocabulary = make_vocabulary(50000, rng)
+    users = [f"user_{n}" for n in range(args.users)]
+    facts = {
+        user_id: [rng.choice(TEMPLATES).format(rng.choice(vocabulary[:5000]), rng.choice(vocabulary[:5000])) for _ in range(args.facts)]
+        for user_id in users
+    }
+    chatter = iter(make_sentences(args.memories, vocabulary, rng))
+    per_user = args.memories // args.users
+
+    db_path = os.path.join(tempfile.mkdtemp(), "memory_store.db")
+    store = SqliteMemoryService(db_path)
+    for user_id in users:
+        memories = [
+            restate(rng.choice(facts[user_id]), rng) if rng.random() < args.repeat_share else next(chatter)
+            for _ in range(per_user)
+        ]
+        store.add_memories(APP_NAME, user_id, memories)
+    # Queries ask about a stored fact, by its two content words
+    queries = []
+    for _ in range(args.queries):
+        user_id = rng.choice(users)
+        fact = rng.choice(facts[user_id])
+        queries.append((user_id, " ".join(word for word in fact.split() if word in vocabulary[:5000])))
+
+    consolidator = MemoryConsolidator(store)
+    store._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    before = store.stats()
+    before_redundancy = redundancy(store, queries, consolidator.threshold)
+    start = time.perf_counter()
+    await consolidator.consolidate_all()
+    elapsed = time.perf_counter() - start
+    store._writer.execute("VACUUM")
+    store._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    after = store.stats()
+    after_redundancy = redundancy(store, queries, consolidator.threshold)
+
+    print(f"{before['memories']} memories over {args.users} users, {args.repeat_share:.0%} restating {args.facts} facts each")
+    print(f"  consolidation: {elapsed:.1f}s ({before['memories'] / elapsed:,.0f} memories/s), merged {consolidator.merged}")
+    print(f"  memories:      {before['memories']:>9} -> {after['memories']:>9} (occurrences kept: {after['occurrences']})")
+    lsh = lsh_bytes(db_path)
+    print(f"  database size: {before['db_bytes'] / 2**20:8.1f} MiB -> {after['db_bytes'] / 2**20:8.1f} MiB after VACUUM")
+    print(f"    memories and FTS index: {before['db_bytes'] / 2**20:8.1f} MiB -> {(after['db_bytes'] - lsh) / 2**20:8.1f} MiB, LSH table {lsh / 2**20:.1f} MiB")
+    print(f"  redundant top-{store.top_k} hits: {before_redundancy:.1%} -> {after_redundancy:.1%}")
+    consolidator.close()
+    store.close()
+    os.remove(db_path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""Measure how long a memory-backed agent takes to come back after a restart.
+
+An in-process memory service has to re-index the whole corpus (replaying
+every session) before its first search. SqliteMemoryService keeps the index
+on disk, so a restart is opening the file and answering the first query.
+The corpus is the same Zipf-distributed text as bench_memory_search, spread
+over several users.
+
+Usage (from the "Google ADK" directory):
+    python -m adk_extensions.benchmarks.bench_memory_restart --memories 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from adk_extensions.benchmarks.bench_memory_search import APP_NAME, make_sentences, make_vocabulary, time_searches
+from adk_extensions.bm25_memory import BM25MemoryService
+from adk_extensions.sqlite_memory import SqliteMemoryService
+
+USER_ID = "bench_user"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--memories", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=10, help="users the memories are spread over")
+    parser.add_argument("--batch", type=int, default=10000, help="memories per bulk insert")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    vocabulary = make_vocabulary(50000, rng)
+    sentences = make_sentences(args.memories, vocabulary, rng)
+    users = [USER_ID] + [f"user_{n}" for n in range(1, args.users)]
+    queries = [f"{rng.choice(vocabulary[:200])} {rng.choice(vocabulary[200:5000])} {rng.choice(vocabulary[5000:])}" for _ in range(args.queries)]
+    db_path = os.path.join(tempfile.mkdtemp(), "memory_store.db")
+
+    store = SqliteMemoryService(db_path)
+    start = time.perf_counter()
+    for offset in range(0, args.memories, args.batch):
+        store.add_memories(APP_NAME, users[(offset // args.batch) % len(users)], sentences[offset:offset + args.batch])
+    ingest = time.perf_counter() - start
+    store.close()
+    size = os.path.getsize(db_path)
+    print(f"{args.memories} memories over {args.users} users")
+    print(f"  SqliteMemoryService bulk ingest: {ingest:.1f}s ({args.memories / ingest:,.0f} memories/s), {size / 2**20:.0f} MiB on disk")
+
+    # Restart: replay the corpus into an in-process index before the first search
+    start = time.perf_counter()
+    bm25 = BM25MemoryService()
+    for offset in range(0, args.memories, args.batch):
+        user_id = users[(offset // args.batch) % len(users)]
+        for text in sentences[offset:offset + args.batch]:
+            bm25.index_text(APP_NAME, user_id, text, author="user")
+    await bm25.search_memory(app_name=APP_NAME, user_id=USER_ID, query=queries[0])
+    print(f"  restart with replay (BM25MemoryService): {(time.perf_counter() - start) * 1000:10.1f} ms to first result")
+    del bm25
+
+    start = time.perf_counter()
+    store = SqliteMemoryService(db_path)
+    await store.search_memory(app_name=APP_NAME, user_id=USER_ID, query=queries[0])
+    print(f"  restart from disk (SqliteMemoryService): {(time.perf_counter() - start) * 1000:10.1f} ms to first result")
+
+    median, p99, hits = await time_searches(store, queries)
+    print(f"  SqliteMemoryService search: median {median:.3f} ms, p99 {p99:.3f} ms, top {hits:.0f} ranked hits/query")
+    store.close()
+    os.remove(db_path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""Compare memory search latency of InMemoryMemoryService and BM25MemoryService.
+
+Memories are synthetic sentences over a Zipf-distributed vocabulary, so a few
+words are very common and most are rare, like real conversation text. The
+linear-scan service is measured on a smaller corpus because it scans every
+stored event on each search.
+
+Usage (from the "Google ADK" directory):
+    python -m adk_extensions.benchmarks.bench_memory_search --memories 1000000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from google.adk.events import Event
+from google.adk.memory import InMemoryMemoryService
+from google.adk.sessions import Session
+from google.genai.types import Content, Part
+
+from adk_extensions.bm25_memory import BM25MemoryService
+
+APP_NAME = "bench_app"
+USER_ID = "bench_user"
+
+
+def make_vocabulary(size: int, rng: random.Random) -> list:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+
+def make_sentences(count: int, vocabulary: list, rng: random.Random) -> list:
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    words = rng.choices(vocabulary, weights=weights, k=count * 12)
+    return [" ".join(words[i * 12:(i + 1) * 12]) for i in range(count)]
+
+
+def make_session(sentences: list) -> Session:
+    events = [
+        Event(author="user", invocation_id="bench", content=Content(role="user", parts=[Part(text=text)]))
+        for text in sentences
+    ]
+    return Session(app_name=APP_NAME, user_id=USER_ID, id="bench_session", events=events)
+
+
+async def time_searches(service, queries: list) -> tuple:
+    """Run every query once and return (median ms, p99 ms, average hits)."""
+    latencies, hits = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        response = await service.search_memory(app_name=APP_NAME, user_id=USER_ID, query=query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(response.memories)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(0.99 * (len(latencies) - 1))], hits / len(queries)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--memories", type=int, default=1000000, help="memories indexed by BM25MemoryService")
+    parser.add_argument("--linear-memories", type=int, default=20000, help="memories stored in InMemoryMemoryService")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    vocabulary = make_vocabulary(50000, rng)
+    # Queries mix one frequent word with rarer ones, like "coffee order last tuesday"
+    queries = [f"{rng.choice(vocabulary[:200])} {rng.choice(vocabulary[200:5000])} {rng.choice(vocabulary[5000:])}" for _ in range(args.queries)]
+
+    linear_sentences = make_sentences(args.linear_memories, vocabulary, rng)
+    linear = InMemoryMemoryService()
+    bm25_small = BM25MemoryService()
+    session = make_session(linear_sentences)
+    await linear.add_session_to_memory(session)
+    await bm25_small.add_session_to_memory(session)
+
+    print(f"{args.linear_memories} memories:")
+    median, p99, hits = await time_searches(linear, queries)
+    print(f"  InMemoryMemoryService: median {median:8.3f} ms, p99 {p99:8.3f} ms, {hits:.0f} unranked hits/query")
+    median, p99, hits = await time_searches(bm25_small, queries)
+    print(f"  BM25MemoryService:     median {median:8.3f} ms, p99 {p99:8.3f} ms, top {hits:.0f} ranked hits/query")
+
+    bm25 = BM25MemoryService()
+    start = time.perf_counter()
+    for text in make_sentences(args.memories, vocabulary, rng):
+        bm25.index_text(APP_NAME, USER_ID, text, author="user")
+    build = time.perf_counter() - start
+    stats = bm25.stats()
+    print(f"{args.memories} memories (indexed in {build:.1f}s, {stats['postings']} postings):")
+    median, p99, hits = await time_searches(bm25, queries)
+    print(f"  BM25MemoryService:     median {median:8.3f} ms, p99 {p99:8.3f} ms, top {hits:.0f} ranked hits/query")
+    # Rare-term lookups, the common case for recalling a specific fact
+    rare = [f"{rng.choice(vocabulary[5000:])} {rng.choice(vocabulary[5000:])}" for _ in range(args.queries)]
+    median, p99, hits = await time_searches(bm25, rare)
+    print(f"  BM25MemoryService (rare terms): median {median:8.3f} ms, p99 {p99:8.3f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
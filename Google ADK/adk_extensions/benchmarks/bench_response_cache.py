@@ -0,0 +1,179 @@
+"""Measure what ModelResponseCache saves on repeated currency and shipping conversations.
+
+Each agent plays the same conversations against a ScriptedLlm that takes
+--model-latency seconds per call, in four passes:
+
+- no cache: every model call is made
+- cold: an empty cache, which fills as the conversations repeat
+- warm: the same cache, with the messages in different case and spacing
+- restart: a new cache opened on the same SQLite file, as after a restart
+
+It reports turn latency, model calls, hit rate and model time saved, and
+counts the side-effecting tool calls (coordinate_shipping, including a large
+order that needs approval), which must be the same in every pass.
+
+Usage (from the "Google ADK" directory):
+    python -m adk_extensions.benchmarks.bench_response_cache --conversations 10 --model-latency 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import importlib
+import io
+import logging
+import os
+import statistics
+import tempfile
+import time
+import warnings
+from collections import Counter
+
+from google.adk.apps import App
+from google.adk.models import LlmRequest
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai.types import Content, Part
+
+from adk_extensions.replay_llm import ScriptedLlm, with_model
+from adk_extensions.response_cache import ModelResponseCache
+
+USER_ID = "bench_user"
+# Cache counters reported per pass rather than since the cache was opened
+PASS_COUNTS = ["lookups", "hits", "disk_hits", "misses", "bypassed", "stores", "saved_ms"]
+
+# Agent package -> ScriptedLlm rules, messages of one conversation, side-effecting tools
+SCENARIOS = {
+    "currency_agent": {
+        "rules": [
+            (r"\bconvert\b", [("fees_percentage", {"card_type": "visa"}), ("get_conversion_rate", {"from_currency": "USD", "to_currency": "EUR"})]),
+            (r"\bfee\b", [("fees_percentage", {"card_type": "mastercard"})]),
+        ],
+        "messages": ["Hello!", "Convert 100 USD to EUR with visa", "What is the fee for a mastercard?", "Thanks."],
+        "side_effect_tools": [],
+    },
+    "shipping_agent": {
+        "rules": [
+            (r"\b3\s+containers\b", [("coordinate_shipping", {"num_containers": 3})]),
+            (r"\b8\s+containers\b", [("coordinate_shipping", {"num_containers": 8})]),
+        ],
+        "messages": ["Hi, I need to ship something.", "Please ship 3 containers to Rotterdam.", "Please ship 8 containers to Hamburg.", "Great, thanks."],
+        "side_effect_tools": ["coordinate_shipping"],
+    },
+}
+
+
+class CountingLlm(ScriptedLlm):
+    calls: int = 0
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False):
+        self.calls += 1
+        async for response in super().generate_content_async(llm_request, stream=stream):
+            yield response
+
+
+class ToolCounter(BasePlugin):
+    def __init__(self):
+        super().__init__(name="bench_tool_counter")
+        self.calls = Counter()
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context):
+        self.calls[tool.name] += 1
+
+
+def vary(message: str) -> str:
+    """The same message as another user might type it."""
+    return "  " + message.upper().replace(" ", "   ") + " "
+
+
+async def run_pass(agent_name: str, args, cache, messages: list) -> dict:
+    scenario = SCENARIOS[agent_name]
+    module = importlib.import_module(f"{agent_name}.agent")
+    models = []
+
+    def make_model(original):
+        model = CountingLlm(rules=scenario["rules"], reply=f"{original.name} done.", latency=args.model_latency)
+        models.append(model)
+        return model
+
+    agent = with_model(module.root_agent, make_model)
+    if cache is not None:
+        cache.attach(agent)
+    tools = ToolCounter()
+    runner = Runner(
+        app=App(name=agent_name.replace("_agent", ""), root_agent=agent, plugins=[tools]),
+        session_service=InMemorySessionService(),
+    )
+    before = cache.stats() if cache is not None else None
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):  # Tools print DEBUG lines
+        for _ in range(args.conversations):
+            session = await runner.session_service.create_session(app_name=runner.app_name, user_id=USER_ID)
+            for message in messages:
+                start = time.perf_counter()
+                async for _ in runner.run_async(
+                    user_id=USER_ID, session_id=session.id, new_message=Content(role="user", parts=[Part(text=message)])
+                ):
+                    pass
+                latencies.append((time.perf_counter() - start) * 1000)
+    await runner.close()
+    if cache is not None:
+        stats = cache.stats()
+        stats.update({name: stats[name] - before[name] for name in PASS_COUNTS})
+        cacheable = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / cacheable, 3) if cacheable else 0.0
+    side_effects = sum(tools.calls[name] for name in scenario["side_effect_tools"])
+    return {
+        "turn_ms_p50": round(statistics.median(latencies), 1),
+        "turn_ms_mean": round(statistics.mean(latencies), 1),
+        "model_calls": sum(model.calls for model in models),
+        "side_effect_calls": side_effects,
+        "cache": stats if cache is not None else None,
+    }
+
+
+def report(label: str, result: dict):
+    line = (
+        f"  {label:<9} turn p50 {result['turn_ms_p50']:7.1f} ms mean {result['turn_ms_mean']:7.1f} ms, "
+        f"model calls {result['model_calls']:4}, side-effecting tool calls {result['side_effect_calls']:3}"
+    )
+    stats = result["cache"]
+    if stats:
+        line += (
+            f"  | hit rate {stats['hit_rate']:.0%} ({stats['hits']} hits, {stats['disk_hits']} from disk), "
+            f"{stats['bypassed']} bypassed, saved {stats['saved_ms'] / 1000:.1f}s"
+        )
+    print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--conversations", type=int, default=10, help="repetitions of each conversation per pass")
+    parser.add_argument("--model-latency", type=float, default=0.2, help="seconds per model call")
+    args = parser.parse_args()
+
+    print(f"{args.conversations} conversations per pass, {args.model_latency * 1000:.0f} ms per model call")
+    with tempfile.TemporaryDirectory() as workdir:
+        for agent_name in args.agents:
+            scenario = SCENARIOS[agent_name]
+            path = os.path.join(workdir, f"{agent_name}.db")
+            print(agent_name)
+            report("no cache", await run_pass(agent_name, args, None, scenario["messages"]))
+
+            def new_cache():
+                return ModelResponseCache(path=path, side_effect_tools=scenario["side_effect_tools"])
+
+            cache = new_cache()
+            report("cold", await run_pass(agent_name, args, cache, scenario["messages"]))
+            report("warm", await run_pass(agent_name, args, cache, [vary(m) for m in scenario["messages"]]))
+            cache.close()
+            cache = new_cache()
+            report("restart", await run_pass(agent_name, args, cache, scenario["messages"]))
+            cache.close()
+
+
+if __name__ == "__main__":
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""Load one ADK agent with many concurrent conversations through AgentHost.
+
+The agent's model is replaced by a stub that answers after a fixed delay, so
+the numbers measure the serving path (scheduling, session service, runner)
+rather than a remote model.
+
+Usage (from the "Google ADK" directory):
+    python -m adk_extensions.benchmarks.bench_serving_host --agent session_demo_agent --users 2000 --turns 3
+"""
+import argparse
+import asyncio
+import importlib
+import logging
+import time
+import warnings
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai.types import Content, Part
+
+from adk_extensions.serving_host import AgentHost
+
+AGENTS = [
+    "session_demo_agent",
+    "database_session_agent",
+    "shipping_agent",
+    "currency_agent",
+    "memory_reactive_agent",
+    "memory_proactive_agent",
+]
+
+
+class DelayedEchoLlm(BaseLlm):
+    """Stub model that replies with a short text after a fixed delay."""
+
+    model: str = "delayed-echo"
+    delay: float = 0.05
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False):
+        await asyncio.sleep(self.delay)
+        yield LlmResponse(content=Content(role="model", parts=[Part(text=f"ok ({len(llm_request.contents)} contents)")]))
+
+
+async def _conversation(host: AgentHost, user_id: str, turns: int):
+    session_id = None
+    for n in range(turns):
+        if session_id is None:
+            session_id = await host.ensure_session(user_id)
+        await host.submit(user_id, f"message {n} from {user_id}", session_id=session_id)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agent", choices=AGENTS, default="session_demo_agent")
+    parser.add_argument("--users", type=int, default=2000, help="concurrent conversations")
+    parser.add_argument("--turns", type=int, default=3, help="turns per conversation")
+    parser.add_argument("--workers", type=int, default=256, help="concurrent turns")
+    parser.add_argument("--model-delay", type=float, default=0.05, help="stub model latency in seconds")
+    args = parser.parse_args()
+
+    module = importlib.import_module(f"{args.agent}.agent")
+    agent = module.root_agent.model_copy(update={"model": DelayedEchoLlm(delay=args.model_delay)})
+    runner = Runner(agent=agent, session_service=InMemorySessionService(), app_name=args.agent)
+
+    start = time.perf_counter()
+    async with AgentHost(runner, max_workers=args.workers) as host:
+        await asyncio.gather(*(_conversation(host, f"user_{n}", args.turns) for n in range(args.users)))
+        stats = host.stats()
+    elapsed = time.perf_counter() - start
+
+    total = args.users * args.turns
+    print(f"{args.agent}: {total} turns from {args.users} concurrent conversations, {args.workers} workers")
+    print(f"  wall time: {elapsed:.2f}s, throughput: {total / elapsed:.1f} turns/sec")
+    print(f"  turn latency p50: {stats['latency_ms_p50']} ms, p99: {stats['latency_ms_p99']} ms, failed: {stats['failed']}")
+    # Upper bound if the model were the only cost
+    print(f"  model-bound ceiling: {args.workers / args.model_delay:.1f} turns/sec")
+
+
+if __name__ == "__main__":
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""Measure VectorMemoryService search latency and IVF recall at scale.
+
+Vectors are drawn around random cluster centres (like embeddings of related
+conversations) and written through add_vectors(), so the benchmark measures
+search rather than text embedding. Recall@k compares the IVF results with
+the exact dot-product results for the same queries.
+
+Usage (from the "Google ADK" directory):
+    python -m adk_extensions.benchmarks.bench_vector_memory --vectors 1000000
+"""
+import argparse
+import statistics
+import time
+
+import numpy
+
+from adk_extensions.vector_memory import VectorMemoryService
+
+APP_NAME = "bench_app"
+USER_ID = "bench_user"
+
+
+def clustered_vectors(count: int, dim: int, clusters: int, rng) -> numpy.ndarray:
+    centres = rng.standard_normal((clusters, dim)).astype(numpy.float32)
+    vectors = numpy.empty((count, dim), dtype=numpy.float32)
+    for start in range(0, count, 100000):
+        end = min(start + 100000, count)
+        block = centres[rng.integers(0, clusters, end - start)] + 0.6 * rng.standard_normal((end - start, dim)).astype(numpy.float32)
+        vectors[start:end] = block / numpy.linalg.norm(block, axis=1, keepdims=True)
+    return vectors
+
+
+def timed_search(store, queries, top_k, nprobe) -> tuple:
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = store.search(query, top_k, nprobe)
+        results.append({store.meta[row]["id"] for _, row in hits})
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(0.99 * (len(latencies) - 1))], results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32], help="IVF lists scanned per query")
+    args = parser.parse_args()
+
+    rng = numpy.random.default_rng(0)
+    service = VectorMemoryService()
+    dim = service.embedder.dim
+    vectors = clustered_vectors(args.vectors, dim, clusters=max(1, args.vectors // 500), rng=rng)
+    # Rows are reordered when the IVF index is built, so results are compared by metadata id
+    service.add_vectors(APP_NAME, USER_ID, vectors, [{"text": "", "id": n} for n in range(args.vectors)])
+    store = service._user(APP_NAME, USER_ID)
+
+    noisy = vectors[rng.integers(0, args.vectors, args.queries)] + 0.3 * rng.standard_normal((args.queries, dim)).astype(numpy.float32)
+    queries = noisy / numpy.linalg.norm(noisy, axis=1, keepdims=True)
+    del vectors
+
+    median, p99, exact = timed_search(store, queries, args.top_k, nprobe=0)
+    print(f"{args.vectors} vectors x {dim} dims, top {args.top_k}, single thread")
+    print(f"  exact dot product: median {median:7.2f} ms, p99 {p99:7.2f} ms")
+
+    start = time.perf_counter()
+    service.ivf_threshold = 0
+    service.build_index(APP_NAME, USER_ID)
+    print(f"  IVF build: {time.perf_counter() - start:.1f}s, {len(store.ivf.centroids)} lists")
+    for nprobe in args.nprobe:
+        median, p99, approx = timed_search(store, queries, args.top_k, nprobe=nprobe)
+        recall = sum(len(a & e) for a, e in zip(approx, exact)) / sum(len(e) for e in exact)
+        print(f"  IVF (nprobe={nprobe}): median {median:7.2f} ms, p99 {p99:7.2f} ms, recall@{args.top_k} {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Measure how many external search calls CachedSearch makes for many concurrent users.
+
+Users issue queries drawn from a Zipf distribution over a fixed set of
+distinct queries (a few, like "weather today", are asked by everyone), in
+varying case and punctuation. The same load is run directly against the
+provider and through CachedSearch.
+
+Usage (from the "Google ADK" directory):
+    python -m adk_extensions.benchmarks.bench_web_search --users 2000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from adk_extensions.web_search import CachedSearch, LocalSearchProvider
+
+
+def make_queries(users: int, per_user: int, distinct: int, rng: random.Random) -> list:
+    topics = [f"topic {n} news" for n in range(distinct)]
+    topics[:3] = ["weather today", "stock market news", "football scores"]
+    weights = [1.0 / (rank + 1) for rank in range(distinct)]
+    variants = [str, str.upper, lambda q: q.capitalize() + "?", lambda q: f"  {q}!! "]
+    return [
+        [rng.choice(variants)(topic) for topic in rng.choices(topics, weights=weights, k=per_user)]
+        for _ in range(users)
+    ]
+
+
+async def run_users(search, queries: list, think_time: float, rng: random.Random) -> list:
+    latencies = []
+
+    async def user(user_queries):
+        for query in user_queries:
+            await asyncio.sleep(rng.random() * think_time)
+            start = time.perf_counter()
+            await search(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(user(q) for q in queries))
+    return sorted(latencies)
+
+
+def report(label: str, latencies: list, calls: int, wall: float):
+    print(
+        f"  {label:<13} provider calls {calls:>6}, wall {wall:5.1f}s, "
+        f"latency median {statistics.median(latencies):7.1f} ms, p99 {latencies[int(0.99 * (len(latencies) - 1))]:7.1f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--queries-per-user", type=int, default=5)
+    parser.add_argument("--distinct", type=int, default=200, help="distinct queries")
+    parser.add_argument("--think-time", type=float, default=2.0, help="max seconds between a user's queries")
+    parser.add_argument("--latency", type=float, default=0.2, help="provider latency in seconds")
+    parser.add_argument("--rate", type=float, default=50.0, help="provider calls per second allowed by CachedSearch")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    queries = make_queries(args.users, args.queries_per_user, args.distinct, rng)
+    total = args.users * args.queries_per_user
+    print(f"{args.users} concurrent users, {total} searches over {args.distinct} distinct queries, provider latency {args.latency * 1000:.0f} ms")
+
+    provider = LocalSearchProvider(latency=args.latency)
+    start = time.perf_counter()
+    latencies = await run_users(provider.search, queries, args.think_time, random.Random(5))
+    report("direct", latencies, provider.calls, time.perf_counter() - start)
+
+    provider = LocalSearchProvider(latency=args.latency)
+    cached = CachedSearch(provider, rate=args.rate, burst=int(args.rate))
+    start = time.perf_counter()
+    latencies = await run_users(cached.search, queries, args.think_time, random.Random(5))
+    report("CachedSearch", latencies, provider.calls, time.perf_counter() - start)
+    print(f"  {cached.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,266 @@
+import heapq
+import logging
+import math
+import re
+import threading
+from array import array
+from datetime import datetime
+from typing import Optional
+
+from google.adk.memory import BaseMemoryService
+from google.adk.memory.base_memory_service import SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.adk.sessions import Session
+from google.genai.types import Content, Part
+
+try:
+    import numpy
+except ImportError:  # numpy only speeds up scoring of long posting lists
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Too common to discriminate between memories; dropping them keeps posting lists short
+STOPWORDS = frozenset(
+    "a an and are as at be but by can did do does for from had has have he her his how i if in into is it its "
+    "me my no not of on or our she so than that the their them then there these they this to was we were what "
+    "when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list:
+    """Lowercase text and split it into index terms, without stopwords."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class _Partition:
+    """Inverted index over the memories of one (app, user)."""
+
+    def __init__(self):
+        self.texts = []
+        self.meta = []  # (session_id, author, timestamp)
+        self.lengths = array("I")
+        self.total_length = 0
+        self.postings = {}  # term -> (array of doc ids, array of term frequencies)
+        self.indexed_events = {}  # session_id -> ids of events already indexed
+
+    def add(self, text: str, session_id: str, author: Optional[str], timestamp: Optional[str]) -> bool:
+        terms = tokenize(text)
+        if not terms:
+            return False
+        doc_id = len(self.texts)
+        self.texts.append(text)
+        self.meta.append((session_id, author, timestamp))
+        self.lengths.append(len(terms))
+        self.total_length += len(terms)
+
+        counts = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        for term, tf in counts.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = (array("I"), array("I"))
+            posting[0].append(doc_id)
+            posting[1].append(tf)
+        return True
+
+
+class BM25MemoryService(BaseMemoryService):
+    """Memory service backed by an incremental BM25 inverted index.
+
+    InMemoryMemoryService answers every search by re-tokenizing every stored
+    event of the user and returns all events sharing any word with the query,
+    unranked. Here each event is tokenized once, when it is added, into
+    per-user posting lists. A search only reads the postings of the query
+    terms and returns the top_k memories by BM25 score, so its cost follows
+    the rarity of the query terms rather than the size of the memory.
+
+    Memories are partitioned by (app_name, user_id): one user's searches
+    never touch another user's index. add_session_to_memory() only indexes
+    events that were not indexed for that session before, so it can be
+    called after every turn.
+    """
+
+    # add_session_to_memory() adds to, rather than replaces, what a session stored before
+    incremental_add = True
+
+    def __init__(self, top_k: int = 10, k1: float = 1.2, b: float = 0.75):
+        self.top_k = top_k
+        self.k1 = k1
+        self.b = b
+        self._partitions = {}
+        self._lock = threading.Lock()
+
+    def _partition(self, app_name: str, user_id: str) -> _Partition:
+        key = (app_name, user_id)
+        partition = self._partitions.get(key)
+        if partition is None:
+            partition = self._partitions[key] = _Partition()
+        return partition
+
+    async def add_session_to_memory(self, session: Session):
+        added = 0
+        with self._lock:
+            partition = self._partition(session.app_name, session.user_id)
+            indexed = partition.indexed_events.setdefault(session.id, set())
+            for event in session.events:
+                if event.id in indexed or not event.content or not event.content.parts:
+                    continue
+                indexed.add(event.id)
+                text = " ".join(part.text for part in event.content.parts if part.text)
+                timestamp = datetime.fromtimestamp(event.timestamp).isoformat()
+                if partition.add(text, session.id, event.author, timestamp):
+                    added += 1
+        logger.info(f"BM25_MEMORY: indexed {added} new events from session {session.id}")
+
+    def index_text(
+        self,
+        app_name: str,
+        user_id: str,
+        text: str,
+        *,
+        session_id: str = "",
+        author: Optional[str] = None,
+        timestamp: Optional[str] = None,
+    ) -> bool:
+        """Index one memory directly, without building a Session (bulk loading).
+
+        Args:
+            app_name (str): Application the memory belongs to
+            user_id (str): User the memory belongs to
+            text (str): Memory text
+            session_id (str): Originating session, if any
+            author (str): Author of the memory
+            timestamp (str): ISO 8601 time of the memory
+
+        Returns:
+            bool: False if the text has no indexable terms
+        """
+        with self._lock:
+            return self._partition(app_name, user_id).add(text, session_id, author, timestamp)
+
+    def search(self, app_name: str, user_id: str, query: str, top_k: Optional[int] = None) -> list:
+        """Rank the user's memories against query.
+
+        Args:
+            app_name (str): Application to search
+            user_id (str): User whose memories are searched
+            query (str): Free-text query
+            top_k (int): Number of results, defaults to the service's top_k
+
+        Returns:
+            list: (score, doc_id) pairs, best first
+        """
+        top_k = top_k or self.top_k
+        with self._lock:
+            partition = self._partitions.get((app_name, user_id))
+            if partition is None or not partition.texts:
+                return []
+            terms = [t for t in set(tokenize(query)) if t in partition.postings]
+            if not terms:
+                return []
+            if numpy is not None:
+                return self._score_numpy(partition, terms, top_k)
+            return self._score_python(partition, terms, top_k)
+
+    def _idf(self, partition: _Partition, term: str) -> float:
+        n = len(partition.texts)
+        df = len(partition.postings[term][0])
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def _score_python(self, partition: _Partition, terms: list, top_k: int) -> list:
+        k1, b = self.k1, self.b
+        norm = k1 * (1 - b)
+        norm_per_length = k1 * b * len(partition.texts) / partition.total_length
+        lengths = partition.lengths
+        scores = {}
+        for term in terms:
+            idf = self._idf(partition, term)
+            doc_ids, tfs = partition.postings[term]
+            for doc_id, tf in zip(doc_ids, tfs):
+                weight = idf * tf * (k1 + 1) / (tf + norm + norm_per_length * lengths[doc_id])
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        return heapq.nlargest(top_k, ((score, doc_id) for doc_id, score in scores.items()))
+
+    def _score_numpy(self, partition: _Partition, terms: list, top_k: int) -> list:
+        k1, b = self.k1, self.b
+        norm = k1 * (1 - b)
+        norm_per_length = k1 * b * len(partition.texts) / partition.total_length
+        lengths = numpy.frombuffer(partition.lengths, dtype=numpy.uint32)
+
+        def weights(term, positions=None):
+            doc_ids, tfs = partition.postings[term]
+            ids = numpy.frombuffer(doc_ids, dtype=numpy.uint32)
+            tf = numpy.frombuffer(tfs, dtype=numpy.uint32)
+            if positions is not None:
+                ids, tf = ids[positions], tf[positions]
+            tf = tf.astype(numpy.float32)
+            return ids, idfs[term] * tf * (k1 + 1) / (tf + norm + norm_per_length * lengths[ids])
+
+        # MaxScore: score rare terms first. Once the k-th best score beats the
+        # most the remaining (common) terms could add, documents that only
+        # contain common terms cannot reach the top k, so those terms are only
+        # looked up for the existing candidates instead of being scanned.
+        idfs = {term: self._idf(partition, term) for term in terms}
+        terms = sorted(terms, key=idfs.get, reverse=True)
+        remaining = sum(idfs[term] * (k1 + 1) for term in terms)
+        ids = scores = None
+        for position, term in enumerate(terms):
+            remaining -= idfs[term] * (k1 + 1)
+            term_ids, term_weights = weights(term)
+            if ids is None:
+                ids, scores = term_ids, term_weights
+            else:
+                ids, inverse = numpy.unique(numpy.concatenate([ids, term_ids]), return_inverse=True)
+                scores = numpy.bincount(inverse, weights=numpy.concatenate([scores, term_weights]))
+            if position + 1 == len(terms) or len(scores) < top_k:
+                continue
+            if numpy.partition(scores, -top_k)[-top_k] >= remaining:
+                scores = scores.astype(numpy.float64)
+                for rest in terms[position + 1:]:
+                    # Posting lists are sorted by doc id, so membership is a binary search
+                    posting = numpy.frombuffer(partition.postings[rest][0], dtype=numpy.uint32)
+                    found = numpy.minimum(numpy.searchsorted(posting, ids), len(posting) - 1)
+                    match = posting[found] == ids
+                    scores[match] += weights(rest, found[match])[1]
+                break
+
+        if len(scores) > top_k:
+            best = numpy.argpartition(scores, -top_k)[-top_k:]
+        else:
+            best = numpy.arange(len(scores))
+        best = best[numpy.argsort(-scores[best])]
+        return [(float(scores[i]), int(ids[i])) for i in best]
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        hits = self.search(app_name, user_id, query)
+        partition = self._partitions.get((app_name, user_id))
+        response = SearchMemoryResponse()
+        for _, doc_id in hits:
+            _, author, timestamp = partition.meta[doc_id]
+            response.memories.append(
+                MemoryEntry(
+                    content=Content(role="user" if author == "user" else "model", parts=[Part(text=partition.texts[doc_id])]),
+                    author=author,
+                    timestamp=timestamp,
+                )
+            )
+        return response
+
+    def stats(self) -> dict:
+        """Report index size.
+
+        Returns:
+            dict: Number of partitions, memories, distinct terms and postings
+        """
+        with self._lock:
+            partitions = list(self._partitions.values())
+            return {
+                "partitions": len(partitions),
+                "memories": sum(len(p.texts) for p in partitions),
+                "terms": sum(len(p.postings) for p in partitions),
+                "postings": sum(len(ids) for p in partitions for ids, _ in p.postings.values()),
+            }
@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+import zlib
+from collections import OrderedDict, deque
+from typing import Any, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+logger = logging.getLogger(__name__)
+
+SPILL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spilled_sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    last_update_time REAL NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+)
+"""
+
+
+def approximate_size(model) -> int:
+    """Approximate the resident size of a session or event by its JSON length."""
+    return len(model.model_dump_json(exclude_none=True))
+
+
+class BoundedInMemorySessionService(InMemorySessionService):
+    """InMemorySessionService that keeps its resident size under a cap.
+
+    The service tracks an approximate byte size per session (the JSON size of
+    its events and state). When the total goes over max_resident_bytes, the
+    least recently used sessions are compressed into a local SQLite spill
+    file and dropped from RAM. Any access to a spilled session (get, append,
+    list, delete) transparently loads it back.
+
+    App and user state stay resident; they are shared by all sessions of an
+    app or user and are small compared to event histories.
+    """
+
+    def __init__(self, max_resident_bytes: int = 64 * 1024 * 1024, spill_path: Optional[str] = None):
+        super().__init__()
+        self.max_resident_bytes = max_resident_bytes
+        if spill_path is None:
+            spill_path = os.path.join(tempfile.gettempdir(), f"adk_session_spill_{os.getpid()}.db")
+        self.spill_path = spill_path
+        self._spill = sqlite3.connect(spill_path)
+        self._spill.execute("PRAGMA journal_mode=WAL")
+        self._spill.execute("PRAGMA synchronous=OFF")  # The spill file is a cache of this process' RAM
+        self._spill.execute(SPILL_SCHEMA)
+
+        self._lru = OrderedDict()
+        self.resident_bytes = 0
+        self.evictions = 0
+        self.reloads = 0
+        self._reload_latencies = deque(maxlen=1024)
+
+    # --- size accounting ---
+
+    def _touch(self, key: tuple, added_bytes: int = 0):
+        self._lru[key] = self._lru.get(key, 0) + added_bytes
+        self._lru.move_to_end(key)
+        self.resident_bytes += added_bytes
+        self._evict(protect=key)
+
+    def _evict(self, protect: tuple):
+        while self.resident_bytes > self.max_resident_bytes and len(self._lru) > 1:
+            key = next(iter(self._lru))
+            if key == protect:
+                self._lru.move_to_end(key)
+                key = next(iter(self._lru))
+            self._spill_session(key)
+
+    def _spill_session(self, key: tuple):
+        app_name, user_id, session_id = key
+        session = self.sessions[app_name][user_id].pop(session_id)
+        payload = zlib.compress(session.model_dump_json(exclude_none=True).encode(), 1)
+        self._spill.execute(
+            "INSERT OR REPLACE INTO spilled_sessions VALUES (?, ?, ?, ?, ?, ?)",
+            (app_name, user_id, session_id, json.dumps(session.state, default=str), session.last_update_time, payload),
+        )
+        self._spill.commit()
+        self.resident_bytes -= self._lru.pop(key)
+        self.evictions += 1
+
+    def _reload(self, app_name: str, user_id: str, session_id: str) -> bool:
+        """Load a spilled session back into RAM. Returns False if it is not spilled."""
+        start = time.perf_counter()
+        row = self._spill.execute(
+            "SELECT payload FROM spilled_sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+            (app_name, user_id, session_id),
+        ).fetchone()
+        if row is None:
+            return False
+        session = Session.model_validate_json(zlib.decompress(row[0]))
+        self._spill.execute(
+            "DELETE FROM spilled_sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+            (app_name, user_id, session_id),
+        )
+        self._spill.commit()
+        self.sessions.setdefault(app_name, {}).setdefault(user_id, {})[session_id] = session
+        self.reloads += 1
+        self._reload_latencies.append(time.perf_counter() - start)
+        self._touch((app_name, user_id, session_id), approximate_size(session))
+        return True
+
+    def _ensure_resident(self, app_name: str, user_id: str, session_id: str) -> bool:
+        key = (app_name, user_id, session_id)
+        if key in self._lru:
+            self._touch(key)
+            return True
+        return self._reload(app_name, user_id, session_id)
+
+    # --- session service API ---
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        if session_id:
+            # Let the base class detect a clash with a spilled session
+            self._ensure_resident(app_name, user_id, session_id.strip())
+        session = await super().create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+        self._touch((app_name, user_id, session.id), approximate_size(self.sessions[app_name][user_id][session.id]))
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        if not self._ensure_resident(app_name, user_id, session_id):
+            return None
+        return await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        response = await super().list_sessions(app_name=app_name, user_id=user_id)
+        # Spilled sessions are listed from their stored metadata, without reloading their events
+        query = "SELECT user_id, id, state, last_update_time FROM spilled_sessions WHERE app_name = ?"
+        params = [app_name]
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        for spilled_user_id, session_id, state, last_update_time in self._spill.execute(query, params):
+            session = Session(
+                app_name=app_name,
+                user_id=spilled_user_id,
+                id=session_id,
+                state=json.loads(state),
+                last_update_time=last_update_time,
+            )
+            response.sessions.append(self._merge_state(app_name, spilled_user_id, session))
+        return response
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        self._spill.execute(
+            "DELETE FROM spilled_sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+            (app_name, user_id, session_id),
+        )
+        self._spill.commit()
+        if key in self._lru:
+            self.resident_bytes -= self._lru.pop(key)
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        self._ensure_resident(session.app_name, session.user_id, session.id)
+        event = await super().append_event(session=session, event=event)
+        self._touch((session.app_name, session.user_id, session.id), approximate_size(event))
+        return event
+
+    # --- metrics ---
+
+    def metrics(self) -> dict:
+        """Report resident size, eviction count and reload latency.
+
+        Returns:
+            dict: Memory and spill statistics of the service
+        """
+        latencies = sorted(self._reload_latencies)
+        spilled = self._spill.execute("SELECT COUNT(*) FROM spilled_sessions").fetchone()[0]
+        return {
+            "resident_bytes": self.resident_bytes,
+            "max_resident_bytes": self.max_resident_bytes,
+            "resident_sessions": len(self._lru),
+            "spilled_sessions": spilled,
+            "evictions": self.evictions,
+            "reloads": self.reloads,
+            "reload_ms_p50": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+            "reload_ms_max": latencies[-1] * 1000 if latencies else 0.0,
+        }
+
+    def close(self):
+        """Close and remove the spill file."""
+        self._spill.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.spill_path + suffix):
+                os.remove(self.spill_path + suffix)
@@ -0,0 +1,285 @@
+import json
+import logging
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.events import Event
+from google.adk.models import LlmRequest
+from google.genai.types import Content, Part
+
+logger = logging.getLogger(__name__)
+
+# ADK never sends these framework-internal function calls back to the model
+INTERNAL_FUNCTION_NAMES = ("adk_request_confirmation", "adk_request_credential")
+
+# Kinds of ledger entries
+NORMAL = 0
+PINNED = 1
+SUMMARY = 2
+SKIPPED = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a piece of text.
+
+    Uses the common ~4 characters per token rule of thumb, which tracks
+    Gemini tokenization far better than counting whitespace-separated words.
+
+    Args:
+        text (str): The text to measure
+
+    Returns:
+        int: Approximate number of tokens
+    """
+    if not text:
+        return 0
+    return (len(text) + 3) // 4
+
+
+def count_content_tokens(content: Optional[Content]) -> int:
+    """Estimate the token count of a Content, including function calls and responses.
+
+    Args:
+        content (Optional[Content]): The content to measure
+
+    Returns:
+        int: Approximate number of tokens
+    """
+    if not content or not content.parts:
+        return 0
+    total = 0
+    for part in content.parts:
+        if part.text:
+            total += estimate_tokens(part.text)
+        elif part.function_call:
+            total += estimate_tokens(part.function_call.name or "")
+            total += estimate_tokens(json.dumps(part.function_call.args or {}, default=str))
+        elif part.function_response:
+            total += estimate_tokens(part.function_response.name or "")
+            total += estimate_tokens(json.dumps(part.function_response.response or {}, default=str))
+    return total
+
+
+def _function_names(content: Optional[Content]) -> list:
+    if not content or not content.parts:
+        return []
+    names = []
+    for part in content.parts:
+        if part.function_call:
+            names.append(part.function_call.name)
+        elif part.function_response:
+            names.append(part.function_response.name)
+    return names
+
+
+def is_pinned_event(event: Event) -> bool:
+    """Default pin rule: tool confirmations and user profile updates.
+
+    Args:
+        event (Event): A session event
+
+    Returns:
+        bool: True if the event must always be sent to the model
+    """
+    if event.actions:
+        if event.actions.requested_tool_confirmations:
+            return True
+        if any(key.startswith("user:") for key in event.actions.state_delta or {}):
+            return True
+    # The user's answer to a confirmation request
+    return "adk_request_confirmation" in _function_names(event.content) and event.author == "user"
+
+
+def _as_text_content(event: Event) -> Content:
+    """Render an event as plain text so it can be sent out of call/response order."""
+    lines = []
+    for part in event.content.parts:
+        if part.text:
+            lines.append(part.text)
+        elif part.function_call:
+            lines.append(f"[called {part.function_call.name}({json.dumps(part.function_call.args or {}, default=str)})]")
+        elif part.function_response:
+            lines.append(f"[{part.function_response.name} returned {json.dumps(part.function_response.response or {}, default=str)}]")
+    if event.actions and event.actions.state_delta:
+        profile = {k: v for k, v in event.actions.state_delta.items() if k.startswith("user:")}
+        if profile:
+            lines.append(f"[user profile: {json.dumps(profile, default=str)}]")
+    return Content(role=event.content.role or "user", parts=[Part(text="\n".join(lines))])
+
+
+class _SessionLedger:
+    """Token counts and classification for every event of one session, in event order."""
+
+    def __init__(self):
+        self.counted = 0
+        self.tokens = []
+        self.kinds = []
+        self.pinned = []
+        self.summaries = []
+        self.covered_until = float("-inf")
+
+
+class ContextAssembler:
+    """Assemble the history sent to the model under a fixed token budget.
+
+    Each event's token count is computed once, the first time the assembler
+    sees it after it was written to the session, and cached in a per-session
+    ledger. Every turn the assembler walks back from the newest event and
+    stops as soon as the budget is spent, so selection costs O(k) in the
+    number of events sent rather than in the length of the conversation.
+
+    Pinned events (tool confirmations, user profile updates) are always
+    included and their tokens are reserved first. Compaction summaries stand
+    in for the raw events they cover.
+
+    Ledgers of the max_sessions most recently used sessions are kept; an
+    evicted session is simply recounted the next time it is seen.
+
+    Use it on an agent created with include_contents="none" so ADK only adds
+    the current turn and the assembler supplies the history:
+
+        assembler = ContextAssembler(target_tokens=1000)
+        Agent(..., include_contents="none",
+              before_model_callback=assembler.before_model_callback)
+    """
+
+    def __init__(self, target_tokens: int = 1000, pin: Callable[[Event], bool] = is_pinned_event, max_sessions: int = 1000):
+        self.target_tokens = target_tokens
+        self.pin = pin
+        self.max_sessions = max_sessions
+        self._ledgers = OrderedDict()
+
+    def _ledger(self, session_id: str, events: list) -> _SessionLedger:
+        ledger = self._ledgers.get(session_id)
+        if ledger is None or ledger.counted > len(events):
+            ledger = self._ledgers[session_id] = _SessionLedger()
+        self._ledgers.move_to_end(session_id)
+        while len(self._ledgers) > self.max_sessions:
+            self._ledgers.popitem(last=False)
+
+        # Count only the events appended since the previous turn
+        for index in range(ledger.counted, len(events)):
+            event = events[index]
+            compaction = event.actions.compaction if event.actions else None
+            if compaction:
+                tokens = count_content_tokens(compaction.compacted_content)
+                kind = SUMMARY
+                ledger.summaries.append(index)
+                ledger.covered_until = max(ledger.covered_until, compaction.end_timestamp)
+            elif event.partial or not event.content or not event.content.parts:
+                tokens, kind = 0, SKIPPED
+            elif self.pin(event):
+                tokens = count_content_tokens(_as_text_content(event))
+                kind = PINNED
+                ledger.pinned.append(index)
+            elif any(name in INTERNAL_FUNCTION_NAMES for name in _function_names(event.content)):
+                tokens, kind = 0, SKIPPED
+            else:
+                tokens, kind = count_content_tokens(event.content), NORMAL
+            ledger.tokens.append(tokens)
+            ledger.kinds.append(kind)
+        ledger.counted = len(events)
+        return ledger
+
+    def select(self, session_id: str, events: list, current_invocation_id: Optional[str] = None) -> list:
+        """Select the history events to send this turn.
+
+        Args:
+            session_id (str): Session the events belong to
+            events (list): All events of the session, oldest first
+            current_invocation_id (Optional[str]): Events of this invocation are
+                left out because ADK already sends the current turn
+
+        Returns:
+            list: (index, kind) pairs in chronological order
+        """
+        ledger = self._ledger(session_id, events)
+        budget = self.target_tokens
+
+        # Pinned events are reserved first, newest first if they do not all fit
+        pinned = []
+        for index in reversed(ledger.pinned):
+            if events[index].invocation_id == current_invocation_id:
+                continue
+            if ledger.tokens[index] > budget:
+                break
+            budget -= ledger.tokens[index]
+            pinned.append(index)
+
+        # Newest raw events not yet covered by a compaction summary
+        window = []
+        index = len(events) - 1
+        while index >= 0:
+            event = events[index]
+            kind = ledger.kinds[index]
+            if event.invocation_id == current_invocation_id or kind in (SKIPPED, PINNED, SUMMARY):
+                index -= 1
+                continue
+            if event.timestamp <= ledger.covered_until or ledger.tokens[index] > budget:
+                break
+            budget -= ledger.tokens[index]
+            window.append(index)
+            index -= 1
+
+        # A window must not open with a function response whose call was dropped
+        while window and events[window[-1]].get_function_responses():
+            budget += ledger.tokens[window.pop()]
+
+        # Older history is represented by summaries, newest first
+        summaries = []
+        if index >= 0:
+            for summary_index in reversed(ledger.summaries):
+                if ledger.tokens[summary_index] > budget:
+                    break
+                budget -= ledger.tokens[summary_index]
+                summaries.append(summary_index)
+
+        selected = [(i, PINNED) for i in pinned] + [(i, NORMAL) for i in window] + [(i, SUMMARY) for i in summaries]
+        selected.sort(key=lambda item: events[item[0]].timestamp)
+        return selected
+
+    def build_contents(self, session_id: str, events: list, current_invocation_id: Optional[str] = None) -> list:
+        """Build the history contents to prepend to the current turn.
+
+        Args:
+            session_id (str): Session the events belong to
+            events (list): All events of the session, oldest first
+            current_invocation_id (Optional[str]): Invocation of the current turn
+
+        Returns:
+            list: Content objects that fit in target_tokens
+        """
+        contents = []
+        for index, kind in self.select(session_id, events, current_invocation_id):
+            event = events[index]
+            if kind == SUMMARY:
+                contents.append(event.actions.compaction.compacted_content)
+            elif kind == PINNED:
+                contents.append(_as_text_content(event))
+            else:
+                contents.append(event.content)
+        return contents
+
+    def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest):
+        """Prepend the budgeted history to the model request.
+
+        Args:
+            callback_context (CallbackContext): Context of the current invocation
+            llm_request (LlmRequest): The request about to be sent to the model
+
+        Returns:
+            None: The request is always forwarded to the model
+        """
+        session = callback_context.session
+        history = self.build_contents(session.id, session.events, callback_context.invocation_id)
+        llm_request.contents = history + llm_request.contents
+        logger.info(
+            f"CONTEXT_ASSEMBLER: {len(history)} history contents, "
+            f"~{sum(count_content_tokens(c) for c in history)}/{self.target_tokens} tokens"
+        )
+        return None
+
+    def forget(self, session_id: str):
+        """Drop the cached ledger of a session (e.g. after it is deleted)."""
+        self._ledgers.pop(session_id, None)
@@ -0,0 +1,197 @@
+import json
+import logging
+from typing import Optional
+
+from google.adk.sessions import Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.database_session_service import StorageAppState, StorageSession, StorageUserState
+from google.adk.sessions.state import State
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table, Text
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+
+from adk_extensions.session_tiering import TieredDatabaseSessionService
+
+logger = logging.getLogger(__name__)
+
+delta_metadata = MetaData()
+
+# Append-only log of state changes. The scope of a row is encoded in which
+# key columns are filled: app state has user_id = session_id = "", user
+# state has session_id = "", session state has all three.
+state_deltas = Table(
+    "state_deltas",
+    delta_metadata,
+    Column("seq", Integer, primary_key=True, autoincrement=True),
+    Column("app_name", String(128), nullable=False),
+    Column("user_id", String(128), nullable=False, default=""),
+    Column("session_id", String(128), nullable=False, default=""),
+    Column("delta", Text, nullable=False),
+    Index("ix_state_deltas_scope", "app_name", "user_id", "session_id", "seq"),
+)
+
+# Scope tuples: (app_name, user_id, session_id)
+APP_SCOPE = "app"
+USER_SCOPE = "user"
+SESSION_SCOPE = "session"
+
+
+def _scope_key(scope: str, session: Session) -> tuple:
+    if scope == APP_SCOPE:
+        return (session.app_name, "", "")
+    if scope == USER_SCOPE:
+        return (session.app_name, session.user_id, "")
+    return (session.app_name, session.user_id, session.id)
+
+
+def _scope_filter(key: tuple):
+    return and_(
+        state_deltas.c.app_name == key[0],
+        state_deltas.c.user_id == key[1],
+        state_deltas.c.session_id == key[2],
+    )
+
+
+class DeltaStateDatabaseSessionService(TieredDatabaseSessionService):
+    """Session service that stores state changes as per-key deltas.
+
+    The stock service rewrites the whole JSON of sessions.state,
+    user_states.state and app_states.state on every change. Here those
+    columns only hold a snapshot; each event appends its changed keys to
+    state_deltas, so the bytes written per turn follow the size of the change
+    rather than the size of the state.
+
+    Reads rebuild the state lazily as snapshot + deltas in sequence order.
+    Once a scope has collected fold_threshold deltas they are folded into its
+    snapshot and removed, which bounds both read cost and log size.
+    """
+
+    def __init__(self, db_url: str, fold_threshold: int = 32, **kwargs):
+        super().__init__(db_url, **kwargs)
+        delta_metadata.create_all(self.db_engine)
+        self.fold_threshold = fold_threshold
+        self.delta_bytes = 0
+        self.folds = 0
+        self._delta_counts = {}
+
+    def _store_state_deltas(self, sql_session, session: Session, storage_session: StorageSession, deltas: dict):
+        rows = []
+        for scope in (APP_SCOPE, USER_SCOPE, SESSION_SCOPE):
+            if not deltas[scope]:
+                continue
+            key = _scope_key(scope, session)
+            delta = json.dumps(deltas[scope], separators=(",", ":"), default=str)
+            rows.append({"app_name": key[0], "user_id": key[1], "session_id": key[2], "delta": delta})
+            self.delta_bytes += len(delta)
+
+            count = self._delta_counts.get(key)
+            if count is None:
+                count = sql_session.scalar(select(func.count()).where(_scope_filter(key)))
+            self._delta_counts[key] = count + 1
+        if rows:
+            sql_session.execute(insert(state_deltas), rows)
+            # The sessions row itself is not rewritten, so bump update_time as the stock
+            # service does: stale-session checks and idle tracking depend on it
+            storage_session.update_time = func.now()
+
+        # Fold scopes whose log has grown past the threshold
+        for scope in (APP_SCOPE, USER_SCOPE, SESSION_SCOPE):
+            key = _scope_key(scope, session)
+            if deltas[scope] and self._delta_counts.get(key, 0) >= self.fold_threshold:
+                self._fold(sql_session, scope, key)
+
+    def _fold(self, sql_session, scope: str, key: tuple):
+        """Merge the logged deltas of one scope into its snapshot and drop them."""
+        pending = sql_session.scalars(
+            select(state_deltas.c.delta).where(_scope_filter(key)).order_by(state_deltas.c.seq)
+        ).all()
+        self._delta_counts[key] = 0
+        if not pending:
+            return
+
+        merged = {}
+        for delta in pending:
+            merged.update(json.loads(delta))
+
+        app_name, user_id, session_id = key
+        if scope == APP_SCOPE:
+            table, where = StorageAppState, StorageAppState.app_name == app_name
+        elif scope == USER_SCOPE:
+            table, where = StorageUserState, and_(StorageUserState.app_name == app_name, StorageUserState.user_id == user_id)
+        else:
+            table, where = StorageSession, and_(
+                StorageSession.app_name == app_name, StorageSession.user_id == user_id, StorageSession.id == session_id
+            )
+        snapshot = sql_session.scalar(select(table.state).where(where)) or {}
+        # Folding is not a state change, so update_time is kept: the append that logged
+        # the deltas already bumped it, and a fold before archiving must not count as activity
+        sql_session.execute(
+            update(table).where(where).values(state=dict(snapshot) | merged, update_time=table.update_time)
+        )
+        sql_session.execute(delete(state_deltas).where(_scope_filter(key)))
+        self.folds += 1
+
+    def _pending_deltas(self, app_name: str, user_id: Optional[str], session_ids: Optional[list] = None) -> list:
+        """Load unfolded deltas for an app, optionally narrowed to one user and some sessions."""
+        scopes = [and_(state_deltas.c.user_id == "", state_deltas.c.session_id == "")]
+        if user_id is None:
+            scopes.append(state_deltas.c.user_id != "")
+        else:
+            scopes.append(and_(state_deltas.c.user_id == user_id, state_deltas.c.session_id == ""))
+            if session_ids:
+                scopes.append(and_(state_deltas.c.user_id == user_id, state_deltas.c.session_id.in_(session_ids)))
+        with self.database_session_factory() as sql_session:
+            return sql_session.execute(
+                select(state_deltas.c.user_id, state_deltas.c.session_id, state_deltas.c.delta)
+                .where(state_deltas.c.app_name == app_name, or_(*scopes))
+                .order_by(state_deltas.c.seq)
+            ).all()
+
+    @staticmethod
+    def _overlay(session: Session, rows: list):
+        """Apply logged deltas, oldest first, on top of the merged snapshot state."""
+        for user_id, session_id, delta in rows:
+            values = json.loads(delta)
+            if not user_id:
+                session.state.update({State.APP_PREFIX + k: v for k, v in values.items()})
+            elif user_id != session.user_id:
+                continue
+            elif not session_id:
+                session.state.update({State.USER_PREFIX + k: v for k, v in values.items()})
+            elif session_id == session.id:
+                session.state.update(values)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        session = await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+        if session is not None:
+            self._overlay(session, self._pending_deltas(app_name, user_id, [session_id]))
+        return session
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        response = await super().list_sessions(app_name=app_name, user_id=user_id)
+        if response.sessions:
+            rows = self._pending_deltas(app_name, user_id, [s.id for s in response.sessions])
+            for session in response.sessions:
+                self._overlay(session, rows)
+        return response
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        with self.database_session_factory() as sql_session:
+            sql_session.execute(delete(state_deltas).where(_scope_filter(key)))
+            sql_session.commit()
+        self._delta_counts.pop(key, None)
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    def _archive_session(self, key: tuple, cutoff) -> bool:
+        # The archive stores the snapshot column, so fold the session's log into it first
+        with self.database_session_factory() as sql_session:
+            self._fold(sql_session, SESSION_SCOPE, key)
+            sql_session.commit()
+        return super()._archive_session(key, cutoff)
@@ -0,0 +1,295 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+
+from adk_extensions.sqlite_memory import SqliteMemoryService, partition_key
+
+try:
+    import numpy
+except ImportError:  # numpy only speeds up signature computation
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+MASK64 = (1 << 64) - 1
+
+LSH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memory_lsh (
+    bucket INTEGER NOT NULL,
+    memory_id INTEGER NOT NULL,
+    PRIMARY KEY (bucket, memory_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS memory_lsh_params (
+    bands INTEGER NOT NULL,
+    band_rows INTEGER NOT NULL,
+    key_bytes INTEGER NOT NULL
+);
+"""
+
+# Bucket keys are 24-bit, which SQLite stores in 3 bytes; a collision only adds a candidate that fails the Jaccard check
+BUCKET_BYTES = 3
+
+# Provenance kept per canonical memory; older sources are only reflected in seen_count
+MAX_SOURCES = 20
+
+
+def shingles(text: str, size: int = 4) -> set:
+    """Hashed character n-grams of the normalized text (lowercase words, single spaces)."""
+    normalized = " ".join(WORD_PATTERN.findall(text.lower()))
+    if len(normalized) <= size:
+        return {zlib.crc32(normalized.encode())} if normalized else set()
+    return {zlib.crc32(normalized[i:i + size].encode()) for i in range(len(normalized) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """MinHash signatures over shingle hashes, using multiply-shift hash functions.
+
+    Two texts agree on each signature position with probability equal to the
+    Jaccard similarity of their shingle sets. The numpy and pure-Python paths
+    compute identical signatures.
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.a = [rng.getrandbits(64) | 1 for _ in range(num_perm)]
+        self.b = [rng.getrandbits(64) for _ in range(num_perm)]
+        if numpy is not None:
+            self._a = numpy.array(self.a, dtype=numpy.uint64)[:, None]
+            self._b = numpy.array(self.b, dtype=numpy.uint64)[:, None]
+
+    def signature(self, hashes: set) -> tuple:
+        if not hashes:
+            return ()
+        if numpy is not None:
+            values = numpy.fromiter(hashes, dtype=numpy.uint64, count=len(hashes))
+            # uint64 arithmetic wraps, which is the mod 2**64 the scheme needs
+            return tuple(((self._a * values + self._b) >> numpy.uint64(32)).min(axis=1).tolist())
+        return tuple(min(((a * h + b) & MASK64) >> 32 for h in hashes) for a, b in zip(self.a, self.b))
+
+
+class MemoryConsolidator:
+    """Background pass that merges near-duplicate memories of a SqliteMemoryService.
+
+    Chat memories repeat themselves ("I'm vegetarian" in every other
+    session). Each memory that has not been consolidated yet gets a MinHash
+    signature, split into LSH bands; memories sharing a band bucket (within
+    the same app and user) are candidates, and a candidate whose exact
+    shingle Jaccard similarity reaches threshold is a near-duplicate. The
+    newer memory is then deleted and folded into the older, canonical one:
+    its seen_count grows and its sources record where the duplicate came
+    from (session, event, timestamp).
+
+    Work is incremental: a pass only looks at memories stored since the last
+    one (consolidated = 0), and only canonical memories are kept in the LSH
+    table, one row per band. With the default 5 bands of 2 rows, a pair
+    becomes a candidate with probability 0.89 at 0.6 similarity and 0.97 at
+    0.7. Changing the bands or rows drops the stored buckets and examines
+    every memory again, since buckets of different parameters never match.
+
+    Delete a user through delete_user() here, so their buckets go too.
+
+    Usage:
+        consolidator = MemoryConsolidator(memory_service)
+        task = asyncio.create_task(consolidator.run_loop(interval=30))
+    """
+
+    def __init__(self, store: SqliteMemoryService, threshold: float = 0.6, bands: int = 5, rows: int = 2, batch: int = 2000):
+        self.store = store
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.batch = batch
+        self.hasher = MinHasher(num_perm=bands * rows)
+
+        # Own connection: passes run in a worker thread and WAL lets them run beside the store's writes
+        self._db = sqlite3.connect(store.db_path, check_same_thread=False, timeout=30)
+        self._db.executescript(LSH_SCHEMA)
+        params = (bands, rows, BUCKET_BYTES)
+        stored = self._db.execute("SELECT bands, band_rows, key_bytes FROM memory_lsh_params").fetchone()
+        if stored != params:
+            with self._db:
+                if stored is not None or self._db.execute("SELECT 1 FROM memory_lsh LIMIT 1").fetchone():
+                    self._db.execute("DELETE FROM memory_lsh")
+                    self._db.execute("UPDATE memories SET consolidated = 0")
+                self._db.execute("DELETE FROM memory_lsh_params")
+                self._db.execute("INSERT INTO memory_lsh_params VALUES (?, ?, ?)", params)
+        self._lock = threading.Lock()
+
+        self.processed = 0
+        self.merged = 0
+        self.passes = 0
+        self.pass_seconds = 0.0
+
+    def _buckets(self, partition: str, signature: tuple) -> list:
+        buckets = []
+        for band in range(self.bands):
+            values = array("Q", signature[band * self.rows:(band + 1) * self.rows])
+            digest = hashlib.blake2b(f"{partition}:{band}:".encode() + values.tobytes(), digest_size=BUCKET_BYTES).digest()
+            buckets.append(int.from_bytes(digest, "little", signed=True))
+        return buckets
+
+    def _find_duplicate(self, partition: str, hashes: set, buckets: list, known: dict):
+        placeholders = ",".join("?" * len(buckets))
+        # CROSS JOIN keeps SQLite from scanning the user's memories via the partition index
+        candidates = self._db.execute(
+            f"SELECT DISTINCT m.id, m.text, m.seen_count, m.sources, m.session_id, m.event_id, m.timestamp "
+            f"FROM memory_lsh l CROSS JOIN memories m ON m.id = l.memory_id "
+            f"WHERE l.bucket IN ({placeholders}) AND m.partition = ?",
+            (*buckets, partition),
+        ).fetchall()
+        # Buckets of memories deleted behind the consolidator's back are left behind; the JOIN skips them
+        best, best_score = None, self.threshold
+        for candidate in candidates:
+            # Canonical memories come up again and again within a pass; shingle each one once
+            candidate_hashes = known.get(candidate[0])
+            if candidate_hashes is None:
+                candidate_hashes = known[candidate[0]] = shingles(candidate[1])
+            score = jaccard(hashes, candidate_hashes)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def _merge(self, canonical: tuple, duplicate: tuple):
+        canonical_id, _, seen_count, sources, session_id, event_id, timestamp = canonical
+        duplicate_id, _, dup_session, dup_event, dup_timestamp, _, dup_count, dup_sources = duplicate
+        # Bulk-loaded memories have no event id to point back to; they only add to seen_count
+        sources = [s for s in (json.loads(sources) if sources else [[session_id, event_id, timestamp]]) if s[1] is not None]
+        added = [s for s in (json.loads(dup_sources) if dup_sources else [[dup_session, dup_event, dup_timestamp]]) if s[1] is not None]
+        known = {(s[0], s[1]) for s in sources}
+        new = [s for s in added if (s[0], s[1]) not in known]
+        if added and not new:
+            # The same event stored again (a session re-added after a merge): nothing new to count
+            dup_count = 0
+        sources = (sources + new)[-MAX_SOURCES:]
+        self._db.execute(
+            "UPDATE memories SET seen_count = ?, sources = ? WHERE id = ?",
+            (seen_count + dup_count, json.dumps(sources) if sources else None, canonical_id),
+        )
+        self._db.execute("DELETE FROM memories WHERE id = ?", (duplicate_id,))
+
+    def consolidate(self) -> int:
+        """Consolidate one batch of new memories (blocking).
+
+        Returns:
+            int: Number of memories examined; 0 once everything is consolidated
+        """
+        start = time.perf_counter()
+        merged = 0
+        known = {}
+        with self._lock, self._db:
+            batch = self._db.execute(
+                "SELECT id, partition, session_id, event_id, timestamp, text, seen_count, sources "
+                "FROM memories WHERE consolidated = 0 ORDER BY id LIMIT ?",
+                (self.batch,),
+            ).fetchall()
+            for row in batch:
+                memory_id, partition, text = row[0], row[1], row[5]
+                hashes = shingles(text)
+                signature = self.hasher.signature(hashes)
+                if signature:
+                    buckets = self._buckets(partition, signature)
+                    canonical = self._find_duplicate(partition, hashes, buckets, known)
+                    if canonical is not None:
+                        self._merge(canonical, row)
+                        merged += 1
+                        continue
+                    self._db.executemany(
+                        "INSERT OR IGNORE INTO memory_lsh (bucket, memory_id) VALUES (?, ?)",
+                        [(bucket, memory_id) for bucket in buckets],
+                    )
+                self._db.execute("UPDATE memories SET consolidated = 1 WHERE id = ?", (memory_id,))
+        if batch:
+            self.processed += len(batch)
+            self.merged += merged
+            self.passes += 1
+            self.pass_seconds += time.perf_counter() - start
+            logger.info(f"MEMORY_CONSOLIDATION: examined {len(batch)} memories, merged {merged} near-duplicates")
+        return len(batch)
+
+    def delete_user(self, app_name: str, user_id: str) -> int:
+        """Delete every memory of one user, and their LSH buckets.
+
+        The LSH table has no index by memory, so each bucket is found again
+        from the memory's text.
+
+        Args:
+            app_name (str): Application the user belongs to
+            user_id (str): User whose memories are deleted
+
+        Returns:
+            int: Number of memories deleted
+        """
+        partition = partition_key(app_name, user_id)
+        with self._lock, self._db:
+            rows = self._db.execute(
+                "SELECT id, text FROM memories WHERE partition = ? AND consolidated = 1", (partition,)
+            ).fetchall()
+            stale = []
+            for memory_id, text in rows:
+                signature = self.hasher.signature(shingles(text))
+                if signature:
+                    stale.extend((bucket, memory_id) for bucket in self._buckets(partition, signature))
+            self._db.executemany("DELETE FROM memory_lsh WHERE bucket = ? AND memory_id = ?", stale)
+        return self.store.delete_user(app_name, user_id)
+
+    async def consolidate_all(self) -> int:
+        """Consolidate every pending memory, one batch at a time in a worker thread.
+
+        Returns:
+            int: Number of memories examined
+        """
+        total = 0
+        while True:
+            examined = await asyncio.to_thread(self.consolidate)
+            total += examined
+            if examined < self.batch:
+                return total
+
+    async def run_loop(self, interval: float = 30.0):
+        """Consolidate new memories every interval seconds until cancelled.
+
+        Args:
+            interval (float): Seconds between consolidation passes
+        """
+        while True:
+            try:
+                await self.consolidate_all()
+            except Exception as e:
+                logger.error(f"MEMORY_CONSOLIDATION: pass failed: {e}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        """Report consolidation progress.
+
+        Returns:
+            dict: Memories examined and merged, pending memories and time spent
+        """
+        with self._lock:
+            pending = self._db.execute("SELECT COUNT(*) FROM memories WHERE consolidated = 0").fetchone()[0]
+        return {
+            "examined": self.processed,
+            "merged": self.merged,
+            "pending": pending,
+            "passes": self.passes,
+            "seconds": round(self.pass_seconds, 3),
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
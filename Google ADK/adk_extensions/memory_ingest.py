@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.memory import BaseMemoryService
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.sessions import Session
+
+logger = logging.getLogger(__name__)
+
+
+def _event_text(event) -> str:
+    if not event.content or not event.content.parts:
+        return ""
+    return " ".join(part.text for part in event.content.parts if part.text)
+
+
+class IncrementalMemoryIngestor(BasePlugin):
+    """Runner plugin that feeds each finished turn into the memory service.
+
+    After every run it takes the events appended since the session's
+    watermark (the number of events already handed over and the id of the
+    last one), so each turn costs O(new events) instead of re-ingesting the
+    whole session. The slice is taken synchronously in after_run_callback and
+    ingested by a background task, so the next turn does not wait for it.
+
+    Events are deduplicated per user by a hash of author and text, which makes
+    ingestion idempotent: replaying a turn, or re-ingesting a session after a
+    rewind, adds nothing twice.
+
+    Memory services that replace a session's memories on every
+    add_session_to_memory() call (like InMemoryMemoryService) are given the
+    full list of the session's ingested events each time. Services whose
+    incremental_add attribute is true (BM25MemoryService, VectorMemoryService)
+    receive only the new ones.
+
+    State of the max_sessions most recently ingested sessions is kept, and a
+    user's hashes are kept while any of their sessions is; call forget() when
+    a session ends or is deleted. An evicted session that comes back is
+    scanned from its first event again, and its hashes skip what is known.
+    """
+
+    def __init__(self, memory_service: BaseMemoryService, name: str = "incremental_memory_ingest", max_sessions: int = 10000):
+        super().__init__(name=name)
+        self.memory_service = memory_service
+        self.incremental = getattr(memory_service, "incremental_add", False)
+        self.max_sessions = max_sessions
+        self._watermarks = OrderedDict()  # (app, user, session) -> (event count, last event id)
+        self._hashes = {}  # (app, user) -> digests of ingested events
+        self._session_events = {}  # (app, user, session) -> ingested events, for replacing services
+        self._user_sessions = {}  # (app, user) -> number of their sessions in _watermarks
+        self._locks = {}
+        self._tasks = set()
+
+        self.ingested = 0
+        self.duplicates = 0
+        self.batches = 0
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        self.schedule(invocation_context.session)
+
+    def schedule(self, session: Session) -> Optional[asyncio.Task]:
+        """Start ingesting the events added to session since the last call.
+
+        Args:
+            session (Session): Session whose new events should become memories
+
+        Returns:
+            asyncio.Task: The background ingest task, or None if there was nothing new
+        """
+        key = (session.app_name, session.user_id, session.id)
+        events = session.events
+        previous = self._watermarks.get(key, (0, None))
+        count, last_id = previous
+        if count > len(events) or (count and events[count - 1].id != last_id):
+            # History was rewritten (rewind, restore): start over, the hashes skip what is known
+            count = 0
+        if count == len(events):
+            return None
+        new_events = events[count:]
+        if key not in self._watermarks:
+            self._user_sessions[key[:2]] = self._user_sessions.get(key[:2], 0) + 1
+        self._watermarks[key] = (len(events), events[-1].id)
+        self._watermarks.move_to_end(key)
+        while len(self._watermarks) > self.max_sessions:
+            self.forget(*next(iter(self._watermarks)))
+
+        task = asyncio.create_task(self._ingest(key, new_events, previous))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _ingest(self, key: tuple, events: list, previous: tuple):
+        app_name, user_id, session_id = key
+        # A session forgotten while this task was queued still ingests, without recreating its state
+        tracked = key in self._watermarks
+        hashes = self._hashes.setdefault((app_name, user_id), set()) if tracked else set()
+        fresh, digests = [], []
+        for event in events:
+            text = _event_text(event)
+            if not text.strip():
+                continue
+            digest = hashlib.sha1(f"{event.author}\0{text}".encode()).digest()
+            if digest in hashes:
+                self.duplicates += 1
+                continue
+            hashes.add(digest)
+            fresh.append(event)
+            digests.append(digest)
+        if not fresh:
+            return
+
+        if self.incremental:
+            batch = fresh
+        else:
+            batch = self._session_events.setdefault(key, []) if tracked else []
+            batch.extend(fresh)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            try:
+                await self.memory_service.add_session_to_memory(
+                    Session(app_name=app_name, user_id=user_id, id=session_id, events=list(batch))
+                )
+            except Exception as e:
+                # Forget the hashes and move the watermark back so a later turn hands these
+                # events over again; events ingested since are skipped by their hashes
+                hashes.difference_update(digests)
+                if key in self._watermarks:
+                    self._watermarks[key] = previous
+                if not self.incremental:
+                    failed = {id(event) for event in fresh}
+                    batch[:] = [event for event in batch if id(event) not in failed]
+                logger.error(f"MEMORY_INGEST: failed to ingest {len(fresh)} events of session {session_id}: {e}")
+                return
+        self.ingested += len(fresh)
+        self.batches += 1
+        logger.info(f"MEMORY_INGEST: ingested {len(fresh)} new events of session {session_id}")
+
+    def forget(self, app_name: str, user_id: str, session_id: str):
+        """Drop what is kept for a session that ended or was deleted.
+
+        The user's hashes go with their last tracked session.
+
+        Args:
+            app_name (str): Application of the session
+            user_id (str): Owner of the session
+            session_id (str): Session to forget
+        """
+        key = (app_name, user_id, session_id)
+        self._session_events.pop(key, None)
+        self._locks.pop(key, None)
+        if self._watermarks.pop(key, None) is None:
+            return
+        remaining = self._user_sessions.pop(key[:2]) - 1
+        if remaining:
+            self._user_sessions[key[:2]] = remaining
+        else:
+            self._hashes.pop(key[:2], None)
+
+    async def drain(self):
+        """Wait until every scheduled ingest has finished."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def stats(self) -> dict:
+        """Report ingestion counters.
+
+        Returns:
+            dict: Ingested events, skipped duplicates, batches and pending tasks
+        """
+        return {
+            "ingested": self.ingested,
+            "duplicates": self.duplicates,
+            "batches": self.batches,
+            "pending": len(self._tasks),
+        }
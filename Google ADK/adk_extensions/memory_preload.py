@@ -0,0 +1,168 @@
+import logging
+import math
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.memory import BaseMemoryService
+from google.adk.models import LlmRequest
+
+from adk_extensions.bm25_memory import tokenize
+from adk_extensions.context_assembler import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+PRELOAD_TEMPLATE = """The following content is from your previous conversations with the user.
+They may be useful for answering the user's current query.
+<PAST_CONVERSATIONS>
+{memories}
+</PAST_CONVERSATIONS>
+"""
+
+
+def query_similarity(a: Counter, b: Counter) -> float:
+    """Cosine similarity of two term-frequency bags (0.0 when either is empty)."""
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b[term] for term, count in a.items() if term in b)
+    return dot / math.sqrt(sum(c * c for c in a.values()) * sum(c * c for c in b.values()))
+
+
+class _SessionCache:
+    __slots__ = ("terms", "block", "invocation_id")
+
+    def __init__(self, terms: Counter, block: Optional[str], invocation_id: str):
+        self.terms = terms
+        self.block = block
+        self.invocation_id = invocation_id
+
+
+class MemoryPreloader:
+    """before_model_callback that injects relevant memories into every request.
+
+    ADK's PreloadMemoryTool runs a full memory search for every model call.
+    Here the retrieved block is cached per session, keyed by the terms of
+    the user message it was retrieved for:
+
+    - later model calls of the same invocation (tool round trips) reuse it
+    - a new user message whose terms stay within drift_threshold cosine
+      similarity of the cached query reuses it as well
+    - only a message that drifts further away runs a new search
+
+    An empty result is not reused across messages: memory keeps growing while
+    the session runs, so the next message searches again.
+
+    Memories are added in rank order until max_tokens is reached, so the
+    preload never grows the prompt by more than that.
+
+    Preloads of the max_sessions most recently used sessions are cached; an
+    evicted session simply searches again on its next message.
+
+    Usage:
+        memory_preloader = MemoryPreloader(max_tokens=300)
+        Agent(..., before_model_callback=memory_preloader.before_model_callback)
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 300,
+        drift_threshold: float = 0.75,
+        memory_service: Optional[BaseMemoryService] = None,
+        max_sessions: int = 1000,
+    ):
+        self.max_tokens = max_tokens
+        self.drift_threshold = drift_threshold
+        self.memory_service = memory_service
+        self.max_sessions = max_sessions
+        self._cache = OrderedDict()
+
+        self.searches = 0
+        self.cache_hits = 0
+        self.injected_tokens = 0
+        self._latencies = deque(maxlen=1024)
+
+    def _service(self, callback_context: CallbackContext) -> Optional[BaseMemoryService]:
+        if self.memory_service is not None:
+            return self.memory_service
+        # The Runner's memory service; CallbackContext has no public accessor for it
+        return callback_context._invocation_context.memory_service
+
+    def _format(self, memories: list) -> Optional[str]:
+        lines, budget = [], self.max_tokens - estimate_tokens(PRELOAD_TEMPLATE)
+        for memory in memories:
+            text = " ".join(part.text for part in memory.content.parts if part.text)
+            if not text:
+                continue
+            line = f"[{memory.timestamp}] {memory.author}: {text}" if memory.author else text
+            cost = estimate_tokens(line)
+            if cost > budget:
+                break
+            lines.append(line)
+            budget -= cost
+        return PRELOAD_TEMPLATE.format(memories="\n".join(lines)) if lines else None
+
+    async def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest):
+        user_content = callback_context.user_content
+        if not user_content or not user_content.parts:
+            return None
+        query = " ".join(part.text for part in user_content.parts if part.text)
+        if not query:
+            return None
+
+        start = time.perf_counter()
+        session = callback_context.session
+        key = (session.app_name, session.user_id, session.id)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+        terms = Counter(tokenize(query))
+
+        if cached is not None and cached.invocation_id == callback_context.invocation_id:
+            block = cached.block
+        elif cached is not None and cached.block and query_similarity(terms, cached.terms) >= self.drift_threshold:
+            self.cache_hits += 1
+            cached.invocation_id = callback_context.invocation_id
+            block = cached.block
+        else:
+            service = self._service(callback_context)
+            if service is None:
+                return None
+            try:
+                response = await service.search_memory(app_name=session.app_name, user_id=session.user_id, query=query)
+            except Exception as e:
+                logger.warning(f"MEMORY_PRELOAD: search failed, continuing without memories: {e}")
+                return None
+            self.searches += 1
+            block = self._format(response.memories)
+            self._cache[key] = _SessionCache(terms, block, callback_context.invocation_id)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_sessions:
+                self._cache.popitem(last=False)
+
+        if block:
+            llm_request.append_instructions([block])
+            self.injected_tokens += estimate_tokens(block)
+        self._latencies.append(time.perf_counter() - start)
+        return None
+
+    def forget(self, app_name: str, user_id: str, session_id: str):
+        """Drop the cached preload of a session (e.g. when it is deleted)."""
+        self._cache.pop((app_name, user_id, session_id), None)
+
+    def stats(self) -> dict:
+        """Report how often the preload searched, reused its cache and what it cost.
+
+        Returns:
+            dict: searches, skipped searches, hit rate, injected tokens and added latency in ms
+        """
+        lookups = self.searches + self.cache_hits
+        latencies = sorted(self._latencies)
+        return {
+            "searches": self.searches,
+            "skipped_searches": self.cache_hits,
+            "cache_hit_rate": round(self.cache_hits / lookups, 3) if lookups else 0.0,
+            "injected_tokens": self.injected_tokens,
+            "added_ms_avg": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            "added_ms_p99": round(latencies[int(0.99 * (len(latencies) - 1))] * 1000, 3) if latencies else 0.0,
+        }
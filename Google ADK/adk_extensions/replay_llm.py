@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import Optional
+
+from google.adk.agents import LlmAgent
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.adk.tools.agent_tool import AgentTool
+from google.genai.types import Content, FunctionCall, Part
+from pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+
+def _strip_ids(value):
+    # Function call ids are generated per run; they must not change the request key
+    if isinstance(value, dict):
+        return {k: _strip_ids(v) for k, v in value.items() if k != "id"}
+    if isinstance(value, list):
+        return [_strip_ids(v) for v in value]
+    return value
+
+
+def request_key(llm_request: LlmRequest) -> str:
+    """Stable hash of what the model is asked: model, instruction, contents and tool names."""
+    config = llm_request.config
+    payload = {
+        "model": llm_request.model,
+        "system_instruction": str(config.system_instruction or "") if config else "",
+        "tools": sorted(llm_request.tools_dict),
+        "contents": [_strip_ids(content.model_dump(exclude_none=True, mode="json")) for content in llm_request.contents],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _last_user_text(llm_request: LlmRequest) -> str:
+    for content in reversed(llm_request.contents):
+        if content.role == "user" and content.parts and any(part.text for part in content.parts):
+            return " ".join(part.text for part in content.parts if part.text)
+    return ""
+
+
+class ScriptedLlm(BaseLlm):
+    """Offline model that follows fixed rules, for tests and benchmarks.
+
+    rules is a list of (pattern, calls): when the latest user message matches
+    the regular expression pattern, the model answers with the function calls
+    in calls, a list of (tool name, args) pairs. After the tools respond, or
+    when no rule matches, it answers with reply. The same request always gets
+    the same response, after latency seconds (0 by default) to stand in for
+    a real model's response time.
+
+    Usage:
+        model = ScriptedLlm(rules=[(r"visa", [("fees_percentage", {"card_type": "visa"})])])
+        agent = with_model(root_agent, lambda _: model)
+    """
+
+    model: str = "scripted"
+    rules: list = []
+    reply: str = "Done."
+    latency: float = 0.0
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        last = llm_request.contents[-1] if llm_request.contents else None
+        if last is not None and any(part.function_response for part in last.parts or []):
+            yield LlmResponse(content=Content(role="model", parts=[Part(text=self.reply)]))
+            return
+        text = _last_user_text(llm_request)
+        for pattern, calls in self.rules:
+            if re.search(pattern, text, re.IGNORECASE):
+                parts = [Part(function_call=FunctionCall(name=name, args=dict(args))) for name, args in calls]
+                yield LlmResponse(content=Content(role="model", parts=parts))
+                return
+        yield LlmResponse(content=Content(role="model", parts=[Part(text=self.reply)]))
+
+
+class RecordReplayLlm(BaseLlm):
+    """Model that records real responses into a cassette once and replays them offline.
+
+    In "record" mode every request goes to inner, by default the real model
+    (resolved from the model name through ADK's LLMRegistry, so it needs the
+    usual API key), and
+    its responses are appended to the cassette, a JSON-lines file keyed by a
+    hash of the request. In "replay" mode the responses are read back from the
+    cassette without any network access.
+
+    Requests are matched by request_key(), which ignores per-run function
+    call ids. A request that is not in the cassette (say, one carrying a
+    tool response with a timestamp) raises in strict mode; otherwise it gets
+    the recording that follows the last one replayed, wrapping around at
+    the end, and is counted in misses. Replaying one recorded conversation
+    many times therefore follows the recording even when tool output varies.
+    """
+
+    model: str = "gemini-2.0-flash"
+    cassette: str
+    mode: str = "replay"
+    strict: bool = False
+    inner: Optional[BaseLlm] = None
+
+    _recordings: dict = PrivateAttr(default_factory=dict)
+    _order: list = PrivateAttr(default_factory=list)
+    _position: int = PrivateAttr(default=-1)
+    _loaded: bool = PrivateAttr(default=False)
+    _misses: int = PrivateAttr(default=0)
+
+    def _load(self):
+        self._loaded = True
+        if not os.path.exists(self.cassette):
+            return
+        with open(self.cassette) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record["key"] not in self._recordings:
+                    self._order.append(record["key"])
+                    self._recordings[record["key"]] = record["responses"]
+
+    async def _record(self, llm_request: LlmRequest, stream: bool, key: str):
+        if self.inner is None:
+            self.inner = LLMRegistry.new_llm(self.model)
+        responses = []
+        async for response in self.inner.generate_content_async(llm_request, stream=stream):
+            responses.append(response.model_dump(exclude_none=True, mode="json"))
+            yield response
+        directory = os.path.dirname(os.path.abspath(self.cassette))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.cassette, "a") as f:
+            f.write(json.dumps({"key": key, "responses": responses}) + "\n")
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False):
+        key = request_key(llm_request)
+        if self.mode == "record":
+            async for response in self._record(llm_request, stream, key):
+                yield response
+            return
+
+        if not self._loaded:
+            self._load()
+        responses = self._recordings.get(key)
+        if responses is None:
+            if self.strict:
+                raise ValueError(f"Request {key[:12]} is not in cassette {self.cassette}; record it first")
+            if not self._order:
+                raise ValueError(f"Cassette {self.cassette} is empty or missing; record it first")
+            self._misses += 1
+            key = self._order[(self._position + 1) % len(self._order)]
+            responses = self._recordings[key]
+        self._position = self._order.index(key)
+        for response in responses:
+            yield LlmResponse.model_validate(response)
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+
+def with_model(agent: LlmAgent, make_model) -> LlmAgent:
+    """Copy an agent tree, replacing the model of every LLM agent in it.
+
+    Sub-agents and agents wrapped in AgentTool are replaced too, so no part
+    of the tree reaches the real model.
+
+    Args:
+        agent (LlmAgent): Root of the agent tree
+        make_model (callable): Called with each original agent, returns the BaseLlm to use
+
+    Returns:
+        LlmAgent: The copied tree
+    """
+    tools = [
+        AgentTool(agent=with_model(tool.agent, make_model), skip_summarization=tool.skip_summarization)
+        if isinstance(tool, AgentTool) and isinstance(tool.agent, LlmAgent)
+        else tool
+        for tool in agent.tools
+    ]
+    sub_agents = [with_model(sub, make_model) if isinstance(sub, LlmAgent) else sub for sub in agent.sub_agents]
+    return agent.model_copy(update={"model": make_model(agent), "tools": tools, "sub_agents": sub_agents})
+
+
+def model_from_env(agent: LlmAgent) -> LlmAgent:
+    """Apply the model backend selected by ADK_MODEL_MODE to an agent tree.
+
+    ADK_MODEL_MODE is "live" (default, the agent is returned unchanged),
+    "record" or "replay"; ADK_CASSETTE_DIR (default "cassettes") holds one
+    cassette per agent name. Replay needs no API key or network.
+
+    Args:
+        agent (LlmAgent): Root of the agent tree
+
+    Returns:
+        LlmAgent: The agent to run
+    """
+    mode = os.environ.get("ADK_MODEL_MODE", "live")
+    if mode == "live":
+        return agent
+    if mode not in ("record", "replay"):
+        raise ValueError(f"ADK_MODEL_MODE must be live, record or replay, not {mode!r}")
+    cassette_dir = os.environ.get("ADK_CASSETTE_DIR", "cassettes")
+    logger.info(f"MODEL_BACKEND: {mode} with cassettes in {cassette_dir}")
+    return with_model(
+        agent,
+        lambda original: RecordReplayLlm(
+            model=original.canonical_model.model,
+            cassette=os.path.join(cassette_dir, f"{original.name}.jsonl"),
+            mode=mode,
+        ),
+    )
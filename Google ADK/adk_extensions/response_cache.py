@@ -0,0 +1,348 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from google.adk.agents import LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.tools.agent_tool import AgentTool
+
+from adk_extensions.context_assembler import INTERNAL_FUNCTION_NAMES
+from adk_extensions.replay_llm import _strip_ids
+
+logger = logging.getLogger(__name__)
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    model_ms REAL NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_created ON responses(created);
+"""
+
+# Config fields that do not change what the model answers
+_IGNORED_CONFIG = {"system_instruction", "tools", "http_options", "labels"}
+_SPACES = re.compile(r"\s+")
+
+
+def _normalize_text(text: str) -> str:
+    return _SPACES.sub(" ", text).strip().lower()
+
+
+def _normalize_content(content) -> dict:
+    data = _strip_ids(content.model_dump(exclude_none=True, mode="json"))
+    parts = []
+    for part in data.get("parts", []):
+        if part.get("thought"):
+            continue  # Thinking is not part of the conversation the model answers
+        if content.role == "user" and "text" in part:
+            part = {**part, "text": _normalize_text(part["text"])}
+        parts.append(part)
+    return {"role": content.role, "parts": parts}
+
+
+def cache_key(llm_request: LlmRequest) -> str:
+    """Hash of the model, instruction, tool schemas, generation config and normalized conversation.
+
+    User text is compared with case and whitespace folded, so "Convert 100 USD"
+    and "convert  100 usd" share an entry. Function call ids are ignored.
+
+    Args:
+        llm_request (LlmRequest): Request about to be sent to the model
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    config = llm_request.config
+    tools = []
+    if config and config.tools:
+        for tool in config.tools:
+            tools.append(tool.model_dump(exclude_none=True, mode="json"))
+    payload = {
+        "model": llm_request.model,
+        "system_instruction": str(config.system_instruction or "") if config else "",
+        "tools": tools,
+        "config": config.model_dump(exclude_none=True, exclude=_IGNORED_CONFIG, mode="json") if config else {},
+        "contents": [_normalize_content(content) for content in llm_request.contents],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _function_names(content) -> set:
+    if not content or not content.parts:
+        return set()
+    names = set()
+    for part in content.parts:
+        if part.function_call:
+            names.add(part.function_call.name)
+        elif part.function_response:
+            names.add(part.function_response.name)
+    return names
+
+
+def _current_turn(llm_request: LlmRequest) -> list:
+    """Contents since the latest user text message, i.e. the turn being answered."""
+    for index in range(len(llm_request.contents) - 1, -1, -1):
+        content = llm_request.contents[index]
+        if content.role == "user" and content.parts and any(part.text for part in content.parts):
+            return llm_request.contents[index:]
+    return llm_request.contents
+
+
+class _CacheEntry:
+    __slots__ = ("response", "model_ms", "created")
+
+    def __init__(self, response: str, model_ms: float, created: float):
+        self.response = response  # LlmResponse JSON; parsed on every hit so callers never share one object
+        self.model_ms = model_ms  # How long the model took to produce it, i.e. what a hit saves
+        self.created = created
+
+
+class ModelResponseCache:
+    """Opt-in cache of model responses, installed as before/after model callbacks.
+
+    - Requests are keyed by cache_key(): model, instruction, tool schemas,
+      generation config and the conversation with user text normalized. A
+      hit returns the stored response from before_model_callback, so the
+      model is not called; a miss stores the final response in
+      after_model_callback.
+    - Entries expire after ttl seconds. At most max_entries are kept in
+      memory (least recently used are dropped) and on disk.
+    - With a path, entries are also written to a SQLite file and looked up
+      there on a memory miss, so they survive restarts and are shared by
+      processes using the same file. Disk access runs in a worker thread.
+    - Turns that involve a side-effecting tool (any of side_effect_tools, or
+      a tool confirmation) are neither served nor stored, and neither is a
+      response that calls one, so an approval is never skipped or replayed.
+    - Streamed chunks, errors and responses interrupted mid-turn are not
+      stored. Hits carry custom_metadata {"response_cache": "hit"} and no
+      usage metadata, since no tokens were spent.
+
+    stats() reports the hit rate and the model time saved, the sum of the
+    recorded model latency of every hit.
+
+    Usage:
+        response_cache = ModelResponseCache.from_env(side_effect_tools=["coordinate_shipping"])
+        if response_cache:
+            response_cache.attach(root_agent)
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = 3600.0,
+        max_entries: int = 10000,
+        side_effect_tools=(),
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.side_effect_tools = set(side_effect_tools) | set(INTERNAL_FUNCTION_NAMES)
+        self._cache = OrderedDict()
+        self._pending = OrderedDict()  # (invocation id, agent name) -> (key, started)
+        self._db = None
+        self._db_lock = threading.Lock()
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(CACHE_SCHEMA)
+            self._db.commit()
+
+        self.lookups = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stores = 0
+        self.saved_ms = 0.0
+
+    @classmethod
+    def from_env(cls, side_effect_tools=()) -> Optional["ModelResponseCache"]:
+        """Cache configured by ADK_RESPONSE_CACHE, or None when it is not set.
+
+        ADK_RESPONSE_CACHE is the SQLite file to persist to, or "memory" for
+        an in-process cache only. ADK_RESPONSE_CACHE_TTL (seconds, default
+        3600) and ADK_RESPONSE_CACHE_SIZE (entries, default 10000) tune it.
+
+        Args:
+            side_effect_tools (list): Tools whose turns must never be cached
+
+        Returns:
+            ModelResponseCache: The cache, or None when caching is off
+        """
+        target = os.environ.get("ADK_RESPONSE_CACHE")
+        if not target:
+            return None
+        return cls(
+            path=None if target == "memory" else target,
+            ttl=float(os.environ.get("ADK_RESPONSE_CACHE_TTL", "3600")),
+            max_entries=int(os.environ.get("ADK_RESPONSE_CACHE_SIZE", "10000")),
+            side_effect_tools=side_effect_tools,
+        )
+
+    def attach(self, agent: LlmAgent) -> LlmAgent:
+        """Add the cache callbacks to every LLM agent of a tree, after the callbacks it already has.
+
+        Sub-agents and agents wrapped in AgentTool are included. The lookup
+        runs last among each agent's before-model callbacks, so it sees the
+        request as they left it (e.g. trimmed by a ContextAssembler).
+
+        Args:
+            agent (LlmAgent): Root of the agent tree, changed in place
+
+        Returns:
+            LlmAgent: The same agent
+        """
+        for field, callback in (
+            ("before_model_callback", self.before_model_callback),
+            ("after_model_callback", self.after_model_callback),
+        ):
+            existing = getattr(agent, field)
+            if existing is None:
+                existing = []
+            elif not isinstance(existing, list):
+                existing = [existing]
+            setattr(agent, field, existing + [callback])
+        for tool in agent.tools:
+            if isinstance(tool, AgentTool) and isinstance(tool.agent, LlmAgent):
+                self.attach(tool.agent)
+        for sub_agent in agent.sub_agents:
+            if isinstance(sub_agent, LlmAgent):
+                self.attach(sub_agent)
+        return agent
+
+    # --- storage ---
+
+    def _db_get(self, key: str) -> Optional[tuple]:
+        with self._db_lock:
+            return self._db.execute("SELECT response, model_ms, created FROM responses WHERE key = ?", (key,)).fetchone()
+
+    def _db_put(self, key: str, entry: _CacheEntry):
+        with self._db_lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, model_ms, created) VALUES (?, ?, ?, ?)",
+                (key, entry.response, entry.model_ms, entry.created),
+            )
+            if self.stores % 100 == 0:
+                self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+                self._db.execute(
+                    "DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY created DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+
+    def _remember(self, key: str, entry: _CacheEntry):
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[_CacheEntry]:
+        entry = self._cache.get(key)
+        if entry is None and self._db is not None:
+            row = await asyncio.to_thread(self._db_get, key)
+            if row is not None:
+                entry = _CacheEntry(*row)
+                if time.time() - entry.created < self.ttl:
+                    self.disk_hits += 1
+                    self._remember(key, entry)
+        if entry is None:
+            return None
+        if time.time() - entry.created >= self.ttl:
+            self._cache.pop(key, None)
+            return None
+        self._cache.move_to_end(key)
+        return entry
+
+    async def put(self, key: str, response: LlmResponse, model_ms: float):
+        entry = _CacheEntry(response.model_dump_json(exclude_none=True), model_ms, time.time())
+        self._remember(key, entry)
+        self.stores += 1
+        if self._db is not None:
+            await asyncio.to_thread(self._db_put, key, entry)
+
+    def clear(self):
+        self._cache.clear()
+        if self._db is not None:
+            with self._db_lock, self._db:
+                self._db.execute("DELETE FROM responses")
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # --- callbacks ---
+
+    def _has_side_effects(self, contents: list) -> bool:
+        return any(_function_names(content) & self.side_effect_tools for content in contents)
+
+    async def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest):
+        pending_key = (callback_context.invocation_id, callback_context.agent_name)
+        self._pending.pop(pending_key, None)
+        self.lookups += 1
+        if self._has_side_effects(_current_turn(llm_request)):
+            self.bypassed += 1
+            return None
+        key = cache_key(llm_request)
+        entry = await self.get(key)
+        if entry is None:
+            self.misses += 1
+            self._pending[pending_key] = (key, time.perf_counter())
+            while len(self._pending) > 1000:
+                self._pending.popitem(last=False)  # Calls that failed and never reached after_model
+            return None
+        self.hits += 1
+        self.saved_ms += entry.model_ms
+        logger.info(f"RESPONSE_CACHE: hit for {callback_context.agent_name}, saved {entry.model_ms:.0f} ms")
+        response = LlmResponse.model_validate_json(entry.response)
+        response.usage_metadata = None
+        response.custom_metadata = {**(response.custom_metadata or {}), "response_cache": "hit"}
+        return response
+
+    async def after_model_callback(self, callback_context: CallbackContext, llm_response: LlmResponse):
+        if llm_response.partial:
+            return None  # Streamed chunk; the final response is stored
+        pending = self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if pending is None:
+            return None  # Served from the cache, or bypassed
+        key, started = pending
+        if llm_response.error_code or llm_response.interrupted or not llm_response.content:
+            return None
+        if self._has_side_effects([llm_response.content]):
+            self.bypassed += 1
+            return None
+        await self.put(key, llm_response, (time.perf_counter() - started) * 1000)
+        return None
+
+    def stats(self) -> dict:
+        """Report hit rate and model time saved.
+
+        Returns:
+            dict: Lookups, hits (of which from disk), misses, bypassed turns, stores,
+                hit_rate over cacheable lookups, saved_ms and entries in memory
+        """
+        cacheable = self.hits + self.misses
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / cacheable, 3) if cacheable else 0.0,
+            "saved_ms": round(self.saved_ms, 1),
+            "entries": len(self._cache),
+        }
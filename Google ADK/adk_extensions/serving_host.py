@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+from google.adk.agents.run_config import RunConfig
+from google.adk.runners import Runner
+from google.genai.types import Content, Part
+
+from adk_extensions.turn_driver import TurnResult, run_turn
+from adk_extensions.turn_profiler import TurnProfiler
+
+logger = logging.getLogger(__name__)
+
+
+def _discard(text: str):
+    pass
+
+
+class _Turn:
+    __slots__ = ("user_id", "session_id", "message", "future", "submitted")
+
+    def __init__(self, user_id: str, session_id: str, message: Content, future: asyncio.Future):
+        self.user_id = user_id
+        self.session_id = session_id
+        self.message = message
+        self.future = future
+        self.submitted = time.perf_counter()
+
+
+class AgentHost:
+    """Serve many concurrent user sessions from one shared Runner.
+
+    Turns are queued per user and dispatched to a fixed pool of worker tasks:
+
+    - Ordering: a session is handed to at most one worker at a time and its
+      turns run in submission order, so turns of one session never
+      interleave. Other sessions of the same user may run in parallel.
+    - Fairness: users with runnable turns wait in a round-robin ring, and a
+      worker takes one turn from the user at the head before moving that
+      user to the tail. A user with a deep backlog cannot starve the others.
+    - Bounds: max_workers caps concurrent turns (and therefore concurrent
+      model calls); max_pending caps queued turns, and submit() waits for
+      room instead of growing the queue without limit; max_known_sessions
+      caps the sessions remembered as existing, least recently used first
+      (a forgotten one is looked up with get_session again).
+    - Profiling: with a TurnProfiler (also registered as a Runner plugin),
+      the sampled share of turns is written out as Chrome traces.
+
+    Usage:
+        async with AgentHost(runner, max_workers=64) as host:
+            result = await host.submit("alice", "Hello!")
+    """
+
+    def __init__(
+        self,
+        runner: Runner,
+        max_workers: int = 64,
+        max_pending: int = 10000,
+        run_config: Optional[RunConfig] = None,
+        profiler: Optional[TurnProfiler] = None,
+        max_known_sessions: int = 100000,
+    ):
+        self.runner = runner
+        self.max_workers = max_workers
+        self.max_known_sessions = max_known_sessions
+        self.run_config = run_config or RunConfig()
+        self.profiler = profiler
+        self._capacity = asyncio.Semaphore(max_pending)
+        self._queues = {}  # user_id -> deque of _Turn
+        self._ready = deque()  # users with a turn whose session is idle
+        self._in_ready = set()
+        self._busy_sessions = set()
+        self._known_sessions = OrderedDict()  # (user_id, session_id) -> None, in LRU order
+        self._wakeup = asyncio.Condition()
+        self._workers = []
+
+        self.completed = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=100000)
+        self._started_at = None
+
+    async def start(self):
+        if self._workers:
+            return
+        self._started_at = time.perf_counter()
+        self._workers = [asyncio.create_task(self._worker(n)) for n in range(self.max_workers)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        # Turns that never reached a worker
+        for queue in self._queues.values():
+            for turn in queue:
+                turn.future.cancel()
+        self._queues.clear()
+        self._ready.clear()
+        self._in_ready.clear()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def ensure_session(self, user_id: str, session_id: Optional[str] = None) -> str:
+        """Return the id of an existing session for user_id, creating it if needed.
+
+        Args:
+            user_id (str): Owner of the session
+            session_id (str): Session to reuse; a new one is created when omitted or unknown
+
+        Returns:
+            str: The session id
+        """
+        if session_id is not None and (user_id, session_id) in self._known_sessions:
+            self._known_sessions.move_to_end((user_id, session_id))
+            return session_id
+        service = self.runner.session_service
+        app_name = self.runner.app_name
+        session = None
+        if session_id is not None:
+            session = await service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        if session is None:
+            session = await service.create_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        self._known_sessions[(user_id, session.id)] = None
+        while len(self._known_sessions) > self.max_known_sessions:
+            self._known_sessions.popitem(last=False)
+        return session.id
+
+    async def submit(self, user_id: str, text: str, session_id: Optional[str] = None) -> TurnResult:
+        """Queue one user turn and wait for its result.
+
+        Args:
+            user_id (str): User sending the message
+            text (str): Message text
+            session_id (str): Conversation to continue; a new session is created when omitted
+
+        Returns:
+            TurnResult: Final response text and timing of the turn
+        """
+        session_id = await self.ensure_session(user_id, session_id)
+        await self._capacity.acquire()
+        future = asyncio.get_running_loop().create_future()
+        turn = _Turn(user_id, session_id, Content(role="user", parts=[Part(text=text)]), future)
+        self._queues.setdefault(user_id, deque()).append(turn)
+        async with self._wakeup:
+            self._mark_ready(user_id)
+            self._wakeup.notify()
+        return await future
+
+    def _runnable_index(self, queue: deque) -> Optional[int]:
+        """Index of the oldest queued turn whose session is idle."""
+        for index, turn in enumerate(queue):
+            if (turn.user_id, turn.session_id) not in self._busy_sessions:
+                return index
+        return None
+
+    def _mark_ready(self, user_id: str):
+        if user_id in self._in_ready:
+            return
+        queue = self._queues.get(user_id)
+        if queue and self._runnable_index(queue) is not None:
+            self._ready.append(user_id)
+            self._in_ready.add(user_id)
+
+    def _next_turn(self) -> Optional[_Turn]:
+        while self._ready:
+            user_id = self._ready.popleft()
+            self._in_ready.discard(user_id)
+            queue = self._queues[user_id]
+            index = self._runnable_index(queue)
+            if index is None:
+                continue
+            turn = queue[index]
+            del queue[index]
+            if not queue:
+                del self._queues[user_id]
+            self._busy_sessions.add((turn.user_id, turn.session_id))
+            # Back to the tail of the ring: one turn per user per round
+            self._mark_ready(user_id)
+            return turn
+        return None
+
+    async def _worker(self, number: int):
+        while True:
+            async with self._wakeup:
+                turn = self._next_turn()
+                while turn is None:
+                    await self._wakeup.wait()
+                    turn = self._next_turn()
+                if self._ready:
+                    self._wakeup.notify()
+
+            try:
+                result = await run_turn(
+                    self.runner,
+                    user_id=turn.user_id,
+                    session_id=turn.session_id,
+                    message=turn.message,
+                    run_config=self.run_config,
+                    write=_discard,
+                    profiler=self.profiler,
+                )
+            except asyncio.CancelledError:
+                if not turn.future.done():
+                    turn.future.cancel()
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"AGENT_HOST: turn failed for {turn.user_id}/{turn.session_id}: {e}")
+                if not turn.future.done():
+                    turn.future.set_exception(e)
+            else:
+                self.completed += 1
+                self.latencies.append(time.perf_counter() - turn.submitted)
+                if not turn.future.done():
+                    turn.future.set_result(result)
+            finally:
+                self._capacity.release()
+                async with self._wakeup:
+                    self._busy_sessions.discard((turn.user_id, turn.session_id))
+                    self._mark_ready(turn.user_id)
+                    self._wakeup.notify()
+
+    def stats(self) -> dict:
+        """Report throughput and latency of the turns served so far.
+
+        Returns:
+            dict: Completed and failed turns, turns/sec, queue latency percentiles in ms
+        """
+        latencies = sorted(self.latencies)
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else 0.0
+
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "turns_per_sec": round(self.completed / elapsed, 1) if elapsed else 0.0,
+            "latency_ms_p50": percentile(0.50),
+            "latency_ms_p99": percentile(0.99),
+            "queued": sum(len(q) for q in self._queues.values()),
+            "active_sessions": len(self._busy_sessions),
+        }
@@ -0,0 +1,306 @@
+import asyncio
+import json
+import logging
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Optional
+
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.adk.sessions.database_session_service import StorageEvent, StorageSession
+from sqlalchemy import Column, Float, Index, Integer, LargeBinary, MetaData, String, Table
+from sqlalchemy import delete, exists, func, insert, or_, select
+
+from adk_extensions.sqlite_sessions import TunedDatabaseSessionService
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, zlib is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Session state left in the hot row of an archived session
+ARCHIVED_STATE_KEY = "__archived_at__"
+
+archive_metadata = MetaData()
+
+session_archive = Table(
+    "session_archive",
+    archive_metadata,
+    Column("app_name", String(128), primary_key=True),
+    Column("user_id", String(128), primary_key=True),
+    Column("id", String(128), primary_key=True),
+    Column("archived_time", Float, nullable=False),
+    Column("event_count", Integer, nullable=False),
+    Column("codec", String(16), nullable=False),
+    Column("payload", LargeBinary, nullable=False),
+)
+
+
+# Finds a session's latest events without scanning the events table
+events_by_session_time = Index(
+    "ix_events_session_time",
+    StorageEvent.app_name,
+    StorageEvent.user_id,
+    StorageEvent.session_id,
+    StorageEvent.timestamp,
+)
+
+
+def active_since(update_cutoff: datetime, event_cutoff: datetime):
+    """Condition on StorageSession: its state changed or it received an event after the cutoffs.
+
+    ADK only bumps update_time when session state changes, so a session that
+    only receives events would otherwise look idle.
+    """
+    recent_event = exists().where(
+        StorageEvent.app_name == StorageSession.app_name,
+        StorageEvent.user_id == StorageSession.user_id,
+        StorageEvent.session_id == StorageSession.id,
+        StorageEvent.timestamp >= event_cutoff,
+    )
+    return or_(StorageSession.update_time >= update_cutoff, recent_event)
+
+
+def compress(data: bytes) -> tuple:
+    """Compress an archive payload with zstd when available, else zlib.
+
+    Returns:
+        tuple: (codec name, compressed bytes)
+    """
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+    return "zlib", zlib.compress(data, 9)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This session was archived with zstd; install the zstandard package to read it.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class TieredDatabaseSessionService(TunedDatabaseSessionService):
+    """Session service that moves idle sessions out of the hot tables.
+
+    archive_idle_sessions() packs the state and events of every session idle
+    (no state change and no new event) for longer than a threshold into one compressed row of session_archive,
+    deletes its events and leaves a tombstone in the sessions table (its state
+    becomes {ARCHIVED_STATE_KEY: archived_time}). The events table and its
+    index therefore only hold sessions that are actually in use.
+
+    get_session() on an archived session rehydrates it transparently: the
+    events and state are written back to the hot tables and the archive row
+    is removed. list_sessions() keeps listing archived sessions with their
+    tombstone state.
+    """
+
+    def __init__(self, db_url: str, **kwargs):
+        super().__init__(db_url, **kwargs)
+        archive_metadata.create_all(self.db_engine)
+        events_by_session_time.create(self.db_engine, checkfirst=True)
+        self.archived_count = 0
+        self.rehydrated_count = 0
+
+    async def archive_idle_sessions(self, idle_seconds: float, limit: int = 500) -> int:
+        """Archive sessions with no state change and no new event for idle_seconds.
+
+        Args:
+            idle_seconds (float): Minimum idle time before a session goes cold
+            limit (int): Maximum number of sessions archived by this call
+
+        Returns:
+            int: Number of sessions archived
+        """
+        return await asyncio.to_thread(self._archive_idle_sessions, idle_seconds, limit)
+
+    def _archive_idle_sessions(self, idle_seconds: float, limit: int) -> int:
+        # update_time is stored as naive UTC on SQLite, event timestamps as naive local time
+        idle_since = time.time() - idle_seconds
+        cutoff = (
+            datetime.fromtimestamp(idle_since, timezone.utc).replace(tzinfo=None),
+            datetime.fromtimestamp(idle_since),
+        )
+        already_archived = exists().where(
+            session_archive.c.app_name == StorageSession.app_name,
+            session_archive.c.user_id == StorageSession.user_id,
+            session_archive.c.id == StorageSession.id,
+        )
+        with self.database_session_factory() as sql_session:
+            keys = sql_session.execute(
+                select(StorageSession.app_name, StorageSession.user_id, StorageSession.id)
+                .where(~active_since(*cutoff), ~already_archived)
+                .limit(limit)
+            ).all()
+
+        archived = 0
+        for key in keys:
+            # One short transaction per session keeps the writer lock window small
+            if self._archive_session(tuple(key), cutoff):
+                archived += 1
+        self.archived_count += archived
+        if archived:
+            logger.info(f"SESSION_TIERING: archived {archived} sessions idle for more than {idle_seconds}s")
+        return archived
+
+    def _archive_session(self, key: tuple, cutoff: tuple) -> bool:
+        app_name, user_id, session_id = key
+        with self.database_session_factory() as sql_session:
+            storage_session = sql_session.get(StorageSession, key)
+            # Skip sessions that were touched after they were selected
+            touched = sql_session.scalar(
+                select(active_since(*cutoff)).where(
+                    StorageSession.app_name == app_name,
+                    StorageSession.user_id == user_id,
+                    StorageSession.id == session_id,
+                )
+            )
+            if storage_session is None or touched:
+                return False
+
+            storage_events = sql_session.scalars(
+                select(StorageEvent)
+                .where(
+                    StorageEvent.app_name == app_name,
+                    StorageEvent.user_id == user_id,
+                    StorageEvent.session_id == session_id,
+                )
+                .order_by(StorageEvent.timestamp)
+            ).all()
+            payload = json.dumps(
+                {
+                    "state": dict(storage_session.state),
+                    "events": [e.to_event().model_dump(mode="json", by_alias=True, exclude_none=True) for e in storage_events],
+                },
+                separators=(",", ":"),
+            ).encode()
+            codec, blob = compress(payload)
+
+            archived_time = time.time()
+            sql_session.execute(
+                insert(session_archive).values(
+                    app_name=app_name,
+                    user_id=user_id,
+                    id=session_id,
+                    archived_time=archived_time,
+                    event_count=len(storage_events),
+                    codec=codec,
+                    payload=blob,
+                )
+            )
+            sql_session.execute(
+                delete(StorageEvent).where(
+                    StorageEvent.app_name == app_name,
+                    StorageEvent.user_id == user_id,
+                    StorageEvent.session_id == session_id,
+                )
+            )
+            storage_session.state = {ARCHIVED_STATE_KEY: archived_time}
+            sql_session.commit()
+        return True
+
+    def _rehydrate(self, app_name: str, user_id: str, session_id: str) -> bool:
+        """Move an archived session back into the hot tables, if it is archived."""
+        key = (app_name, user_id, session_id)
+        with self.database_session_factory() as sql_session:
+            row = sql_session.execute(
+                select(session_archive.c.codec, session_archive.c.payload).where(
+                    session_archive.c.app_name == app_name,
+                    session_archive.c.user_id == user_id,
+                    session_archive.c.id == session_id,
+                )
+            ).first()
+            if row is None:
+                return False
+
+            # Claim the archive row before inserting anything: of two concurrent rehydrates only
+            # one deletes it, and the other waits for that commit and then finds the events hot
+            claimed = sql_session.execute(
+                delete(session_archive).where(
+                    session_archive.c.app_name == app_name,
+                    session_archive.c.user_id == user_id,
+                    session_archive.c.id == session_id,
+                )
+            )
+            if claimed.rowcount != 1:
+                sql_session.rollback()
+                return False
+
+            archived = json.loads(decompress(row.codec, row.payload))
+            owner = Session(app_name=app_name, user_id=user_id, id=session_id)
+            sql_session.add_all(
+                StorageEvent.from_event(owner, Event.model_validate(data)) for data in archived["events"]
+            )
+            storage_session = sql_session.get(StorageSession, key)
+            if storage_session is not None:
+                storage_session.state = archived["state"]
+            sql_session.commit()
+        self.rehydrated_count += 1
+        logger.info(f"SESSION_TIERING: rehydrated session {session_id} ({len(archived['events'])} events)")
+        return True
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        # A primary-key probe of the (small) archive table; hot sessions pay nothing else
+        await asyncio.to_thread(self._rehydrate, app_name, user_id, session_id)
+        return await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        with self.database_session_factory() as sql_session:
+            sql_session.execute(
+                delete(session_archive).where(
+                    session_archive.c.app_name == app_name,
+                    session_archive.c.user_id == user_id,
+                    session_archive.c.id == session_id,
+                )
+            )
+            sql_session.commit()
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    def tiering_stats(self) -> dict:
+        """Report the size of the hot and cold tiers.
+
+        Returns:
+            dict: Session and event counts per tier and compressed archive bytes
+        """
+        with self.database_session_factory() as sql_session:
+            hot_events = sql_session.scalar(select(func.count()).select_from(StorageEvent))
+            sessions = sql_session.scalar(select(func.count()).select_from(StorageSession))
+            cold_sessions, cold_events, cold_bytes = sql_session.execute(
+                select(
+                    func.count(),
+                    func.coalesce(func.sum(session_archive.c.event_count), 0),
+                    func.coalesce(func.sum(func.length(session_archive.c.payload)), 0),
+                )
+            ).one()
+        return {
+            "hot_sessions": sessions - cold_sessions,
+            "hot_events": hot_events,
+            "archived_sessions": cold_sessions,
+            "archived_events": cold_events,
+            "archive_bytes": cold_bytes,
+        }
+
+    async def run_tiering_loop(self, idle_seconds: float, interval: float = 300.0):
+        """Archive idle sessions every interval seconds until cancelled.
+
+        Args:
+            idle_seconds (float): Minimum idle time before a session goes cold
+            interval (float): Seconds between archive passes
+        """
+        while True:
+            try:
+                await self.archive_idle_sessions(idle_seconds)
+            except Exception as e:
+                logger.error(f"SESSION_TIERING: archive pass failed: {e}")
+            await asyncio.sleep(interval)
@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Optional
+
+from google.adk.memory import BaseMemoryService
+from google.adk.memory.base_memory_service import SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.adk.sessions import Session
+from google.genai.types import Content, Part
+
+from adk_extensions.bm25_memory import tokenize
+
+logger = logging.getLogger(__name__)
+
+MEMORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memories (
+    id INTEGER PRIMARY KEY,
+    partition TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    event_id TEXT,
+    author TEXT,
+    timestamp TEXT,
+    text TEXT NOT NULL,
+    seen_count INTEGER NOT NULL DEFAULT 1,
+    sources TEXT,
+    consolidated INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (partition, session_id, event_id)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+    text, partition, content='memories', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS memories_ai AFTER INSERT ON memories BEGIN
+    INSERT INTO memories_fts(rowid, text, partition) VALUES (new.id, new.text, new.partition);
+END;
+CREATE TRIGGER IF NOT EXISTS memories_ad AFTER DELETE ON memories BEGIN
+    INSERT INTO memories_fts(memories_fts, rowid, text, partition) VALUES ('delete', old.id, old.text, old.partition);
+END;
+"""
+
+# Columns added after the first release of the schema; older files are upgraded on open
+MEMORY_COLUMNS = {
+    "seen_count": "INTEGER NOT NULL DEFAULT 1",
+    "sources": "TEXT",
+    "consolidated": "INTEGER NOT NULL DEFAULT 0",
+}
+
+# Lets MemoryConsolidator find new memories without scanning consolidated ones
+PENDING_INDEX = "CREATE INDEX IF NOT EXISTS memories_pending ON memories(id) WHERE consolidated = 0"
+
+# Ranked by BM25 on the text column only; the partition column just filters
+SEARCH_SQL = """
+SELECT m.author, m.timestamp, m.text
+FROM memories_fts JOIN memories m ON m.id = memories_fts.rowid
+WHERE memories_fts MATCH ?
+ORDER BY bm25(memories_fts, 1.0, 0.0)
+LIMIT ?
+"""
+
+
+def partition_key(app_name: str, user_id: str) -> str:
+    """Single FTS token that identifies the memories of one (app, user)."""
+    return "p" + hashlib.sha1(f"{app_name}\0{user_id}".encode()).hexdigest()[:20]
+
+
+class SqliteMemoryService(BaseMemoryService):
+    """Persistent memory service backed by a SQLite FTS5 index.
+
+    Memories live in a single database file, so they survive restarts and
+    nothing is loaded at startup: opening the service only opens the file,
+    and each search reads the FTS5 postings of its query terms through the
+    page cache and mmap. Every row carries a partition token derived from
+    (app_name, user_id), and searches are restricted to it inside the FTS5
+    query, so one user's search never ranks another user's memories.
+
+    The database runs in WAL mode with one connection for writes and one for
+    reads, so searches are not blocked by an ingest in progress. Ingestion is
+    bulk: all new events of an add_session_to_memory() call (or an
+    add_memories() batch) are inserted in one transaction. Events are keyed
+    by (session, event id), so re-adding a session only inserts the events
+    it has not stored before.
+    """
+
+    # add_session_to_memory() adds to, rather than replaces, what a session stored before
+    incremental_add = True
+
+    def __init__(self, db_path: str = "memory_store.db", top_k: int = 10, mmap_bytes: int = 256 * 1024 * 1024):
+        self.db_path = db_path
+        self.top_k = top_k
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._writer = sqlite3.connect(db_path, check_same_thread=False)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints; a crash may lose the last commits
+        self._writer.executescript(MEMORY_SCHEMA)
+        existing = {row[1] for row in self._writer.execute("PRAGMA table_info(memories)")}
+        for column, definition in MEMORY_COLUMNS.items():
+            if column not in existing:
+                self._writer.execute(f"ALTER TABLE memories ADD COLUMN {column} {definition}")
+        self._writer.execute(PENDING_INDEX)
+        self._writer.commit()
+        self._reader = sqlite3.connect(db_path, check_same_thread=False)
+        self._reader.execute(f"PRAGMA mmap_size={mmap_bytes}")
+        self._reader.execute("PRAGMA query_only=ON")
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+
+    # --- ingestion ---
+
+    def _insert(self, rows: list) -> int:
+        with self._write_lock, self._writer:
+            cursor = self._writer.executemany(
+                "INSERT OR IGNORE INTO memories (partition, session_id, event_id, author, timestamp, text) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return cursor.rowcount
+
+    async def add_session_to_memory(self, session: Session):
+        partition = partition_key(session.app_name, session.user_id)
+        rows = []
+        for event in session.events:
+            if not event.content or not event.content.parts:
+                continue
+            text = " ".join(part.text for part in event.content.parts if part.text)
+            if not text.strip():
+                continue
+            timestamp = datetime.fromtimestamp(event.timestamp).isoformat()
+            rows.append((partition, session.id, event.id, event.author, timestamp, text))
+        if not rows:
+            return
+        added = await asyncio.to_thread(self._insert, rows)
+        logger.info(f"SQLITE_MEMORY: stored {added} new events from session {session.id}")
+
+    def add_memories(self, app_name: str, user_id: str, memories: list, *, session_id: str = "") -> int:
+        """Store many memories in one transaction, without building a Session (bulk loading).
+
+        Args:
+            app_name (str): Application the memories belong to
+            user_id (str): User the memories belong to
+            memories (list): Memory texts, or (text, author, timestamp) tuples
+            session_id (str): Originating session, if any
+
+        Returns:
+            int: Number of memories stored
+        """
+        partition = partition_key(app_name, user_id)
+        rows = []
+        for memory in memories:
+            text, author, timestamp = (memory, None, None) if isinstance(memory, str) else memory
+            # No event id: UNIQUE treats NULLs as distinct, so bulk rows are never deduplicated
+            rows.append((partition, session_id, None, author, timestamp, text))
+        return self._insert(rows)
+
+    # --- retrieval ---
+
+    def search(self, app_name: str, user_id: str, query: str, top_k: Optional[int] = None) -> list:
+        """Rank the user's memories against query.
+
+        Args:
+            app_name (str): Application to search
+            user_id (str): User whose memories are searched
+            query (str): Free-text query
+            top_k (int): Number of results, defaults to the service's top_k
+
+        Returns:
+            list: (author, timestamp, text) rows, best first
+        """
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+        # Terms are [a-z0-9]+, so quoting them is enough to keep FTS5 syntax out of user text
+        any_term = " OR ".join(f'"{term}"' for term in terms)
+        match = f"partition : {partition_key(app_name, user_id)} AND text : ({any_term})"
+        with self._read_lock:
+            return self._reader.execute(SEARCH_SQL, (match, top_k or self.top_k)).fetchall()
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        rows = await asyncio.to_thread(self.search, app_name, user_id, query)
+        response = SearchMemoryResponse()
+        for author, timestamp, text in rows:
+            response.memories.append(
+                MemoryEntry(
+                    content=Content(role="user" if author == "user" else "model", parts=[Part(text=text)]),
+                    author=author,
+                    timestamp=timestamp,
+                )
+            )
+        return response
+
+    # --- maintenance ---
+
+    def delete_user(self, app_name: str, user_id: str) -> int:
+        """Delete every memory of one user.
+
+        Args:
+            app_name (str): Application the user belongs to
+            user_id (str): User whose memories are deleted
+
+        Returns:
+            int: Number of memories deleted
+        """
+        with self._write_lock, self._writer:
+            cursor = self._writer.execute("DELETE FROM memories WHERE partition = ?", (partition_key(app_name, user_id),))
+            return cursor.rowcount
+
+    def optimize(self):
+        """Merge the FTS5 index segments left by many small ingests (run when idle)."""
+        with self._write_lock, self._writer:
+            self._writer.execute("INSERT INTO memories_fts(memories_fts) VALUES ('optimize')")
+
+    def stats(self) -> dict:
+        """Report store size.
+
+        Returns:
+            dict: Number of users, memories and the occurrences they stand for, and database file size in bytes
+        """
+        with self._read_lock:
+            memories, occurrences, partitions = self._reader.execute(
+                "SELECT COUNT(*), COALESCE(SUM(seen_count), 0), COUNT(DISTINCT partition) FROM memories"
+            ).fetchone()
+        size = sum(
+            os.path.getsize(self.db_path + suffix) for suffix in ("", "-wal") if os.path.exists(self.db_path + suffix)
+        )
+        return {"partitions": partitions, "memories": memories, "occurrences": occurrences, "db_bytes": size}
+
+    def close(self):
+        """Checkpoint the WAL into the database file and close it."""
+        with self._read_lock:
+            self._reader.close()
+        with self._write_lock:
+            self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._writer.close()
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import DatabaseSessionService, Session
+from google.adk.sessions import _session_util
+from google.adk.sessions.base_session_service import BaseSessionService
+from google.adk.sessions.database_session_service import (
+    StorageAppState,
+    StorageEvent,
+    StorageSession,
+    StorageUserState,
+)
+from sqlalchemy import event as sqlalchemy_event
+from sqlalchemy import select, tuple_
+
+logger = logging.getLogger(__name__)
+
+# SQLite settings for an append-heavy session store.
+# WAL lets readers run alongside the single writer, synchronous=NORMAL only
+# fsyncs at checkpoints (still crash-safe in WAL mode), and mmap plus a
+# larger page cache keep hot session pages out of read() syscalls.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # negative = KiB, i.e. 64 MiB
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+    "busy_timeout": 5000,
+}
+
+# Number of compiled statements the sqlite3 driver keeps per connection.
+# SQLAlchemy reuses identical SQL strings, so every repeated query and
+# insert runs as an already-prepared statement.
+STATEMENT_CACHE_SIZE = 256
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: Optional[dict] = None):
+    """Apply performance pragmas to a raw sqlite3 connection.
+
+    Args:
+        dbapi_connection: A sqlite3 connection
+        pragmas (Optional[dict]): Pragmas to apply, defaults to SQLITE_PRAGMAS
+    """
+    cursor = dbapi_connection.cursor()
+    for name, value in (pragmas or SQLITE_PRAGMAS).items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+class GroupCommitWriter:
+    """Batch concurrent writes into a single transaction.
+
+    Callers await submit(); the writer waits at most max_delay seconds for
+    more work to arrive (or until max_batch items are queued), then hands
+    the whole batch to commit_batch in a worker thread. One fsync is paid
+    per batch instead of per write.
+
+    commit_batch receives a list of items and returns a list of the same
+    length holding a result or an Exception for each item. If it raises,
+    the items are committed again one at a time, so a bad write fails only
+    its own caller; commit_batch must therefore raise only if nothing was
+    committed.
+    """
+
+    def __init__(self, commit_batch: Callable[[list], list], max_delay: float = 0.005, max_batch: int = 256):
+        self.commit_batch = commit_batch
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.batches = 0
+        self.items = 0
+        self._queue = None
+        self._task = None
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait until its batch has been committed.
+
+        Args:
+            item (Any): Work item understood by commit_batch
+
+        Returns:
+            Any: The per-item result returned by commit_batch
+        """
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+        future = loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(pending) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            items = [item for item, _ in pending]
+            try:
+                results = await asyncio.to_thread(self.commit_batch, items)
+            except Exception as e:
+                # Retry one by one so only the item that broke the batch fails
+                results = [await self._commit_one(item) for item in items] if len(items) > 1 else [e]
+            self.batches += 1
+            self.items += len(items)
+
+            for (_, future), result in zip(pending, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    async def _commit_one(self, item: Any) -> Any:
+        try:
+            return (await asyncio.to_thread(self.commit_batch, [item]))[0]
+        except Exception as e:
+            return e
+
+    @property
+    def average_batch_size(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
+
+
+class TunedDatabaseSessionService(DatabaseSessionService):
+    """DatabaseSessionService with SQLite tuning and group-committed appends.
+
+    Drop-in replacement for DatabaseSessionService(db_url=...). On SQLite it
+    applies SQLITE_PRAGMAS to every pooled connection and enables the sqlite3
+    statement cache. append_event calls from concurrent sessions are merged
+    by a GroupCommitWriter into one transaction per max_delay window.
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        group_commit: bool = True,
+        max_delay: float = 0.005,
+        max_batch: int = 256,
+        pragmas: Optional[dict] = None,
+        **kwargs: Any,
+    ):
+        is_sqlite = db_url.startswith("sqlite")
+        if is_sqlite:
+            connect_args = kwargs.setdefault("connect_args", {})
+            connect_args.setdefault("cached_statements", STATEMENT_CACHE_SIZE)
+        super().__init__(db_url, **kwargs)
+
+        if is_sqlite:
+            sqlalchemy_event.listen(
+                self.db_engine, "connect", lambda conn, _record: apply_sqlite_pragmas(conn, pragmas)
+            )
+            # Connections opened while creating the schema predate the listener
+            self.db_engine.dispose()
+
+        self.writer = GroupCommitWriter(self._commit_events, max_delay, max_batch) if group_commit else None
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+
+        event = self._trim_temp_delta_state(event)
+        if self.writer is not None:
+            session.last_update_time = await self.writer.submit((session, event))
+        else:
+            [result] = await asyncio.to_thread(self._commit_events, [(session, event)])
+            if isinstance(result, Exception):
+                raise result
+            session.last_update_time = result
+
+        # Also update the in-memory session
+        await BaseSessionService.append_event(self, session=session, event=event)
+        return event
+
+    def _commit_events(self, items: list) -> list:
+        """Store a batch of (session, event) pairs in one transaction.
+
+        Mirrors DatabaseSessionService.append_event for each pair and returns
+        the new update time of each session, or the error for stale sessions.
+        """
+        results = [None] * len(items)
+        touched = {}
+        keys = {(session.app_name, session.user_id, session.id) for session, _ in items}
+        with self.database_session_factory() as sql_session:
+            # One query loads every session in the batch instead of one get() per event
+            storage_sessions = self._load_storage_sessions(sql_session, keys)
+            for position, (session, event) in enumerate(items):
+                key = (session.app_name, session.user_id, session.id)
+                storage_session = storage_sessions.get(key)
+                if storage_session is None:
+                    results[position] = ValueError(f"Session {session.id} not found.")
+                    continue
+                if key not in touched and storage_session.update_timestamp_tz > session.last_update_time:
+                    results[position] = ValueError(
+                        f"The last_update_time provided in the session object {session.id} is earlier"
+                        " than the update_time in the storage_session. Please check if it is a stale session."
+                    )
+                    continue
+
+                if event.actions and event.actions.state_delta:
+                    state_deltas = _session_util.extract_state_delta(event.actions.state_delta)
+                    self._store_state_deltas(sql_session, session, storage_session, state_deltas)
+
+                sql_session.add(StorageEvent.from_event(session, event))
+                touched.setdefault(key, []).append(position)
+
+            sql_session.flush()
+
+            # Read back the new update times, again in a single query, before committing: once the
+            # commit succeeds nothing may fail, or the writer's per-item retry would store events twice
+            for key, storage_session in self._load_storage_sessions(sql_session, touched.keys()).items():
+                for position in touched[key]:
+                    results[position] = storage_session.update_timestamp_tz
+
+            sql_session.commit()
+        return results
+
+    def _store_state_deltas(self, sql_session, session: Session, storage_session: StorageSession, state_deltas: dict):
+        """Merge app, user and session state deltas into their stored state rows."""
+        if state_deltas["app"]:
+            storage_app_state = sql_session.get(StorageAppState, (session.app_name))
+            storage_app_state.state = storage_app_state.state | state_deltas["app"]
+        if state_deltas["user"]:
+            storage_user_state = sql_session.get(StorageUserState, (session.app_name, session.user_id))
+            storage_user_state.state = storage_user_state.state | state_deltas["user"]
+        if state_deltas["session"]:
+            storage_session.state = storage_session.state | state_deltas["session"]
+
+    @staticmethod
+    def _load_storage_sessions(sql_session, keys) -> dict:
+        keys = list(keys)
+        if not keys:
+            return {}
+        rows = sql_session.scalars(
+            select(StorageSession).where(
+                tuple_(StorageSession.app_name, StorageSession.user_id, StorageSession.id).in_(keys)
+            )
+        )
+        return {(row.app_name, row.user_id, row.id): row for row in rows}
@@ -0,0 +1,37 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import os
+
+# Shared by all offloaded tools; TOOL_WORKERS bounds how many run at once
+TOOL_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=int(os.environ.get("TOOL_WORKERS", "4")), thread_name_prefix="tool")
+
+
+def offloaded(func):
+    """Turn a sync, CPU-bound tool into an async one that runs on TOOL_POOL.
+
+    ADK awaits the function calls of one model response concurrently, but a
+    sync tool runs inline on the event loop, so the calls end up one after
+    another. Offloaded, the tool runs on a worker thread while the loop serves
+    the other calls. The name, docstring and signature are kept, so the
+    function declaration the model sees does not change. The call runs in a
+    copy of the caller's context, so profiling spans reach the current turn.
+
+    Usage:
+        @offloaded
+        def fees_percentage(card_type: str) -> dict:
+            ...
+
+    Args:
+        func (callable): Sync tool function
+
+    Returns:
+        callable: Async function with the same signature
+    """
+    @functools.wraps(func)
+    async def run(*args, **kwargs):
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(TOOL_POOL, call)
+
+    return run
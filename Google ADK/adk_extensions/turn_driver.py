@@ -0,0 +1,150 @@
+import contextlib
+import logging
+import sys
+import time
+from typing import Callable, Optional
+
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event
+from google.adk.runners import Runner
+from google.genai.types import Content
+
+from adk_extensions.turn_profiler import TurnProfiler
+
+logger = logging.getLogger(__name__)
+
+STREAMING_RUN_CONFIG = RunConfig(streaming_mode=StreamingMode.SSE)
+
+
+def event_text(event: Event) -> str:
+    """Join the text parts of an event (thoughts excluded) in a single pass."""
+    if not event.content or not event.content.parts:
+        return ""
+    return "".join(part.text for part in event.content.parts if part.text and not part.thought)
+
+
+def _write_stdout(text: str):
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+class TurnResult:
+    """Outcome and timing of one agent turn.
+
+    All times are in seconds from the moment the turn was submitted.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.events = 0
+        self.first_event = None
+        self.first_token = None
+        self.tool_seconds = 0.0
+        self.total = 0.0
+
+    def timing(self) -> dict:
+        """Return the turn timing rounded to milliseconds.
+
+        Returns:
+            dict: first_event_ms, first_token_ms, tool_ms, total_ms and event count
+        """
+        def ms(seconds):
+            return None if seconds is None else round(seconds * 1000, 1)
+
+        return {
+            "first_event_ms": ms(self.first_event),
+            "first_token_ms": ms(self.first_token),
+            "tool_ms": ms(self.tool_seconds),
+            "total_ms": ms(self.total),
+            "events": self.events,
+        }
+
+
+async def run_turn(
+    runner: Runner,
+    *,
+    user_id: str,
+    session_id: str,
+    message: Content,
+    run_config: Optional[RunConfig] = None,
+    write: Callable[[str], None] = _write_stdout,
+    prefix: str = "Agent: ",
+    profiler: Optional[TurnProfiler] = None,
+) -> TurnResult:
+    """Run one turn on runner.run_async and stream the agent's text as it arrives.
+
+    Partial (streamed) text is written immediately; the final event of a
+    streamed response repeats the whole text, so it is only written when no
+    partial chunk of it was shown. Events are consumed one at a time and not
+    kept, so memory use does not grow with the length of the turn.
+
+    Args:
+        runner (Runner): Runner of the agent
+        user_id (str): User of the session
+        session_id (str): Session to run the turn in
+        message (Content): New user message
+        run_config (RunConfig): Run configuration, SSE streaming by default
+        write (Callable): Sink for the streamed text, stdout by default
+        prefix (str): Written once before the first text of the turn
+        profiler (TurnProfiler): Records the turn as a Chrome trace when given (and sampled)
+
+    Returns:
+        TurnResult: Final response text and turn timing
+    """
+    result = TurnResult()
+    pending_calls = set()
+    tools_since = None  # When the current step's first outstanding call was made
+    streamed = False
+    start = time.perf_counter()
+
+    # A sampled turn is written as a Chrome trace; without a profiler this is a no-op context
+    async with profiler.turn(session_id, user_id=user_id) if profiler else contextlib.nullcontext():
+        async for event in runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=message,
+            run_config=run_config or STREAMING_RUN_CONFIG,
+        ):
+            now = time.perf_counter() - start
+            result.events += 1
+            if result.first_event is None:
+                result.first_event = now
+
+            # A tool runs between the event carrying its call and the event carrying its response.
+            # Calls of one step run concurrently, so count wall time while any call is outstanding
+            for call in event.get_function_calls():
+                if not pending_calls:
+                    tools_since = now
+                pending_calls.add(call.id)
+            for response in event.get_function_responses():
+                pending_calls.discard(response.id)
+            if tools_since is not None and not pending_calls:
+                result.tool_seconds += now - tools_since
+                tools_since = None
+
+            if event.author == "user":
+                continue
+            text = event_text(event)
+            if not text:
+                continue
+            if result.first_token is None:
+                result.first_token = now
+            if event.partial:
+                if not streamed:
+                    write(prefix)
+                    streamed = True
+                write(text)
+            elif streamed:
+                # Aggregated repeat of the chunks already written
+                write("\n")
+                streamed = False
+                result.text = text
+            else:
+                write(f"{prefix}{text}\n")
+                result.text = text
+
+    if streamed:
+        write("\n")
+    result.total = time.perf_counter() - start
+    logger.info(f"TURN_TIMING: {result.timing()}")
+    return result
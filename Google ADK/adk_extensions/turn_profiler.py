@@ -0,0 +1,274 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Optional
+
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.plugins.base_plugin import BasePlugin
+
+logger = logging.getLogger(__name__)
+
+# The trace of the turn being recorded in this context, None when not profiling
+_active_trace = contextvars.ContextVar("turn_trace", default=None)
+_NO_SPAN = contextlib.nullcontext()
+
+
+class TurnTrace:
+    """Spans of one turn, exported as Chrome trace JSON (chrome://tracing, ui.perfetto.dev).
+
+    Spans are stored as complete ("X") events. Each asyncio task (or thread,
+    outside a loop) gets its own track, so concurrent tool calls do not
+    overlap on one track and nesting within a task shows as a call stack.
+    """
+
+    def __init__(self, name: str, **args):
+        self.name = name
+        self.args = args
+        self.start = time.perf_counter()
+        self.events = []
+        self._tracks = {}
+
+    def _track(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        owner = task or threading.current_thread()
+        track = self._tracks.get(id(owner))
+        if track is None:
+            track = self._tracks[id(owner)] = len(self._tracks) + 1
+            label = task.get_name() if task else owner.name
+            self.events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": track, "args": {"name": label}})
+        return track
+
+    def begin(self) -> tuple:
+        return self._track(), time.perf_counter()
+
+    def add(self, name: str, category: str, begun: tuple, args: Optional[dict] = None):
+        """Record a span that started at begun (from begin()) and ends now."""
+        track, start = begun
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((start - self.start) * 1e6, 1),
+            "dur": round((time.perf_counter() - start) * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": track,
+            "args": args or {},
+        })
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str, args: Optional[dict] = None):
+        begun = self.begin()
+        try:
+            yield
+        finally:
+            self.add(name, category, begun, args)
+
+    def to_chrome(self) -> dict:
+        return {
+            "traceEvents": self.events,
+            "displayTimeUnit": "ms",
+            "otherData": {"turn": self.name, **{k: str(v) for k, v in self.args.items()}},
+        }
+
+
+def span(name: str, category: str = "app", **args):
+    """Context manager recording a span in the turn being profiled, if any.
+
+    When no turn is being profiled this is one context variable lookup, so
+    it can stay in hot code (MCP round trips, storage calls) permanently.
+
+    Usage:
+        with span("mcp tools/call", "mcp", tool="getTinyImage"):
+            response = await self._send_request(request)
+    """
+    trace = _active_trace.get()
+    if trace is None:
+        return _NO_SPAN
+    return trace.span(name, category, args)
+
+
+def _traced(method, name: str, category: str):
+    @functools.wraps(method)
+    async def traced(*args, **kwargs):
+        trace = _active_trace.get()
+        if trace is None:
+            return await method(*args, **kwargs)
+        begun = trace.begin()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            trace.add(name, category, begun)
+
+    return traced
+
+
+class TurnProfiler(BasePlugin):
+    """Opt-in per-turn timeline profiler; writes one Chrome trace file per turn.
+
+    As a Runner plugin it records a span for each model call (including the
+    agent's before/after model callbacks) and each tool call. Session and
+    memory services passed to instrument() get a span per read, write and
+    search, and span() marks anything else, such as MCP round trips. A turn
+    is traced from run_turn(..., profiler=...) or, for other drivers, from
+    the runner's before_run to after_run callback.
+
+    sample_rate below 1 traces that share of turns at random, for use in
+    production. Turns that are not sampled record nothing: each hook is one
+    context variable or dict lookup. Without a profiler nothing is hooked at
+    all; from_env() returns None unless TURN_PROFILE_DIR is set.
+    """
+
+    def __init__(self, output_dir: str = "turn_traces", sample_rate: float = 1.0, name: str = "turn_profiler"):
+        super().__init__(name=name)
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self._runs = {}  # invocation id -> (trace, context token or None)
+        self._open = {}  # (invocation id, span key) -> begun
+        self.traced = 0
+        self.skipped = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["TurnProfiler"]:
+        """Profiler configured by TURN_PROFILE_DIR and TURN_PROFILE_SAMPLE (default 1.0), or None."""
+        output_dir = os.environ.get("TURN_PROFILE_DIR")
+        if not output_dir:
+            return None
+        return cls(output_dir=output_dir, sample_rate=float(os.environ.get("TURN_PROFILE_SAMPLE", "1.0")))
+
+    def instrument(self, service, category: str, methods: list):
+        """Record a span for every call of the given async methods of service.
+
+        Only the instance is patched. Calls outside a profiled turn pass
+        straight through.
+
+        Args:
+            service (object): Session or memory service
+            category (str): Span category, e.g. "session" or "memory"
+            methods (list): Names of async methods to time
+        """
+        for method in methods:
+            setattr(service, method, _traced(getattr(service, method), f"{category}.{method}", category))
+
+    def start_turn(self, name: str, **args) -> Optional[tuple]:
+        """Start tracing a turn in the current context, if it is sampled.
+
+        Returns:
+            tuple: Handle for finish_turn(), or None when the turn is not traced
+        """
+        if _active_trace.get() is not None:
+            return None  # Already traced by an outer driver
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.skipped += 1
+            return None
+        trace = TurnTrace(name, **args)
+        return trace, trace.begin(), _active_trace.set(trace)
+
+    async def finish_turn(self, handle: Optional[tuple]) -> Optional[str]:
+        """Stop tracing and write the turn's trace file.
+
+        Returns:
+            str: Path of the trace file, or None when the turn was not traced
+        """
+        if handle is None:
+            return None
+        trace, begun, token = handle
+        trace.add(f"turn {trace.name}", "turn", begun, trace.args)
+        _active_trace.reset(token)
+        self.traced += 1
+        path = os.path.join(self.output_dir, f"turn-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.json")
+        await asyncio.to_thread(self._write, path, trace.to_chrome())
+        logger.info(f"TURN_PROFILE: wrote {len(trace.events)} events to {path}")
+        return path
+
+    def _write(self, path: str, data: dict):
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+    @contextlib.asynccontextmanager
+    async def turn(self, name: str, **args):
+        """Trace everything inside the block as one turn (if sampled)."""
+        handle = self.start_turn(name, **args)
+        try:
+            yield
+        finally:
+            await self.finish_turn(handle)
+
+    # Runner plugin callbacks
+
+    async def before_run_callback(self, *, invocation_context: InvocationContext):
+        trace = _active_trace.get()
+        if trace is not None:
+            self._runs[invocation_context.invocation_id] = (trace, None)
+            return None
+        handle = self.start_turn(invocation_context.session.id, agent=invocation_context.agent.name)
+        if handle is not None:
+            self._runs[invocation_context.invocation_id] = (handle[0], handle)
+        return None
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext):
+        run = self._runs.pop(invocation_context.invocation_id, None)
+        if run is not None and run[1] is not None:
+            await self.finish_turn(run[1])
+
+    def _begin(self, invocation_id: str, key):
+        run = self._runs.get(invocation_id)
+        if run is not None:
+            self._open[(invocation_id, key)] = run[0].begin()
+
+    def _end(self, invocation_id: str, key, name: str, category: str, args: Optional[dict] = None):
+        begun = self._open.pop((invocation_id, key), None)
+        if begun is not None:
+            self._runs[invocation_id][0].add(name, category, begun, args)
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        self._begin(callback_context.invocation_id, ("model", callback_context.agent_name))
+        return None
+
+    async def after_model_callback(self, *, callback_context, llm_response):
+        if llm_response.partial:
+            return None  # Streamed chunk; the span ends with the final response
+        usage = llm_response.usage_metadata
+        self._end(
+            callback_context.invocation_id,
+            ("model", callback_context.agent_name),
+            f"model {callback_context.agent_name}",
+            "model",
+            {"tokens": usage.total_token_count} if usage else None,
+        )
+        return None
+
+    async def on_model_error_callback(self, *, callback_context, llm_request, error):
+        self._end(callback_context.invocation_id, ("model", callback_context.agent_name), f"model {callback_context.agent_name}", "model", {"error": str(error)})
+        return None
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context):
+        self._begin(tool_context.invocation_id, tool_context.function_call_id)
+        return None
+
+    async def after_tool_callback(self, *, tool, tool_args, tool_context, result):
+        self._end(tool_context.invocation_id, tool_context.function_call_id, f"tool {tool.name}", "tool")
+        return None
+
+    async def on_tool_error_callback(self, *, tool, tool_args, tool_context, error):
+        self._end(tool_context.invocation_id, tool_context.function_call_id, f"tool {tool.name}", "tool", {"error": str(error)})
+        return None
+
+    def stats(self) -> dict:
+        """Report how many turns were traced and skipped by sampling.
+
+        Returns:
+            dict: Traced and skipped turn counts
+        """
+        return {"traced": self.traced, "skipped": self.skipped}
@@ -0,0 +1,436 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from datetime import datetime
+from typing import Optional
+
+import numpy
+from google.adk.memory import BaseMemoryService
+from google.adk.memory.base_memory_service import SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.adk.sessions import Session
+from google.genai.types import Content, Part
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbedder:
+    """Offline text embedder: signed feature hashing of words and character n-grams.
+
+    Each word contributes itself and the n-grams of "<word>" to a fixed-size
+    vector (the hashing trick), which is then L2-normalized. Character
+    n-grams make related word forms ("order", "ordered", "reorder") land
+    close together. No model download and no network access is needed.
+    """
+
+    def __init__(self, dim: int = 256, ngram_sizes: tuple = (3, 4)):
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+        self._cache = {}
+
+    def _word_features(self, word: str) -> tuple:
+        features = self._cache.get(word)
+        if features is None:
+            grams = [word]
+            marked = f"<{word}>"
+            for n in self.ngram_sizes:
+                grams.extend(marked[i:i + n] for i in range(len(marked) - n + 1))
+            hashes = [zlib.crc32(g.encode()) for g in grams]
+            features = ([h % self.dim for h in hashes], [1.0 if h & 0x80000000 else -1.0 for h in hashes])
+            if len(self._cache) < 200000:
+                self._cache[word] = features
+        return features
+
+    def embed(self, text: str) -> numpy.ndarray:
+        """Embed one text.
+
+        Args:
+            text (str): Text to embed
+
+        Returns:
+            numpy.ndarray: Unit-length float32 vector of size dim (all zeros for empty text)
+        """
+        indices, signs = [], []
+        for word in WORD_PATTERN.findall(text.lower()):
+            word_indices, word_signs = self._word_features(word)
+            indices.extend(word_indices)
+            signs.extend(word_signs)
+        if not indices:
+            return numpy.zeros(self.dim, dtype=numpy.float32)
+        vector = numpy.bincount(indices, weights=signs, minlength=self.dim).astype(numpy.float32)
+        norm = numpy.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_batch(self, texts: list) -> numpy.ndarray:
+        return numpy.stack([self.embed(text) for text in texts]) if texts else numpy.zeros((0, self.dim), numpy.float32)
+
+
+class _IvfIndex:
+    """Inverted-file index: vectors grouped by their nearest k-means centroid.
+
+    The owner stores its rows list by list, so list p is rows
+    offsets[p]:offsets[p + 1] of the first count rows.
+    """
+
+    def __init__(self, centroids: numpy.ndarray, offsets: numpy.ndarray, count: int):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.count = count
+
+    @classmethod
+    def build(cls, matrix: numpy.ndarray, count: int, iterations: int = 8, seed: int = 0) -> tuple:
+        """Cluster the first count rows of matrix.
+
+        Returns:
+            tuple: The index, and the row order that groups the rows by list
+        """
+        nlist = max(1, int(numpy.sqrt(count)))
+        rng = numpy.random.default_rng(seed)
+        sample = matrix[rng.choice(count, size=min(count, nlist * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = numpy.argmax(sample @ centroids.T, axis=1)
+            sums = numpy.zeros_like(centroids)
+            numpy.add.at(sums, assignment, sample)
+            empty = numpy.bincount(assignment, minlength=nlist) == 0
+            sums[empty] = centroids[empty]
+            centroids = sums / numpy.maximum(numpy.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+        centroids = centroids.astype(numpy.float32)
+
+        # Assign every vector in chunks to keep the score matrix small
+        assignment = numpy.empty(count, dtype=numpy.int32)
+        for start in range(0, count, 65536):
+            block = numpy.asarray(matrix[start:min(start + 65536, count)])
+            assignment[start:start + len(block)] = numpy.argmax(block @ centroids.T, axis=1)
+        offsets = numpy.concatenate([[0], numpy.cumsum(numpy.bincount(assignment, minlength=nlist))])
+        return cls(centroids, offsets, count), numpy.argsort(assignment, kind="stable")
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            numpy.savez(f, centroids=self.centroids, offsets=self.offsets, count=self.count)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @classmethod
+    def load(cls, path: str) -> "_IvfIndex":
+        with numpy.load(path) as data:
+            return cls(data["centroids"], data["offsets"], int(data["count"]))
+
+    def probe(self, query: numpy.ndarray, nprobe: int) -> list:
+        """Row ranges of the nprobe lists whose centroids are closest to query."""
+        nprobe = min(nprobe, len(self.centroids))
+        probes = numpy.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return [(self.offsets[p], self.offsets[p + 1]) for p in probes]
+
+
+class _UserVectors:
+    """Contiguous float32 embedding matrix and metadata for one (app, user).
+
+    With a directory, the matrix is a numpy.memmap over <key>.f32 that grows
+    by doubling, and metadata is appended to <key>.jsonl, so memories
+    survive restarts and are paged in by the OS on demand. Building the IVF
+    index writes the reordered rows, metadata and centroids under a new
+    generation; <key>.manifest names the generation in use and is replaced
+    last, so a crash part-way through leaves the previous, consistent set
+    in place, and a restart reuses the saved index.
+    """
+
+    def __init__(self, dim: int, path: Optional[str]):
+        self.dim = dim
+        self.path = path
+        self.generation = 0
+        self.meta = []
+        self.count = 0
+        self.matrix = numpy.zeros((1024, dim), dtype=numpy.float32)
+        self.ivf = None
+        self.building = False
+        if path is not None:
+            self._load()
+
+    def _file(self, suffix: str, generation: Optional[int] = None) -> str:
+        generation = self.generation if generation is None else generation
+        return (f"{self.path}.g{generation}" if generation else self.path) + suffix
+
+    def _load(self):
+        if os.path.exists(self.path + ".manifest"):
+            with open(self.path + ".manifest") as f:
+                self.generation = json.load(f)["generation"]
+            if os.path.exists(self._file(".ivf.npz")):
+                self.ivf = _IvfIndex.load(self._file(".ivf.npz"))
+        if os.path.exists(self._file(".jsonl")):
+            with open(self._file(".jsonl")) as f:
+                self.meta = [json.loads(line) for line in f if line.strip()]
+        rows = os.path.getsize(self._file(".f32")) // (4 * self.dim) if os.path.exists(self._file(".f32")) else 0
+        # A crash between the vector and metadata writes leaves at most a few unmatched rows
+        self.count = min(len(self.meta), rows)
+        self.meta = self.meta[:self.count]
+        self._map(max(1024, rows))
+
+    def _map(self, capacity: int):
+        if self.path is None:
+            grown = numpy.zeros((capacity, self.dim), dtype=numpy.float32)
+            grown[:self.count] = self.matrix[:self.count]
+            self.matrix = grown
+            return
+        if isinstance(self.matrix, numpy.memmap):
+            self.matrix.flush()
+        with open(self._file(".f32"), "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        self.matrix = numpy.memmap(self._file(".f32"), dtype=numpy.float32, mode="r+", shape=(capacity, self.dim))
+
+    def append(self, vectors: numpy.ndarray, metas: list):
+        needed = self.count + len(vectors)
+        if needed > len(self.matrix):
+            capacity = len(self.matrix)
+            while capacity < needed:
+                capacity *= 2
+            self._map(capacity)
+        self.matrix[self.count:needed] = vectors
+        if self.path is not None:
+            with open(self._file(".jsonl"), "a") as f:
+                f.writelines(json.dumps(meta) + "\n" for meta in metas)
+        self.meta.extend(metas)
+        self.count = needed
+
+    def needs_index(self, ivf_threshold: int) -> bool:
+        # Rebuild when the corpus has doubled; newer rows are scanned exactly until then
+        return not self.building and self.count >= ivf_threshold and (self.ivf is None or self.count >= 2 * self.ivf.count)
+
+    def build_index(self, lock: threading.Lock):
+        """Build the IVF index and store the rows list by list.
+
+        Clustering and copying the rows it covers run without the lock, so
+        searches and appends continue meanwhile; rows appended in the
+        meantime are copied over under the lock, just before the swap.
+        """
+        with lock:
+            count, matrix, generation = self.count, self.matrix, self.generation + 1
+        ivf, order = _IvfIndex.build(matrix, count)
+        meta = [self.meta[i] for i in order]
+
+        if self.path is None:
+            reordered = numpy.zeros(matrix.shape, dtype=numpy.float32)
+        else:
+            reordered = numpy.memmap(self._file(".f32", generation), dtype=numpy.float32, mode="w+", shape=matrix.shape)
+        for start in range(0, count, 65536):
+            end = min(start + 65536, count)
+            reordered[start:end] = matrix[order[start:end]]
+        if self.path is not None:
+            with open(self._file(".jsonl", generation), "w") as f:
+                f.writelines(json.dumps(entry) + "\n" for entry in meta)
+
+        with lock:
+            if len(self.matrix) > len(reordered):
+                if self.path is None:
+                    grown = numpy.zeros(self.matrix.shape, dtype=numpy.float32)
+                    grown[:count] = reordered[:count]
+                    reordered = grown
+                else:
+                    reordered.flush()
+                    with open(self._file(".f32", generation), "ab") as f:
+                        f.truncate(self.matrix.nbytes)
+                    reordered = numpy.memmap(self._file(".f32", generation), dtype=numpy.float32, mode="r+", shape=self.matrix.shape)
+            reordered[count:self.count] = self.matrix[count:self.count]
+            meta.extend(self.meta[count:])
+            if self.path is not None:
+                reordered.flush()
+                with open(self._file(".jsonl", generation), "a") as f:
+                    f.writelines(json.dumps(entry) + "\n" for entry in meta[count:])
+                    f.flush()
+                    os.fsync(f.fileno())
+                ivf.save(self._file(".ivf.npz", generation))
+                self._switch(generation)
+            self.matrix, self.meta, self.ivf = reordered, meta, ivf
+
+    def _switch(self, generation: int):
+        """Atomically make generation the live one and delete the files of the previous one."""
+        with open(self.path + ".manifest.tmp", "w") as f:
+            json.dump({"generation": generation}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.path + ".manifest.tmp", self.path + ".manifest")
+        previous, self.generation = self.generation, generation
+        for suffix in (".f32", ".jsonl", ".ivf.npz"):
+            if os.path.exists(self._file(suffix, previous)):
+                os.remove(self._file(suffix, previous))
+
+    def search(self, query: numpy.ndarray, top_k: int, nprobe: int) -> list:
+        if self.count == 0:
+            return []
+        if self.ivf is None:
+            rows = None
+            scores = self.matrix[:self.count] @ query
+        else:
+            # Each list is a contiguous block of rows, so it is scored without gathering
+            ranges = self.ivf.probe(query, nprobe) + [(self.ivf.count, self.count)]
+            rows = numpy.concatenate([numpy.arange(start, end) for start, end in ranges])
+            scores = numpy.concatenate([self.matrix[start:end] @ query for start, end in ranges])
+
+        k = min(top_k, len(scores))
+        best = numpy.argpartition(-scores, k - 1)[:k]
+        best = best[numpy.argsort(-scores[best])]
+        return [(float(scores[i]), int(i if rows is None else rows[i])) for i in best]
+
+
+class VectorMemoryService(BaseMemoryService):
+    """Semantic memory service over local hashed embeddings.
+
+    Every event is embedded once, when it is added, into a per-user float32
+    matrix (memory-mapped under storage_dir when given). Searches below
+    ivf_threshold vectors are exact: one matrix-vector product and an
+    argpartition. Above it, an IVF index (k-means lists, about sqrt(n) of
+    them) limits the scan to the nprobe lists nearest to the query.
+    search_memory() starts the index build in a worker thread once a user
+    crosses the threshold (and again when their corpus doubles); searches
+    stay exact until it is swapped in.
+
+    add_session_to_memory() only embeds events that were not added before,
+    so it can be called after every turn.
+    """
+
+    # add_session_to_memory() adds to, rather than replaces, what a session stored before
+    incremental_add = True
+
+    def __init__(
+        self,
+        storage_dir: Optional[str] = None,
+        embedder: Optional[HashingEmbedder] = None,
+        top_k: int = 10,
+        ivf_threshold: int = 50000,
+        nprobe: int = 32,
+        min_score: float = 0.1,
+    ):
+        self.embedder = embedder or HashingEmbedder()
+        self.storage_dir = storage_dir
+        self.top_k = top_k
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.min_score = min_score
+        self._users = {}
+        self._indexed_events = {}
+        self._lock = threading.Lock()
+        self._builds = set()
+        if storage_dir is not None:
+            os.makedirs(storage_dir, exist_ok=True)
+
+    def _user(self, app_name: str, user_id: str) -> _UserVectors:
+        key = (app_name, user_id)
+        store = self._users.get(key)
+        if store is None:
+            path = None
+            if self.storage_dir is not None:
+                # Hash the key so any app or user id is a safe file name
+                path = os.path.join(self.storage_dir, hashlib.sha1(f"{app_name}/{user_id}".encode()).hexdigest())
+            store = self._users[key] = _UserVectors(self.embedder.dim, path)
+            self._indexed_events[key] = {meta.get("event_id") for meta in store.meta}
+        return store
+
+    async def add_session_to_memory(self, session: Session):
+        texts, metas = [], []
+        with self._lock:
+            store = self._user(session.app_name, session.user_id)
+            indexed = self._indexed_events[(session.app_name, session.user_id)]
+            for event in session.events:
+                if event.id in indexed or not event.content or not event.content.parts:
+                    continue
+                text = " ".join(part.text for part in event.content.parts if part.text)
+                indexed.add(event.id)
+                if not text.strip():
+                    continue
+                texts.append(text)
+                metas.append({
+                    "text": text,
+                    "author": event.author,
+                    "timestamp": datetime.fromtimestamp(event.timestamp).isoformat(),
+                    "session_id": session.id,
+                    "event_id": event.id,
+                })
+            if texts:
+                store.append(self.embedder.embed_batch(texts), metas)
+        logger.info(f"VECTOR_MEMORY: embedded {len(texts)} new events from session {session.id}")
+
+    def add_vectors(self, app_name: str, user_id: str, vectors: numpy.ndarray, metas: list):
+        """Append precomputed unit vectors with their metadata (bulk loading).
+
+        Args:
+            app_name (str): Application the memories belong to
+            user_id (str): User the memories belong to
+            vectors (numpy.ndarray): (n, dim) float32 unit vectors
+            metas (list): n dicts with at least "text", optionally "author" and "timestamp"
+        """
+        with self._lock:
+            self._user(app_name, user_id).append(numpy.asarray(vectors, dtype=numpy.float32), metas)
+
+    def search(self, app_name: str, user_id: str, query: str, top_k: Optional[int] = None) -> list:
+        """Return the user's memories closest to query.
+
+        Args:
+            app_name (str): Application to search
+            user_id (str): User whose memories are searched
+            query (str): Free-text query
+            top_k (int): Number of results, defaults to the service's top_k
+
+        Returns:
+            list: (cosine similarity, metadata dict) pairs, best first
+        """
+        vector = self.embedder.embed(query)
+        if not vector.any():
+            return []
+        with self._lock:
+            store = self._user(app_name, user_id)
+            hits = store.search(vector, top_k or self.top_k, self.nprobe)
+            return [(score, store.meta[row]) for score, row in hits if score >= self.min_score]
+
+    def build_index(self, app_name: str, user_id: str) -> bool:
+        """Build (or rebuild) a user's IVF index if their corpus calls for one.
+
+        Blocks for the whole build; search_memory() runs it in a worker thread.
+
+        Returns:
+            bool: Whether an index was built
+        """
+        with self._lock:
+            store = self._user(app_name, user_id)
+            if not store.needs_index(self.ivf_threshold):
+                return False
+            store.building = True
+        try:
+            store.build_index(self._lock)
+        finally:
+            store.building = False
+        logger.info(f"VECTOR_MEMORY: built IVF index with {len(store.ivf.centroids)} lists over {store.ivf.count} vectors")
+        return True
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        with self._lock:
+            needs_index = self._user(app_name, user_id).needs_index(self.ivf_threshold)
+        if needs_index:
+            task = asyncio.create_task(asyncio.to_thread(self.build_index, app_name, user_id))
+            self._builds.add(task)
+            task.add_done_callback(self._builds.discard)
+
+        response = SearchMemoryResponse()
+        for _, meta in self.search(app_name, user_id, query):
+            author = meta.get("author")
+            response.memories.append(
+                MemoryEntry(
+                    content=Content(role="user" if author == "user" else "model", parts=[Part(text=meta["text"])]),
+                    author=author,
+                    timestamp=meta.get("timestamp"),
+                )
+            )
+        return response
+
+    def flush(self):
+        """Write memory-mapped vectors to disk."""
+        with self._lock:
+            for store in self._users.values():
+                if isinstance(store.matrix, numpy.memmap):
+                    store.matrix.flush()
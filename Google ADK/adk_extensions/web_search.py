@@ -0,0 +1,240 @@
+import abc
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+QUERY_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: lowercase words, punctuation and extra spaces removed."""
+    return " ".join(QUERY_PATTERN.findall(query.lower()))
+
+
+class SearchProvider(abc.ABC):
+    """A web search backend. Results are dicts with title, url and snippet."""
+
+    name = "search"
+
+    @abc.abstractmethod
+    async def search(self, query: str, *, max_results: int = 5) -> list:
+        """Run query against the backend.
+
+        Args:
+            query (str): Search query as typed by the user or agent
+            max_results (int): Maximum number of results
+
+        Returns:
+            list: Result dicts with title, url and snippet
+        """
+
+
+class LocalSearchProvider(SearchProvider):
+    """Offline stand-in for a web search API, for demos, tests and benchmarks.
+
+    Returns deterministic results for any query after latency seconds, and
+    counts how often it was called, which is what the caching layer is meant
+    to keep down.
+    """
+
+    name = "local"
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.calls = 0
+
+    async def search(self, query: str, *, max_results: int = 5) -> list:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        slug = "-".join(QUERY_PATTERN.findall(query.lower())) or "search"
+        return [
+            {
+                "title": f"{query} - result {rank}",
+                "url": f"https://example.com/{slug}/{rank}",
+                "snippet": f"Simulated result {rank} for '{query}'.",
+            }
+            for rank in range(1, max_results + 1)
+        ]
+
+
+class TokenBucket:
+    """Async token bucket: at most capacity calls at once, refilled at rate per second."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.waits = 0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # The lock queues waiters in arrival order, so refilled tokens go to the oldest caller
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                self.waits += 1
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class _CacheEntry:
+    __slots__ = ("results", "max_results", "fetched_at")
+
+    def __init__(self, results: list, max_results: int, fetched_at: float):
+        self.results = results
+        self.max_results = max_results  # What was asked for; the provider may have found fewer
+        self.fetched_at = fetched_at
+
+
+class CachedSearch:
+    """Caching, coalescing and rate-limiting front for a SearchProvider.
+
+    - Queries are cached under their normalized form for ttl seconds, so
+      "Weather today?" and "weather  today" share one entry.
+    - Concurrent misses for the same query share one provider call
+      (single-flight) if it asks for at least as many results as they
+      need; the other callers await its result.
+    - Provider calls go through a token bucket (rate per second, burst).
+    - An entry older than ttl but younger than stale_ttl is returned at once
+      while a background call refreshes it (stale-while-revalidate). If the
+      provider fails, the stale entry is served instead of the error.
+
+    Provider calls therefore grow with the number of distinct queries per
+    ttl, not with the number of users asking them.
+    """
+
+    def __init__(
+        self,
+        provider: SearchProvider,
+        ttl: float = 300.0,
+        stale_ttl: float = 3600.0,
+        rate: float = 5.0,
+        burst: int = 10,
+        max_entries: int = 10000,
+    ):
+        self.provider = provider
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.bucket = TokenBucket(rate, burst)
+        self._cache = OrderedDict()
+        self._inflight = {}  # normalized query -> {max_results: future}
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.provider_calls = 0
+        self.errors = 0
+
+    def _fetch(self, key: str, query: str, max_results: int) -> asyncio.Future:
+        flights = self._inflight.setdefault(key, {})
+        # Join a call only if it fetches at least as many results as this caller needs
+        for fetching, future in flights.items():
+            if fetching >= max_results:
+                self.coalesced += 1
+                return future
+        future = asyncio.ensure_future(self._call_provider(key, query, max_results))
+        flights[max_results] = future
+        future.add_done_callback(lambda f: self._finished(key, max_results, f))
+        return future
+
+    def _finished(self, key: str, max_results: int, future: asyncio.Future):
+        flights = self._inflight.get(key, {})
+        flights.pop(max_results, None)
+        if not flights:
+            self._inflight.pop(key, None)
+        if not future.cancelled():
+            # Mark a failure as seen: a background refresh, or a call whose callers were all
+            # cancelled, has nobody awaiting it. Callers that do await still get the exception.
+            future.exception()
+
+    async def _call_provider(self, key: str, query: str, max_results: int) -> list:
+        await self.bucket.acquire()
+        self.provider_calls += 1
+        try:
+            results = await self.provider.search(query, max_results=max_results)
+        except Exception:
+            self.errors += 1
+            raise
+        now = time.monotonic()
+        entry = self._cache.get(key)
+        # A smaller call that finishes after a larger one must not shrink a fresh entry
+        if entry is None or entry.max_results <= max_results or now - entry.fetched_at >= self.ttl:
+            self._cache[key] = _CacheEntry(results, max_results, now)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return results
+
+    async def search(self, query: str, *, max_results: int = 5) -> list:
+        """Search through the cache.
+
+        Args:
+            query (str): Search query
+            max_results (int): Maximum number of results
+
+        Returns:
+            list: Result dicts with title, url and snippet
+        """
+        key = normalize_query(query)
+        entry = self._cache.get(key)
+        age = time.monotonic() - entry.fetched_at if entry is not None else None
+
+        if entry is not None and age < self.ttl and entry.max_results >= max_results:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return entry.results[:max_results]
+
+        if entry is not None and age < self.stale_ttl and entry.max_results >= max_results:
+            self.stale_hits += 1
+            self._fetch(key, query, max_results)
+            return entry.results[:max_results]
+
+        self.misses += 1
+        try:
+            # shield: a caller that is cancelled must not cancel the call other callers share
+            return (await asyncio.shield(self._fetch(key, query, max_results)))[:max_results]
+        except Exception as e:
+            if entry is not None:
+                logger.warning(f"WEB_SEARCH: {self.provider.name} failed, serving stale results for '{key}': {e}")
+                return entry.results[:max_results]
+            raise
+
+    def stats(self) -> dict:
+        """Report cache effectiveness.
+
+        Returns:
+            dict: Hits, stale hits, misses, coalesced misses, provider calls, rate-limit waits and errors
+        """
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "lookups": lookups,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "provider_calls": self.provider_calls,
+            "rate_limit_waits": self.bucket.waits,
+            "errors": self.errors,
+            "cached_queries": len(self._cache),
+        }
+
+
+def format_results(query: str, results: list) -> str:
+    """Render search results as plain text for a tool response."""
+    if not results:
+        return f"No search results for '{query}'."
+    lines = [f"Search results for '{query}':"]
+    for rank, result in enumerate(results, 1):
+        lines.append(f"{rank}. {result['title']} ({result['url']})\n   {result['snippet']}")
+    return "\n".join(lines)
@@ -2,71 +2,136 @@ from google.adk.agents import Agent
 from google.adk.tools.agent_tool import AgentTool
 from google.adk.code_executors import BuiltInCodeExecutor
 import asyncio
+import itertools
 import json
+import os
+import shlex
 import subprocess
 import sys
 
+from adk_extensions.response_cache import ModelResponseCache
+from adk_extensions.tool_pool import offloaded
+from adk_extensions.turn_profiler import span
+
 # MCP Server Integration
+# Command that starts the MCP server, split with shlex, so quote paths with spaces. To run offline from "Google ADK":
+#   MCP_SERVER_COMMAND='python "../MS Agent Framework/mcp_stub_server.py"'
+MCP_SERVER_COMMAND = os.environ.get("MCP_SERVER_COMMAND", "npx -y @modelcontextprotocol/server-everything stdio")
+# Seconds to wait for one MCP response before the tool call fails
+MCP_TIMEOUT = float(os.environ.get("MCP_TIMEOUT", "10"))
+
 class MCPClient:
-    def __init__(self):
+    """JSON-RPC client for one MCP server process over stdio.
+
+    Requests are multiplexed: each gets its own id, and a reader task hands
+    every response to the request with that id, so concurrent tool calls
+    (e.g. two get_tiny_image calls in one model response) share the server
+    process without waiting for each other.
+    """
+
+    def __init__(self, command: str = MCP_SERVER_COMMAND, timeout: float = MCP_TIMEOUT):
+        self.command = command
+        self.timeout = timeout
         self.process = None
         self.initialized = False
-        
+        self._ids = itertools.count(1)
+        self._pending = {}  # request id -> future of its response
+        self._reader = None
+        self._start_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+
     async def initialize(self):
         if self.initialized:
             return
-            
-        # Start the MCP everything server
-        self.process = await asyncio.create_subprocess_exec(
-            'npx', '-y', '@modelcontextprotocol/server-everything', 'stdio',
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-        
-        # Initialize MCP connection
-        await self._send_request({"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}})
-        self.initialized = True
-        
+        async with self._start_lock:
+            if self.initialized:
+                return
+
+            # Start the MCP everything server
+            self.process = await asyncio.create_subprocess_exec(
+                *shlex.split(self.command),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+            self._reader = asyncio.create_task(self._read_responses())
+
+            # Initialize MCP connection; a server that never answers is stopped so the next call starts afresh
+            try:
+                await self._send_request({"jsonrpc": "2.0", "method": "initialize", "params": {}})
+            except Exception:
+                if self.process.returncode is None:
+                    self.process.kill()
+                self.process = None
+                raise
+            self.initialized = True
+
+    async def _read_responses(self):
+        try:
+            while True:
+                line = await self.process.stdout.readline()
+                if not line:
+                    break
+                message = json.loads(line.decode())
+                # Server-to-client requests and notifications carry a method; only responses are routed
+                if "method" not in message:
+                    future = self._pending.pop(message.get("id"), None)
+                    if future is not None and not future.done():
+                        future.set_result(message)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(Exception("No response from MCP server"))
+            self._pending.clear()
+            self.initialized = False
+
     async def _send_request(self, request):
         if not self.process:
             raise Exception("MCP server not initialized")
-            
-        # Send request
-        request_json = json.dumps(request) + "\n"
-        self.process.stdin.write(request_json.encode())
-        await self.process.stdin.drain()
-        
-        # Read response
-        response_line = await self.process.stdout.readline()
-        if not response_line:
-            raise Exception("No response from MCP server")
-            
-        response = json.loads(response_line.decode().strip())
-        return response
-        
+
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        # One round trip to the MCP server; a span in the turn's trace when profiling
+        with span(f"mcp {request['method']}", "mcp"):
+            try:
+                async with self._write_lock:
+                    self.process.stdin.write((json.dumps({**request, "id": request_id}) + "\n").encode())
+                    await self.process.stdin.drain()
+                return await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                raise Exception(f"No response from MCP server within {self.timeout:g}s") from None
+            finally:
+                self._pending.pop(request_id, None)
+
     async def call_tool(self, tool_name, **kwargs):
         await self.initialize()
-        
+
         request = {
             "jsonrpc": "2.0",
-            "id": 2,
             "method": "tools/call",
             "params": {
                 "name": tool_name,
                 "arguments": kwargs
             }
         }
-        
+
         response = await self._send_request(request)
         if "error" in response:
             raise Exception(f"MCP error: {response['error']}")
-            
+
         return response.get("result", {})
 
-# Global MCP client instance
-mcp_client = MCPClient()
+# Shared MCP client, created on first use so importing the agent stays cheap
+_mcp_client = None
+
+def get_mcp_client() -> MCPClient:
+    global _mcp_client
+    if _mcp_client is None:
+        _mcp_client = MCPClient()
+    return _mcp_client
 
+@offloaded
 def fees_percentage(card_type: str) -> dict:
     """Determines the fees percentage based on the card type.
 
@@ -92,6 +157,7 @@ def fees_percentage(card_type: str) -> dict:
         print(f"DEBUG: fees_percentage result: {result}")
         return result
 
+@offloaded
 def get_conversion_rate(from_currency: str, to_currency: str) -> dict:
     """Determines the conversion rate between two currencies.
 
@@ -123,36 +189,18 @@ def get_conversion_rate(from_currency: str, to_currency: str) -> dict:
 async def mcp_get_tiny_image() -> str:
     """Get a tiny test image using MCP server."""
     try:
-        result = await mcp_client.call_tool("getTinyImage")
+        result = await get_mcp_client().call_tool("getTinyImage")
         return result.get("content", [{}])[0].get("text", "No response")
     except Exception as e:
         return f"Error calling MCP getTinyImage: {e}"
 
-# Synchronous wrapper for Google ADK
-def get_tiny_image() -> str:
+# Async, so ADK awaits it on the event loop alongside the other calls of the same model response
+async def get_tiny_image() -> str:
     """Get a tiny test image using MCP server."""
     print("DEBUG: get_tiny_image called")
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, mcp_get_tiny_image())
-                result = future.result(timeout=10)  # Add timeout to prevent hanging
-                print(f"DEBUG: get_tiny_image result: {result[:100]}...")
-                return result
-        else:
-            result = loop.run_until_complete(mcp_get_tiny_image())
-            print(f"DEBUG: get_tiny_image result: {result[:100]}...")
-            return result
-    except RuntimeError:
-        result = asyncio.run(mcp_get_tiny_image())
-        print(f"DEBUG: get_tiny_image RuntimeError result: {result[:100]}...")
-        return result
-    except Exception as e:
-        error_msg = f"Error: {e}"
-        print(f"DEBUG: get_tiny_image error: {error_msg}")
-        return error_msg
+    result = await mcp_get_tiny_image()
+    print(f"DEBUG: get_tiny_image result: {result[:100]}...")
+    return result
 
 calculation_agent = Agent(
     name="calculation_agent",
@@ -168,4 +216,9 @@ root_agent = Agent(
     description="Agent to convert currency and calculate conversion fees using specialized tools",
     instruction="You are a helpful agent for currency conversion. Use the fees_percentage tool to get the fee based on card type, get_conversion_rate to get the exchange rate, and then use the calculation_agent to compute the total amount accurately via code execution. Fees are deducted from the sending currency amount before conversion. When providing conversion results, use the get_tiny_image tool to return tiny images representing both the source and target currencies being converted. Ensure no calculations are done by the LLM; delegate to the calculation_agent.",
     tools=[fees_percentage, get_conversion_rate, AgentTool(agent=calculation_agent), get_tiny_image],
-)
\ No newline at end of file
+)
+
+# Opt-in cache of model responses for repeated requests; off unless ADK_RESPONSE_CACHE is set
+response_cache = ModelResponseCache.from_env()
+if response_cache:
+    response_cache.attach(root_agent)
@@ -1,10 +1,13 @@
 from google.adk.agents import Agent
-from google.adk.sessions import DatabaseSessionService, Session
-from google.adk.runners import Runner, RunConfig
 from google.genai.types import ContextWindowCompressionConfig, SlidingWindow
-import sqlite3
 import os
 
+from adk_extensions.context_assembler import ContextAssembler
+
+# History budget for every model call, matching the documented sliding window
+COMPRESSION_CONFIG = ContextWindowCompressionConfig(sliding_window=SlidingWindow(target_tokens=1000))
+context_assembler = ContextAssembler(target_tokens=COMPRESSION_CONFIG.sliding_window.target_tokens)
+
 # Tool to explain database session concepts
 def explain_database_session_concepts() -> str:
     """Explain persistent session management with database storage.
@@ -107,6 +110,7 @@ def display_database_session_data() -> str:
     """
     try:
         if os.path.exists('sessions.db'):
+            import sqlite3  # Only needed when the tool is called
             conn = sqlite3.connect('sessions.db')
             cursor = conn.cursor()
 
@@ -154,6 +158,7 @@ def show_compaction_status() -> str:
     """
     try:
         if os.path.exists('sessions.db'):
+            import sqlite3  # Only needed when the tool is called
             conn = sqlite3.connect('sessions.db')
             cursor = conn.cursor()
 
@@ -213,4 +218,6 @@ When asked to demonstrate database sessions, compaction, or how persistent memor
 
 Always be ready to switch between general chat and demonstrating database session concepts.""",
     tools=[explain_database_session_concepts, demonstrate_compaction_behavior, explain_database_inspection, display_database_session_data, show_compaction_status],
+    include_contents="none",  # History is assembled by context_assembler
+    before_model_callback=context_assembler.before_model_callback,
 )
\ No newline at end of file
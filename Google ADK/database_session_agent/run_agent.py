@@ -1,28 +1,47 @@
 from google.adk.agents import Agent
 from google.adk.sessions import DatabaseSessionService, Session
-from google.adk.runners import Runner, RunConfig
+from google.adk.runners import Runner
 from google.genai.types import ContextWindowCompressionConfig, SlidingWindow, Content, Part
 import asyncio
 import os
+import sys
 
-# Set dummy API key for testing (replace with real key for actual use)
-os.environ['GOOGLE_API_KEY'] = 'dummy_key_for_testing'
+# Make the shared adk_extensions package importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import the agent from the agent module
 import agent
-root_agent = agent.root_agent
+from adk_extensions.delta_state import DeltaStateDatabaseSessionService
+from adk_extensions.replay_llm import model_from_env
+from adk_extensions.turn_driver import run_turn
+from adk_extensions.turn_profiler import TurnProfiler
+# ADK_MODEL_MODE=replay runs against recorded cassettes, without an API key
+root_agent = model_from_env(agent.root_agent)
+
+# Sessions idle for longer than this are archived (rehydrated on next access)
+SESSION_IDLE_SECONDS = 7 * 24 * 3600
 
 async def main():
-    # Configure DatabaseSessionService (basic setup without compression for now)
-    session_service = DatabaseSessionService(
+    # Configure the database session service: WAL, tuned pragmas, group-committed appends,
+    # a compressed archive for idle sessions and delta-encoded state
+    session_service = DeltaStateDatabaseSessionService(
         db_url="sqlite:///sessions.db"
     )
 
+    # Move sessions idle for longer than a week out of the hot tables
+    await session_service.archive_idle_sessions(idle_seconds=SESSION_IDLE_SECONDS)
+
+    # TURN_PROFILE_DIR=traces writes each turn as a Chrome trace (TURN_PROFILE_SAMPLE=0.01 to sample)
+    profiler = TurnProfiler.from_env()
+    if profiler:
+        profiler.instrument(session_service, "session", ["get_session", "append_event"])
+
     # Create runner with database session service
     runner = Runner(
         agent=root_agent,
         session_service=session_service,
-        app_name="database_session_demo_agent"
+        app_name="database_session_demo_agent",
+        plugins=[profiler] if profiler else None
     )
 
     # Create a new session
@@ -37,7 +56,8 @@ async def main():
     print("Type 'quit' to exit.\n")
 
     while True:
-        user_input = input("You: ")
+        # Read input off the event loop so background session work keeps running
+        user_input = await asyncio.to_thread(input, "You: ")
         if user_input.lower() in ['quit', 'exit']:
             print("Goodbye!")
             break
@@ -46,25 +66,15 @@ async def main():
             # Create message content
             message = Content(parts=[Part(text=user_input)])
             
-            # Run the agent with the persistent session
-            events = list(runner.run(
+            # Run the agent with the persistent session, streaming its reply as it is generated
+            # (run_turn logs a TURN_TIMING line at INFO level)
+            await run_turn(
+                runner,
                 user_id="demo_user",
                 session_id=session.id,
-                new_message=message
-            ))
-            
-            # Get the final response
-            for event in events:
-                if hasattr(event, 'content') and event.content:
-                    # Extract text from the response content
-                    response_text = ""
-                    if event.content.parts:
-                        for part in event.content.parts:
-                            if part.text:
-                                response_text += part.text
-                    if response_text:
-                        print(f"Agent: {response_text}")
-                        break
+                message=message,
+                profiler=profiler
+            )
         except Exception as e:
             print(f"Error: {e}")
 
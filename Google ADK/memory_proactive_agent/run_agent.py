@@ -1,35 +1,76 @@
 from google.adk.agents import Agent
-from google.adk.memory import InMemoryMemoryService
-from google.adk.runners import Runner, RunConfig
-from google.adk.sessions import InMemorySessionService
+from google.adk.apps import App
+from google.adk.runners import Runner
 from google.genai.types import Content, Part
-from google.adk.tools.preload_memory_tool import PreloadMemoryTool
-from google.adk.tools.tool_context import ToolContext
 import asyncio
 import logging
 import os
+import sys
+
+# Make the shared adk_extensions package importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import the agent from the agent module
 import agent
-root_agent = agent.root_agent
+from adk_extensions.bm25_memory import BM25MemoryService
+from adk_extensions.bounded_sessions import BoundedInMemorySessionService
+from adk_extensions.memory_consolidation import MemoryConsolidator
+from adk_extensions.memory_ingest import IncrementalMemoryIngestor
+from adk_extensions.replay_llm import model_from_env
+from adk_extensions.sqlite_memory import SqliteMemoryService
+from adk_extensions.turn_driver import run_turn
+from adk_extensions.turn_profiler import TurnProfiler
+# ADK_MODEL_MODE=replay runs against recorded cassettes, without an API key
+root_agent = model_from_env(agent.root_agent)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+MAX_RESIDENT_SESSION_BYTES = 64 * 1024 * 1024
+
+# "sqlite" (persistent keyword), "bm25" (in-process keyword) or "vector" (semantic) memory search
+MEMORY_BACKEND = os.environ.get("MEMORY_BACKEND", "sqlite")
+
 async def main():
     logger.info("MEMORY_INTEGRATION: Step 1 - Initialize: Creating MemoryService and providing it to Runner")
 
     # Step 1: Initialize - Create a MemoryService and provide it to your agent via the Runner
-    memory_service = InMemoryMemoryService()
-    session_service = InMemorySessionService()
+    if MEMORY_BACKEND == "vector":
+        # Semantic search over local hashed embeddings, persisted under memory_vectors/ (needs numpy)
+        from adk_extensions.vector_memory import VectorMemoryService
+        memory_service = VectorMemoryService(storage_dir="memory_vectors")
+    elif MEMORY_BACKEND == "bm25":
+        # Ranked keyword search over a per-user inverted index, rebuilt on every start
+        memory_service = BM25MemoryService()
+    else:
+        # Ranked keyword search over an FTS5 index in memory_store.db, kept across restarts
+        memory_service = SqliteMemoryService(db_path="memory_store.db")
+    # Past MAX_RESIDENT_SESSION_BYTES, least recently used sessions spill to a local SQLite file
+    session_service = BoundedInMemorySessionService(max_resident_bytes=MAX_RESIDENT_SESSION_BYTES)
+
+    # Step 2: Ingest - after every turn, the new events of the session are added to memory in the background
+    ingestor = IncrementalMemoryIngestor(memory_service)
+
+    # Merge near-duplicate memories of the persistent store in the background
+    consolidator = consolidation_task = None
+    if isinstance(memory_service, SqliteMemoryService):
+        consolidator = MemoryConsolidator(memory_service)
+        consolidation_task = asyncio.create_task(consolidator.run_loop(interval=30))
+
+    # TURN_PROFILE_DIR=traces writes each turn as a Chrome trace (TURN_PROFILE_SAMPLE=0.01 to sample)
+    profiler = TurnProfiler.from_env()
+    plugins = [ingestor]
+    if profiler:
+        profiler.instrument(session_service, "session", ["get_session", "append_event"])
+        profiler.instrument(memory_service, "memory", ["search_memory", "add_session_to_memory"])
+        plugins.append(profiler)
 
     # Create runner with memory service
     runner = Runner(
-        agent=root_agent,
+        app=App(name="proactive_memory_agent", root_agent=root_agent, plugins=plugins),
         session_service=session_service,
         memory_service=memory_service,  # This enables memory functionality
-        app_name="proactive_memory_agent"
     )
 
     # Create a new session
@@ -40,66 +81,57 @@ async def main():
 
     logger.info(f"MEMORY_INTEGRATION: MemoryService initialized. Session created with ID: {session.id}")
 
-    # Create preload memory tool for proactive loading
-    preload_tool = PreloadMemoryTool()
-
     print("Proactive Memory Agent")
     print("This agent demonstrates PROACTIVE memory loading - memory is automatically loaded before each turn.")
     print("Features:")
-    print("- Proactive memory loading (preload_memory before each turn)")
+    print("- Proactive memory loading (cached, relevance-gated preload before each model call)")
     print("- Manual memory search")
     print("- Google search integration")
-    print("- InMemoryMemoryService (stores conversation events)")
+    print(f"- {type(memory_service).__name__} (ranked search over past conversation events)")
     print("Type 'quit' to exit, 'memory' to see memory features.\n")
 
     conversation_turns = 0
 
     while True:
-        user_input = input("You: ")
+        # Read input off the event loop so background session work keeps running
+        user_input = await asyncio.to_thread(input, "You: ")
         if user_input.lower() in ['quit', 'exit']:
-            logger.info("MEMORY_INTEGRATION: Step 2 - Ingest: Transferring session data to memory before exit")
-            # Step 2: Ingest - Transfer session data to memory using add_session_to_memory()
-            await memory_service.add_session_to_memory(session)
-            logger.info(f"MEMORY_INTEGRATION: Session data ingested into memory for session {session.id}")
+            logger.info("MEMORY_INTEGRATION: Step 2 - Ingest: Waiting for the last turn to be ingested before exit")
+            await ingestor.drain()
+            logger.info(f"MEMORY_INTEGRATION: Session {session.id} ingested into memory: {ingestor.stats()}")
+            ingestor.forget(session.app_name, session.user_id, session.id)
+            logger.info(f"PRELOAD_MEMORY: {agent.memory_preloader.stats()}")
+            agent.memory_preloader.forget(session.app_name, session.user_id, session.id)
             print("Goodbye! Session data has been saved to memory.")
+            logger.info(f"SESSION_STORE: {session_service.metrics()}")
+            session_service.close()
+            if consolidator is not None:
+                consolidation_task.cancel()
+                await consolidator.consolidate_all()
+                logger.info(f"MEMORY_CONSOLIDATION: {consolidator.stats()}")
+                consolidator.close()
+                memory_service.close()
             break
 
         conversation_turns += 1
         logger.info(f"CONVERSATION_TURN: {conversation_turns} - User input: {user_input[:50]}...")
 
         try:
-            # Step 3: Retrieve - For proactive agent, preload memory before each turn
+            # Step 3: Retrieve - agent.memory_preloader injects relevant memories before each model call
             logger.info("MEMORY_INTEGRATION: Step 3 - Retrieve: Preloading memory before this turn")
 
-            # Create a tool context for preloading
-            tool_context = ToolContext()
-            # Note: In a real implementation, the preload tool would be called here
-            # For demonstration, we'll log the proactive loading
-            logger.info("PRELOAD_MEMORY: Memory preloaded for this conversation turn")
-
             # Create message content
             message = Content(parts=[Part(text=user_input)])
 
-            # Run the agent with the persistent session
-            events = list(runner.run(
+            # Run the agent with the persistent session, streaming its reply as it is generated
+            result = await run_turn(
+                runner,
                 user_id="demo_user",
                 session_id=session.id,
-                new_message=message
-            ))
-
-            # Get the final response
-            for event in events:
-                if hasattr(event, 'content') and event.content:
-                    # Extract text from the response content
-                    response_text = ""
-                    if event.content.parts:
-                        for part in event.content.parts:
-                            if part.text:
-                                response_text += part.text
-                    if response_text:
-                        print(f"Agent: {response_text}")
-                        logger.info(f"AGENT_RESPONSE: {response_text[:100]}...")
-                        break
+                message=message,
+                profiler=profiler
+            )
+            logger.info(f"AGENT_RESPONSE: {result.text[:100]}...")
 
         except Exception as e:
             error_msg = f"Error: {e}"
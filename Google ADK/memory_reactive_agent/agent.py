@@ -1,16 +1,21 @@
 from google.adk.agents import Agent
-from google.adk.memory import InMemoryMemoryService
-from google.adk.runners import Runner, RunConfig
-from google.adk.sessions import InMemorySessionService
-from google.genai.types import Content, Part
+from google.adk.tools.tool_context import ToolContext
 import logging
-import asyncio
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+from adk_extensions.context_assembler import ContextAssembler
+from adk_extensions.web_search import CachedSearch, LocalSearchProvider, format_results
+
+# Logging is configured by the entry point (run_agent.py or adk web)
 logger = logging.getLogger(__name__)
 
-def manual_memory_search(query: str) -> str:
+# Keep the prompt size flat as the conversation grows
+context_assembler = ContextAssembler(target_tokens=1000)
+
+# Shared by every user of this process: identical queries are served from cache or coalesced.
+# LocalSearchProvider is an offline stand-in; swap in a SearchProvider for a real search API.
+web_search = CachedSearch(LocalSearchProvider(), ttl=300, stale_ttl=3600, rate=5, burst=10)
+
+async def manual_memory_search(query: str, tool_context: ToolContext) -> str:
     """Manually search memory for specific information.
 
     Args:
@@ -20,22 +25,37 @@ def manual_memory_search(query: str) -> str:
         str: Search results from memory
     """
     logger.info(f"MANUAL_MEMORY_SEARCH: Searching memory for query: '{query}'")
-    # Note: Memory search will be handled by the runner's memory service
-    return f"Manual search initiated for: {query}. Memory search functionality is handled by the InMemoryMemoryService."
-
-def perform_google_search(query: str) -> str:
+    # Searches the memory service given to the Runner (SqliteMemoryService by default in run_agent.py)
+    try:
+        response = await tool_context.search_memory(query)
+    except ValueError as e:  # No memory service configured
+        return f"Memory search unavailable: {e}"
+    if not response.memories:
+        return f"No memories found for: {query}"
+
+    lines = [f"Memories matching '{query}':"]
+    for memory in response.memories:
+        text = " ".join(part.text for part in memory.content.parts if part.text)
+        lines.append(f"- [{memory.timestamp}] {memory.author}: {text}")
+    logger.info(f"MANUAL_MEMORY_SEARCH: Found {len(response.memories)} memories")
+    return "\n".join(lines)
+
+async def perform_google_search(query: str) -> str:
     """Perform a Google search for real-time information.
 
     Args:
         query (str): The search query
 
     Returns:
-        str: Search results (simulated for demonstration)
+        str: Search results
     """
     logger.info(f"GOOGLE_SEARCH: Searching for query: '{query}'")
-    # Note: In a real implementation, this would call Google Search API
-    # For demonstration, we'll return a simulated response
-    return f"Google search results for '{query}': [Simulated search results - in production this would use Google Search API]"
+    try:
+        results = await web_search.search(query)
+    except Exception as e:
+        logger.error(f"GOOGLE_SEARCH: Search failed: {e}")
+        return f"Search for '{query}' failed: {e}"
+    return format_results(query, results)
 
 def explain_memory_features() -> str:
     """Explain the memory features of this reactive memory agent.
@@ -63,7 +83,7 @@ Reactive Memory Agent Features:
 
 4. **Three-Step Integration Process**:
    - Initialize: MemoryService created and provided to Runner
-   - Ingest: Session data transferred to memory using add_session_to_memory()
+   - Ingest: New session events added to memory after every turn using add_session_to_memory()
    - Retrieve: Search stored memories using search_memory() or load_memory tool
 
 5. **Google Search Integration**:
@@ -94,4 +114,6 @@ LOGGING: Always log your memory operations and decisions for demonstration purpo
 
 Be conversational and helpful while demonstrating your memory capabilities.""",
     tools=[manual_memory_search, perform_google_search, explain_memory_features],
+    include_contents="none",  # History is assembled by context_assembler
+    before_model_callback=context_assembler.before_model_callback,
 )
\ No newline at end of file
@@ -1,8 +1,4 @@
 from google.adk.agents import Agent
-from google.adk.sessions import InMemorySessionService, Session
-from google.adk.runners import Runner
-from google.adk.runners import RunConfig
-import asyncio
 from typing import Optional
 
 # Tool to demonstrate session concepts
@@ -1,6 +1,8 @@
 from google.adk.agents import Agent
 from google.adk.tools.tool_context import ToolContext
 
+from adk_extensions.response_cache import ModelResponseCache
+
 def coordinate_shipping(num_containers: int, tool_context: ToolContext) -> str:
     """Coordinates shipping orders with approval workflow.
 
@@ -48,4 +50,10 @@ root_agent = Agent(
     description="Agent to coordinate shipping orders with approval workflow for large shipments",
     instruction="You are a shipping coordinator agent. When given a shipping request with number of containers, use the coordinate_shipping tool to handle the approval process. For small orders (≤5 containers), they are auto-approved. For large orders (>5 containers), the tool will request approval and show an error message until approval is granted. Always provide clear status updates to the user about the shipping coordination outcome.",
     tools=[coordinate_shipping],
-)
\ No newline at end of file
+)
+
+# Opt-in cache of model responses; off unless ADK_RESPONSE_CACHE is set.
+# Turns that coordinate a shipment (and its approval) always reach the model.
+response_cache = ModelResponseCache.from_env(side_effect_tools=["coordinate_shipping"])
+if response_cache:
+    response_cache.attach(root_agent)
@@ -1,16 +1,44 @@
 import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import itertools
 import os
 import json
+import shlex
 import subprocess
 import sys
 from dotenv import load_dotenv
 from agent_framework import ChatAgent
 from agent_framework.openai import OpenAIChatClient
 from openai import AsyncOpenAI
+from tool_router import ToolRouter, ToolSection
+from turn_profiler import TurnProfiler, span
 
 # Load environment variables from .env file
 load_dotenv()
 
+# OpenAI-compatible chat-completions endpoint. GitHub Models by default; point MODEL_BASE_URL
+# at stub_model_server.py (e.g. http://127.0.0.1:8001/v1) to run without spending quota
+MODEL_BASE_URL = os.getenv("MODEL_BASE_URL", "https://models.github.ai/inference")
+MODEL_ID = os.getenv("MODEL_ID", "xai/grok-3")  # Using Grok 3 for advanced reasoning
+
+# TURN_PROFILE_DIR=traces writes each turn as a Chrome trace (TURN_PROFILE_SAMPLE=0.01 to sample)
+profiler = TurnProfiler.from_env()
+
+# Local tools are CPU work: they run on a bounded thread pool (TOOL_WORKERS threads), so the
+# event loop stays free and several calls from one model response run side by side
+TOOL_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=int(os.getenv("TOOL_WORKERS", "4")), thread_name_prefix="tool")
+
+def offloaded(func):
+    """Async version of a sync tool that runs on TOOL_POOL; name, docstring and signature are kept."""
+    @functools.wraps(func)
+    async def run(*args, **kwargs):
+        # Run in a copy of this context so profiling spans reach the turn being traced
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(TOOL_POOL, call)
+    return run
+
 # Mock data for allergens (gluten and nuts)
 ALLERGEN_DATA = {
     "wheat": ["gluten"],
@@ -115,6 +143,7 @@ PRICE_DATA = {
     "walnuts": {"price": 11.99, "unit": "lb"},
 }
 
+@offloaded
 def check_allergens(recipe_text: str) -> dict:
     """
     Tool to identify if there is gluten or nuts in the recipe.
@@ -145,6 +174,7 @@ def check_allergens(recipe_text: str) -> dict:
         "allergens_found": detected_gluten + detected_nuts
     }
 
+@offloaded
 def calculate_calories(recipe_text: str, servings: int = 4) -> dict:
     """
     Tool to identify total calories in 1 portion of the dish.
@@ -179,6 +209,7 @@ def calculate_calories(recipe_text: str, servings: int = 4) -> dict:
         "ingredient_breakdown": ingredient_breakdown
     }
 
+@offloaded
 def get_ingredient_prices(ingredients: list) -> dict:
     """
     Tool to get price of ingredients.
@@ -213,61 +244,110 @@ def get_ingredient_prices(ingredients: list) -> dict:
     }
 
 # MCP Server Integration
+# Command that starts the MCP server; MCP_SERVER_COMMAND="python mcp_stub_server.py" runs offline
+MCP_SERVER_COMMAND = os.getenv("MCP_SERVER_COMMAND", "npx -y @modelcontextprotocol/server-everything stdio")
+# Seconds to wait for one MCP response before the tool call fails
+MCP_TIMEOUT = float(os.getenv("MCP_TIMEOUT", "10"))
+
 class MCPClient:
-    def __init__(self):
+    """JSON-RPC client for one MCP server process over stdio.
+
+    Requests are multiplexed: each gets its own id, and a reader task hands
+    every response to the request with that id, so concurrent tool calls share
+    the server process without waiting for each other.
+    """
+
+    def __init__(self, command: str = MCP_SERVER_COMMAND, timeout: float = MCP_TIMEOUT):
+        self.command = command
+        self.timeout = timeout
         self.process = None
         self.initialized = False
-        
+        self._ids = itertools.count(1)
+        self._pending = {}  # request id -> future of its response
+        self._reader = None
+        self._start_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+
     async def initialize(self):
         if self.initialized:
             return
-            
-        # Start the MCP everything server
-        self.process = await asyncio.create_subprocess_exec(
-            'npx', '-y', '@modelcontextprotocol/server-everything', 'stdio',
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-        
-        # Initialize MCP connection
-        await self._send_request({"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}})
-        self.initialized = True
-        
+        async with self._start_lock:
+            if self.initialized:
+                return
+
+            # Start the MCP everything server
+            self.process = await asyncio.create_subprocess_exec(
+                *shlex.split(self.command),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+            self._reader = asyncio.create_task(self._read_responses())
+
+            # Initialize MCP connection; a server that never answers is stopped so the next call starts afresh
+            try:
+                await self._send_request({"jsonrpc": "2.0", "method": "initialize", "params": {}})
+            except Exception:
+                if self.process.returncode is None:
+                    self.process.kill()
+                self.process = None
+                raise
+            self.initialized = True
+
+    async def _read_responses(self):
+        try:
+            while True:
+                line = await self.process.stdout.readline()
+                if not line:
+                    break
+                message = json.loads(line.decode())
+                # Server-to-client requests and notifications carry a method; only responses are routed
+                if "method" not in message:
+                    future = self._pending.pop(message.get("id"), None)
+                    if future is not None and not future.done():
+                        future.set_result(message)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(Exception("No response from MCP server"))
+            self._pending.clear()
+            self.initialized = False
+
     async def _send_request(self, request):
         if not self.process:
             raise Exception("MCP server not initialized")
-            
-        # Send request
-        request_json = json.dumps(request) + "\n"
-        self.process.stdin.write(request_json.encode())
-        await self.process.stdin.drain()
-        
-        # Read response
-        response_line = await self.process.stdout.readline()
-        if not response_line:
-            raise Exception("No response from MCP server")
-            
-        response = json.loads(response_line.decode().strip())
-        return response
-        
+
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        # One round trip to the MCP server; a span in the turn's trace when profiling
+        with span(f"mcp {request['method']}", "mcp"):
+            try:
+                async with self._write_lock:
+                    self.process.stdin.write((json.dumps({**request, "id": request_id}) + "\n").encode())
+                    await self.process.stdin.drain()
+                return await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                raise Exception(f"No response from MCP server within {self.timeout:g}s") from None
+            finally:
+                self._pending.pop(request_id, None)
+
     async def call_tool(self, tool_name, **kwargs):
         await self.initialize()
-        
+
         request = {
             "jsonrpc": "2.0",
-            "id": 2,
             "method": "tools/call",
             "params": {
                 "name": tool_name,
                 "arguments": kwargs
             }
         }
-        
+
         response = await self._send_request(request)
         if "error" in response:
             raise Exception(f"MCP error: {response['error']}")
-            
+
         return response.get("result", {})
 
 # Global MCP client instance
@@ -337,106 +417,111 @@ async def mcp_list_roots() -> str:
     except Exception as e:
         return f"Error calling MCP listRoots: {e}"
 
-# Synchronous wrappers for MS Agent Framework
-def echo_message(message: str) -> str:
+# MCP tools for MS Agent Framework. They are async, so the agent awaits them on its
+# event loop, and the calls of one model response run concurrently over one MCP connection
+async def echo_message(message: str) -> str:
     """Echo a message using MCP server."""
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            # If there's already a running loop, we need to handle this differently
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, mcp_echo(message))
-                return future.result()
-        else:
-            return loop.run_until_complete(mcp_echo(message))
-    except RuntimeError:
-        # No event loop, create a new one
-        return asyncio.run(mcp_echo(message))
-
-def add_numbers(a: float, b: float) -> str:
+    return await mcp_echo(message)
+
+async def add_numbers(a: float, b: float) -> str:
     """Add two numbers using MCP server."""
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, mcp_add(a, b))
-                return future.result()
-        else:
-            return loop.run_until_complete(mcp_add(a, b))
-    except RuntimeError:
-        return asyncio.run(mcp_add(a, b))
-
-def long_operation(duration: int = 10, steps: int = 5) -> str:
+    return await mcp_add(a, b)
+
+async def long_operation(duration: int = 10, steps: int = 5) -> str:
     """Run a long running operation with progress using MCP server."""
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, mcp_long_running_operation(duration, steps))
-                return future.result()
-        else:
-            return loop.run_until_complete(mcp_long_running_operation(duration, steps))
-    except RuntimeError:
-        return asyncio.run(mcp_long_running_operation(duration, steps))
-
-def print_environment() -> str:
+    return await mcp_long_running_operation(duration, steps)
+
+async def print_environment() -> str:
     """Print environment variables using MCP server."""
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, mcp_print_env())
-                return future.result()
-        else:
-            return loop.run_until_complete(mcp_print_env())
-    except RuntimeError:
-        return asyncio.run(mcp_print_env())
-
-def sample_llm_response(prompt: str, max_tokens: int = 100) -> str:
+    return await mcp_print_env()
+
+async def sample_llm_response(prompt: str, max_tokens: int = 100) -> str:
     """Sample LLM response using MCP server."""
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, mcp_sample_llm(prompt, max_tokens))
-                return future.result()
-        else:
-            return loop.run_until_complete(mcp_sample_llm(prompt, max_tokens))
-    except RuntimeError:
-        return asyncio.run(mcp_sample_llm(prompt, max_tokens))
-
-def get_test_image() -> str:
+    return await mcp_sample_llm(prompt, max_tokens)
+
+async def get_test_image() -> str:
     """Get a tiny test image using MCP server."""
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, mcp_get_tiny_image())
-                return future.result()
-        else:
-            return loop.run_until_complete(mcp_get_tiny_image())
-    except RuntimeError:
-        return asyncio.run(mcp_get_tiny_image())
-
-def list_mcp_roots() -> str:
+    return await mcp_get_tiny_image()
+
+async def list_mcp_roots() -> str:
     """List MCP roots using MCP server."""
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, mcp_list_roots())
-                return future.result()
-        else:
-            return loop.run_until_complete(mcp_list_roots())
-    except RuntimeError:
-        return asyncio.run(mcp_list_roots())
+    return await mcp_list_roots()
+
+# One OpenAI client per process, so requests share its connection pool
+_openai_client = None
+
+def get_openai_client(api_key: str) -> AsyncOpenAI:
+    """Return the shared client for MODEL_BASE_URL, created on first use."""
+    global _openai_client
+    if _openai_client is None or _openai_client.api_key != api_key:
+        _openai_client = AsyncOpenAI(base_url=MODEL_BASE_URL, api_key=api_key)
+    return _openai_client
+
+# Agent instructions: the base block goes with every turn, each section only with
+# the turns that need its tools (all of them when routing is off or nothing matches)
+BASE_INSTRUCTIONS = """
+You are a helpful cooking assistant AI with access to various tools. You can help users with:
+- Recipe search: Generate detailed recipes based on dish names or ingredients
+- Ingredient extraction: Extract and list ingredients from provided recipe text
+- Allergen checking: Check if recipes contain gluten or nuts
+- Calorie calculation: Calculate calories per serving for recipes
+- Price lookup: Get prices for ingredients
+- MCP Tools: Access to Model Context Protocol server tools including echo, math operations, LLM sampling, and more
+
+Be friendly, informative, and ensure recipes are safe and practical.
+"""
+
+RECIPE_INSTRUCTIONS = """
+IMPORTANT WORKFLOW FOR RECIPE REQUESTS:
+1. When a user asks for a recipe, FIRST use the check_allergens tool to analyze the dish name/ingredients for gluten and nuts
+2. If allergens are detected (gluten or nuts found), ask the user: "This recipe contains [list allergens]. Do you want me to proceed with the recipe creation?"
+3. Only proceed with recipe generation if the user explicitly agrees
+4. If user declines, stop and offer alternatives or end the conversation
+
+When generating recipes, include:
+- List of ingredients with quantities
+- Step-by-step cooking instructions
+- Cooking time and servings
+- Any tips or variations
+
+When extracting ingredients, provide a clean list of ingredients from the recipe text.
+"""
+
+ALLERGEN_INSTRUCTIONS = "- check_allergens: ALWAYS call first when user requests a recipe to check for allergens"
+CALORIE_INSTRUCTIONS = "- calculate_calories: Only call when user asks for calorie information"
+PRICE_INSTRUCTIONS = "- get_ingredient_prices: Only call when user asks for prices"
+MCP_INSTRUCTIONS = "- MCP tools: Use when user requests specific MCP functionality (echo, math, LLM sampling, etc.)"
+MCP_TOOLS = [echo_message, add_numbers, long_operation, print_environment, sample_llm_response, get_test_image, list_mcp_roots]
+
+SECTIONS = [
+    ToolSection("recipe", r"\b(recipes?|cook\w*|bake|dish|dinner|lunch|breakfast|meal|ingredients?)\b", [check_allergens], [RECIPE_INSTRUCTIONS, ALLERGEN_INSTRUCTIONS]),
+    ToolSection("allergens", r"\b(allerg\w*|gluten|nuts?|peanuts?|celiac)\b", [check_allergens], ALLERGEN_INSTRUCTIONS),
+    ToolSection("calories", r"\b(calori\w*|kcal|nutrition\w*)\b", [calculate_calories], CALORIE_INSTRUCTIONS),
+    ToolSection("prices", r"\b(prices?|costs?|cheap\w*|budget|expensive|how much)\b", [get_ingredient_prices], PRICE_INSTRUCTIONS),
+    ToolSection("mcp", r"\bmcp\b", MCP_TOOLS, MCP_INSTRUCTIONS),
+    ToolSection("echo", r"\becho\b", [echo_message], MCP_INSTRUCTIONS),
+    ToolSection("math", r"\b(add|sum|plus)\b|\d\s*\+\s*\d", [add_numbers], MCP_INSTRUCTIONS),
+    ToolSection("long_operation", r"\b(long[- ]running|long operation|progress)\b", [long_operation], MCP_INSTRUCTIONS),
+    ToolSection("environment", r"\b(environment|env)\b", [print_environment], MCP_INSTRUCTIONS),
+    ToolSection("sampling", r"\b(sample|sampling)\b", [sample_llm_response], MCP_INSTRUCTIONS),
+    ToolSection("image", r"\b(image|picture)\b", [get_test_image], MCP_INSTRUCTIONS),
+    ToolSection("roots", r"\broots?\b", [list_mcp_roots], MCP_INSTRUCTIONS),
+]
+
+# Per-turn tool and instruction selection; TOOL_ROUTING=off sends everything on every turn
+tool_router = ToolRouter(BASE_INSTRUCTIONS, SECTIONS)
+TOOL_ROUTING = os.getenv("TOOL_ROUTING", "on") != "off"
+
+def build_agent(chat_client: OpenAIChatClient, routed: bool = TOOL_ROUTING) -> ChatAgent:
+    """Create the cooking agent; when routed, each turn only gets the tools and instructions it needs."""
+    return ChatAgent(
+        chat_client=chat_client,
+        name="CookingAssistant",
+        instructions=tool_router.base_instructions if routed else tool_router.full_instructions(),
+        tools=None if routed else tool_router.all_tools(),
+        context_providers=tool_router if routed else None,
+        middleware=profiler.middleware() if profiler else None
+    )
 
 async def chat_with_agent(user_input: str) -> str:
     # Get GitHub token from environment
@@ -444,57 +529,14 @@ async def chat_with_agent(user_input: str) -> str:
     if not github_token:
         return "Please set the GITHUB_TOKEN environment variable with your GitHub Personal Access Token."
 
-    # Initialize OpenAI client for GitHub models
-    openai_client = AsyncOpenAI(
-        base_url="https://models.github.ai/inference",
-        api_key=github_token,
-    )
-
     # Create chat client
     chat_client = OpenAIChatClient(
-        async_client=openai_client,
-        model_id="xai/grok-3"  # Using Grok 3 for advanced reasoning
+        async_client=get_openai_client(github_token),
+        model_id=MODEL_ID
     )
 
     # Create the cooking agent
-    agent = ChatAgent(
-        chat_client=chat_client,
-        name="CookingAssistant",
-        instructions="""
-        You are a helpful cooking assistant AI with access to various tools. You can help users with:
-        - Recipe search: Generate detailed recipes based on dish names or ingredients
-        - Ingredient extraction: Extract and list ingredients from provided recipe text
-        - Allergen checking: Check if recipes contain gluten or nuts
-        - Calorie calculation: Calculate calories per serving for recipes
-        - Price lookup: Get prices for ingredients
-        - MCP Tools: Access to Model Context Protocol server tools including echo, math operations, LLM sampling, and more
-        
-        IMPORTANT WORKFLOW FOR RECIPE REQUESTS:
-        1. When a user asks for a recipe, FIRST use the check_allergens tool to analyze the dish name/ingredients for gluten and nuts
-        2. If allergens are detected (gluten or nuts found), ask the user: "This recipe contains [list allergens]. Do you want me to proceed with the recipe creation?"
-        3. Only proceed with recipe generation if the user explicitly agrees
-        4. If user declines, stop and offer alternatives or end the conversation
-        
-        When generating recipes, include:
-        - List of ingredients with quantities
-        - Step-by-step cooking instructions
-        - Cooking time and servings
-        - Any tips or variations
-        
-        When extracting ingredients, provide a clean list of ingredients from the recipe text.
-        
-        Tool usage guidelines:
-        - check_allergens: ALWAYS call first when user requests a recipe to check for allergens
-        - calculate_calories: Only call when user asks for calorie information
-        - get_ingredient_prices: Only call when user asks for prices
-        - MCP tools: Use when user requests specific MCP functionality (echo, math, LLM sampling, etc.)
-        
-        Be friendly, informative, and ensure recipes are safe and practical.
-        """,
-        tools=[check_allergens, calculate_calories, get_ingredient_prices, 
-               echo_message, add_numbers, long_operation, print_environment, 
-               sample_llm_response, get_test_image, list_mcp_roots]
-    )
+    agent = build_agent(chat_client)
 
     # Create a thread for conversation persistence
     thread = agent.get_new_thread()
@@ -513,57 +555,14 @@ async def main():
         print("Please set the GITHUB_TOKEN environment variable with your GitHub Personal Access Token.")
         return
 
-    # Initialize OpenAI client for GitHub models
-    openai_client = AsyncOpenAI(
-        base_url="https://models.github.ai/inference",
-        api_key=github_token,
-    )
-
     # Create chat client
     chat_client = OpenAIChatClient(
-        async_client=openai_client,
-        model_id="xai/grok-3"  # Using Grok 3 for advanced reasoning
+        async_client=get_openai_client(github_token),
+        model_id=MODEL_ID
     )
 
     # Create the cooking agent
-    agent = ChatAgent(
-        chat_client=chat_client,
-        name="CookingAssistant",
-        instructions="""
-        You are a helpful cooking assistant AI with access to various tools. You can help users with:
-        - Recipe search: Generate detailed recipes based on dish names or ingredients
-        - Ingredient extraction: Extract and list ingredients from provided recipe text
-        - Allergen checking: Check if recipes contain gluten or nuts
-        - Calorie calculation: Calculate calories per serving for recipes
-        - Price lookup: Get prices for ingredients
-        - MCP Tools: Access to Model Context Protocol server tools including echo, math operations, LLM sampling, and more
-        
-        IMPORTANT WORKFLOW FOR RECIPE REQUESTS:
-        1. When a user asks for a recipe, FIRST use the check_allergens tool to analyze the dish name/ingredients for gluten and nuts
-        2. If allergens are detected (gluten or nuts found), ask the user: "This recipe contains [list allergens]. Do you want me to proceed with the recipe creation?"
-        3. Only proceed with recipe generation if the user explicitly agrees
-        4. If user declines, stop and offer alternatives or end the conversation
-        
-        When generating recipes, include:
-        - List of ingredients with quantities
-        - Step-by-step cooking instructions
-        - Cooking time and servings
-        - Any tips or variations
-        
-        When extracting ingredients, provide a clean list of ingredients from the recipe text.
-        
-        Tool usage guidelines:
-        - check_allergens: ALWAYS call first when user requests a recipe to check for allergens
-        - calculate_calories: Only call when user asks for calorie information
-        - get_ingredient_prices: Only call when user asks for prices
-        - MCP tools: Use when user requests specific MCP functionality (echo, math, LLM sampling, etc.)
-        
-        Be friendly, informative, and ensure recipes are safe and practical.
-        """,
-        tools=[check_allergens, calculate_calories, get_ingredient_prices, 
-               echo_message, add_numbers, long_operation, print_environment, 
-               sample_llm_response, get_test_image, list_mcp_roots]
-    )
+    agent = build_agent(chat_client)
 
     print("Welcome to the Cooking AI Agent!")
     print("You can ask me to find recipes or extract ingredients from recipes.")
@@ -0,0 +1,232 @@
+"""Load-test the cooking web app's /chat endpoint at fixed request rates.
+
+Requests arrive open-loop at each target rate (they do not wait for earlier
+ones to finish, like independent users), and latency is measured from the
+moment a request was due, so a server that falls behind shows it in the
+percentiles instead of silently lowering the rate. For each rate it reports
+the achieved send rate, throughput (replies per second between the first and
+the last reply), p50/p95/p99 latency, the error rate (HTTP errors, timeouts and
+"Error: ..." replies from chat_with_agent) and, when psutil is installed,
+the server's CPU and RSS.
+
+With --spawn, the stub model server and the web app are started as
+subprocesses on free local ports, with the app pointed at the stub, so a
+run needs no GitHub token and uses no quota.
+
+Usage:
+    python load_test.py --spawn --rps 5 10 20 40 --duration 20
+    python load_test.py --url http://127.0.0.1:8000 --server-pid 12345 --rps 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MESSAGES = [
+    "Give me a recipe for chicken curry",
+    "Give me a recipe for pasta primavera",
+    "How many calories per serving in chicken with rice and broccoli?",
+    "What's the price of chicken and rice?",
+    "What can I cook tonight?",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(url: str, timeout: float = 30.0):
+    async with httpx.AsyncClient() as client:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+                await asyncio.sleep(0.2)
+
+
+async def spawn(args) -> tuple:
+    """Start the stub model server and the web app; returns (app url, processes)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    stub_port, app_port = free_port(), free_port()
+    stub = subprocess.Popen(
+        [sys.executable, "stub_model_server.py", "--port", str(stub_port), "--latency", str(args.model_latency),
+         "--tokens-per-sec", str(args.tokens_per_sec), "--reply-tokens", str(args.reply_tokens)],
+        cwd=here,
+    )
+    env = dict(os.environ, MODEL_BASE_URL=f"http://127.0.0.1:{stub_port}/v1", GITHUB_TOKEN=os.environ.get("GITHUB_TOKEN", "stub"))
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "ui:app", "--port", str(app_port), "--log-level", "warning"],
+        cwd=here, env=env, stdout=subprocess.DEVNULL,  # Tools print a LOG line per call
+    )
+    await wait_until_up(f"http://127.0.0.1:{stub_port}/v1/models")
+    await wait_until_up(f"http://127.0.0.1:{app_port}/")
+    return f"http://127.0.0.1:{app_port}", [app, stub]
+
+
+class ResourceSampler:
+    """Samples CPU and RSS of a process (and its children) while a load level runs."""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.cpu = []
+        self.rss = []
+        self._task = None
+
+    def _processes(self):
+        return [self.process] + self.process.children(recursive=True)
+
+    async def _run(self):
+        for process in self._processes():
+            process.cpu_percent()  # The first call only sets the baseline
+        while True:
+            await asyncio.sleep(self.interval)
+            processes = self._processes()
+            self.cpu.append(sum(p.cpu_percent() for p in processes))
+            self.rss.append(sum(p.memory_info().rss for p in processes))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> dict:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        return {
+            "cpu_percent_mean": round(statistics.mean(self.cpu), 1) if self.cpu else None,
+            "rss_mib_peak": round(max(self.rss) / 2**20, 1) if self.rss else None,
+        }
+
+
+async def run_level(client: httpx.AsyncClient, url: str, rps: float, duration: float, timeout: float, rng: random.Random) -> dict:
+    latencies, completions, errors = [], [], {"http": 0, "timeout": 0, "agent": 0, "transport": 0}
+
+    async def one(due: float, message: str):
+        try:
+            response = await client.post(f"{url}/chat", json={"message": message}, timeout=timeout)
+            if response.status_code != 200:
+                errors["http"] += 1
+                return
+            if response.json().get("response", "").startswith(("Error:", "Please set")):
+                errors["agent"] += 1
+                return
+            completions.append(time.monotonic())
+            latencies.append(completions[-1] - due)
+        except httpx.TimeoutException:
+            errors["timeout"] += 1
+        except httpx.TransportError:
+            errors["transport"] += 1
+
+    tasks = []
+    start = time.monotonic()
+    sent = 0
+    while sent < int(rps * duration):
+        due = start + sent / rps
+        delay = due - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(due, rng.choice(MESSAGES))))
+        sent += 1
+    last_send = time.monotonic()
+    await asyncio.gather(*tasks)
+
+    # Rates over the span between the first and the last event, so neither the
+    # first reply's latency nor the drain after the last send biases them low
+    def rate(count, first, last):
+        return round((count - 1) / (last - first), 2) if count > 1 and last > first else 0.0
+
+    latencies.sort()
+
+    def percentile(q):
+        return round(latencies[int(q * (len(latencies) - 1))] * 1000, 1) if latencies else None
+
+    return {
+        "target_rps": rps,
+        "sent": sent,
+        "ok": len(latencies),
+        "send_rps": rate(sent, start, last_send),
+        "throughput_rps": rate(len(completions), min(completions, default=0), max(completions, default=0)),
+        "error_rate": round(sum(errors.values()) / sent, 4) if sent else 0.0,
+        "errors": errors,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="web app to test (ignored with --spawn)")
+    parser.add_argument("--spawn", action="store_true", help="start the stub model server and the web app")
+    parser.add_argument("--server-pid", type=int, help="web app process to sample CPU/RSS from (set by --spawn)")
+    parser.add_argument("--rps", type=float, nargs="+", default=[5, 10, 20], help="target request rates, one level each")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per level")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds before a request counts as timed out")
+    parser.add_argument("--model-latency", type=float, default=0.3, help="stub time to first token (with --spawn)")
+    parser.add_argument("--tokens-per-sec", type=float, default=60.0, help="stub token rate (with --spawn)")
+    parser.add_argument("--reply-tokens", type=int, default=120, help="stub reply length (with --spawn)")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    processes = []
+    url, pid = args.url, args.server_pid
+    if args.spawn:
+        url, processes = await spawn(args)
+        pid = processes[0].pid
+    if pid and psutil is None:
+        print("psutil is not installed: server CPU/RSS will not be reported (pip install psutil)")
+
+    results = []
+    try:
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+        async with httpx.AsyncClient(limits=limits) as client:
+            print(f"Load test of {url}/chat, {args.duration:.0f}s per level")
+            for rps in args.rps:
+                sampler = ResourceSampler(pid) if pid and psutil else None
+                if sampler:
+                    sampler.start()
+                result = await run_level(client, url, rps, args.duration, args.timeout, random.Random(7))
+                if sampler:
+                    result.update(await sampler.stop())
+                results.append(result)
+                line = (
+                    f"  target {rps:6.1f} rps: sent {result['send_rps']:6.2f} rps, throughput {result['throughput_rps']:6.2f} rps, "
+                    f"p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, p99 {result['p99_ms']} ms, "
+                    f"errors {result['error_rate']:.1%}"
+                )
+                if sampler:
+                    line += f", server CPU {result['cpu_percent_mean']}%, RSS {result['rss_mib_peak']} MiB"
+                print(line)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""Local stand-in for the MCP "everything" server, for offline runs and benchmarks.
+
+Speaks newline-delimited JSON-RPC over stdio like
+`npx -y @modelcontextprotocol/server-everything stdio` and answers the tools
+the agents use (echo, add, longRunningOperation, printEnv, sampleLLM,
+getTinyImage, listRoots). Each tools/call takes --delay seconds and requests
+are served concurrently, so responses can come back in a different order than
+the requests were sent, as they can from a real server.
+
+Usage:
+    MCP_SERVER_COMMAND="python mcp_stub_server.py --delay 0.3" python cooking_agent.py
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+TINY_IMAGE = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+
+
+def call_tool(name: str, arguments: dict) -> dict:
+    if name == "echo":
+        text = f"Echo: {arguments.get('message', '')}"
+    elif name == "add":
+        text = f"The sum of {arguments.get('a')} and {arguments.get('b')} is {arguments.get('a', 0) + arguments.get('b', 0)}."
+    elif name == "longRunningOperation":
+        text = f"Long running operation completed. Duration: {arguments.get('duration', 10)} seconds, Steps: {arguments.get('steps', 5)}."
+    elif name == "printEnv":
+        text = json.dumps({"MCP_STUB": "1"})
+    elif name == "sampleLLM":
+        text = f"LLM sampling result: a short answer to '{arguments.get('prompt', '')}'"
+    elif name == "getTinyImage":
+        return {"content": [{"type": "text", "text": "This is a tiny image:"}, {"type": "image", "data": TINY_IMAGE, "mimeType": "image/png"}]}
+    elif name == "listRoots":
+        text = "No roots configured."
+    else:
+        raise KeyError(name)
+    return {"content": [{"type": "text", "text": text}]}
+
+
+def write(message: dict):
+    sys.stdout.write(json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+async def handle(request: dict, delay: float):
+    method = request.get("method")
+    if "id" not in request:
+        return  # Notification
+    if method == "initialize":
+        result = {"protocolVersion": "2024-11-05", "capabilities": {"tools": {}}, "serverInfo": {"name": "mcp-stub", "version": "1.0"}}
+    elif method == "tools/list":
+        result = {"tools": [{"name": name, "inputSchema": {"type": "object"}} for name in ("echo", "add", "longRunningOperation", "printEnv", "sampleLLM", "getTinyImage", "listRoots")]}
+    elif method == "tools/call":
+        await asyncio.sleep(delay)
+        params = request.get("params", {})
+        try:
+            result = call_tool(params.get("name"), params.get("arguments") or {})
+        except KeyError:
+            write({"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32602, "message": f"Unknown tool: {params.get('name')}"}})
+            return
+    else:
+        write({"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32601, "message": f"Method not found: {method}"}})
+        return
+    write({"jsonrpc": "2.0", "id": request["id"], "result": result})
+
+
+async def serve(delay: float):
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    tasks = set()
+    while line := await reader.readline():
+        task = asyncio.create_task(handle(json.loads(line), delay))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    await asyncio.gather(*tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delay", type=float, default=0.2, help="seconds per tools/call")
+    args = parser.parse_args()
+    asyncio.run(serve(args.delay))
+
+
+if __name__ == "__main__":
+    main()
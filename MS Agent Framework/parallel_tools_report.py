@@ -0,0 +1,103 @@
+"""Measure the wall time of multi-tool steps: concurrent tool calls vs one after another.
+
+The stub model answers a message that asks for several things with several
+tool calls in one response (check_allergens, calculate_calories,
+get_ingredient_prices, echo_message, get_test_image). The MCP tools go to
+mcp_stub_server.py, which takes --mcp-delay seconds per call. Each step is run
+as the agent runs it (concurrently) and, for comparison, with the tool calls
+forced one after another. A step's wall time is from the first tool call
+starting to the last one finishing; concurrently it should be close to the
+slowest call, and one after another close to the sum.
+
+Usage:
+    python parallel_tools_report.py --mcp-delay 0.3 --repeat 5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+
+from agent_framework import ChatAgent, FunctionMiddleware
+
+from load_test import free_port, wait_until_up
+
+MESSAGE = "Give me a recipe for chicken and rice with calories and prices, echo it back and show an image"
+
+
+class ToolTimer(FunctionMiddleware):
+    """Records (name, start, end) of each tool call; with sequential=True, runs them one at a time."""
+
+    def __init__(self, sequential: bool = False):
+        self.lock = asyncio.Lock() if sequential else contextlib.nullcontext()
+        self.calls = []
+
+    async def process(self, context, next):
+        async with self.lock:
+            start = time.perf_counter()
+            await next(context)
+            self.calls.append((context.function.name, start, time.perf_counter()))
+
+
+async def run_step(chat_client, tool_router, sequential: bool) -> dict:
+    timer = ToolTimer(sequential)
+    agent = ChatAgent(
+        chat_client=chat_client,
+        name="CookingAssistant",
+        instructions=tool_router.base_instructions,
+        context_providers=tool_router,
+        middleware=[timer],
+    )
+    with contextlib.redirect_stdout(io.StringIO()):  # Tools print a LOG line per call
+        await agent.run(MESSAGE, thread=agent.get_new_thread())
+    durations = [end - start for _, start, end in timer.calls]
+    return {
+        "tools": len(timer.calls),
+        "wall_ms": (max(end for _, _, end in timer.calls) - min(start for _, start, _ in timer.calls)) * 1000,
+        "sum_ms": sum(durations) * 1000,
+        "slowest_ms": max(durations) * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="steps per mode (median is reported)")
+    parser.add_argument("--mcp-delay", type=float, default=0.3, help="seconds per MCP tool call")
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    port = free_port()
+    stub = subprocess.Popen(
+        [sys.executable, "stub_model_server.py", "--port", str(port), "--latency", "0.01", "--tokens-per-sec", "5000"],
+        cwd=here,
+    )
+    os.environ["MODEL_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    os.environ["MCP_SERVER_COMMAND"] = shlex.join([sys.executable, os.path.join(here, "mcp_stub_server.py"), "--delay", str(args.mcp_delay)])
+    try:
+        await wait_until_up(f"http://127.0.0.1:{port}/v1/models")
+        # Imported after MODEL_BASE_URL and MCP_SERVER_COMMAND point at the stubs
+        from agent_framework.openai import OpenAIChatClient
+        from cooking_agent import MODEL_ID, get_openai_client, mcp_client, tool_router
+
+        chat_client = OpenAIChatClient(async_client=get_openai_client("stub"), model_id=MODEL_ID)
+        await mcp_client.initialize()  # Server start-up is not part of any step
+        print(f"One model response with several tool calls, MCP calls take {args.mcp_delay * 1000:.0f} ms")
+        for label, sequential in (("one after another", True), ("concurrent", False)):
+            steps = [await run_step(chat_client, tool_router, sequential) for _ in range(args.repeat)]
+            median = {key: statistics.median(step[key] for step in steps) for key in steps[0]}
+            print(
+                f"  {label:<18} {median['tools']:.0f} tools: step wall {median['wall_ms']:7.1f} ms, "
+                f"sum of calls {median['sum_ms']:7.1f} ms, slowest call {median['slowest_ms']:7.1f} ms"
+            )
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
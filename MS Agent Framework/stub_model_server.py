@@ -0,0 +1,172 @@
+"""Local OpenAI-compatible chat-completions server for load-testing the cooking agent.
+
+Speaks enough of the chat-completions protocol for OpenAIChatClient, streaming
+and non-streaming, including tool calls:
+
+- a user message that asks for a recipe, calories, prices, an echo or an
+  image is answered with a call to check_allergens, calculate_calories,
+  get_ingredient_prices, echo_message or get_test_image (when the request
+  offers that tool); a message that asks for several gets all those calls in
+  one response, as parallel tool calls
+- once the tool results are in, or for any other message, the reply is text
+
+Each response waits --latency seconds, plus the prompt's tokens at
+--prefill-tokens-per-sec when set (time to first token), then produces its
+tokens at --tokens-per-sec. Prompt tokens count the messages and the tool
+schemas, as real providers bill them. Nothing leaves the machine and no
+quota is used.
+
+Usage:
+    python stub_model_server.py --port 8001 --latency 0.3 --tokens-per-sec 60
+    MODEL_BASE_URL=http://127.0.0.1:8001/v1 GITHUB_TOKEN=stub python -m uvicorn ui:app
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI()
+
+# Set from the command line in main()
+CONFIG = {"latency": 0.3, "tokens_per_sec": 60.0, "reply_tokens": 120, "prefill_tokens_per_sec": 0.0}
+
+STOP_WORDS = {"what", "whats", "the", "price", "prices", "of", "and", "how", "much", "does", "cost", "is", "are", "for", "me", "some"}
+TOOL_CALL_TOKENS = 20  # Rough size of a generated tool call
+FILLER = "Here is a simple and tasty suggestion with fresh ingredients clear steps and a few tips to make it your own".split()
+
+
+def _text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def choose_tool_calls(request: dict) -> list:
+    """Pick the tool calls a model would make for the last user message; several intents give several calls."""
+    messages = request.get("messages", [])
+    if not messages or messages[-1].get("role") != "user":
+        return []  # After tool results the model answers in text
+    offered = {tool["function"]["name"] for tool in request.get("tools") or [] if tool.get("type") == "function"}
+    text = _text(messages[-1])
+    lower = text.lower()
+    calls = []
+    if "recipe" in lower and "check_allergens" in offered:
+        calls.append(("check_allergens", {"recipe_text": text}))
+    if "calorie" in lower and "calculate_calories" in offered:
+        calls.append(("calculate_calories", {"recipe_text": text, "servings": 4}))
+    if re.search(r"\b(price|prices|cost)\b", lower) and "get_ingredient_prices" in offered:
+        words = [word for word in re.findall(r"[a-z]+", lower) if word not in STOP_WORDS]
+        calls.append(("get_ingredient_prices", {"ingredients": words or [lower]}))
+    if "echo" in lower and "echo_message" in offered:
+        calls.append(("echo_message", {"message": text}))
+    if "image" in lower and "get_test_image" in offered:
+        calls.append(("get_test_image", {}))
+    return calls
+
+
+def reply_words(count: int) -> list:
+    return [FILLER[n % len(FILLER)] for n in range(count)]
+
+
+def count_prompt_tokens(request: dict) -> int:
+    # Rough estimate: about 4 characters per token of the messages and tool schemas
+    return (len(json.dumps(request.get("messages", []))) + len(json.dumps(request.get("tools") or []))) // 4
+
+
+def time_to_first_token(request: dict) -> float:
+    prefill = CONFIG["prefill_tokens_per_sec"]
+    return CONFIG["latency"] + (count_prompt_tokens(request) / prefill if prefill else 0.0)
+
+
+def usage(request: dict, completion_tokens: int) -> dict:
+    prompt_tokens = count_prompt_tokens(request)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+
+def _tool_call(name: str, args: dict, index: int = None) -> dict:
+    call = {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+    return call if index is None else {"index": index, **call}
+
+
+def _completion(request: dict, calls: list, words: list) -> dict:
+    message = {"role": "assistant", "content": None if calls else " ".join(words)}
+    if calls:
+        message["tool_calls"] = [_tool_call(name, args) for name, args in calls]
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "stub"),
+        "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if calls else "stop"}],
+        "usage": usage(request, len(words) if not calls else TOOL_CALL_TOKENS * len(calls)),
+    }
+
+
+async def _stream(request: dict, calls: list, words: list):
+    base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion.chunk", "created": int(time.time()), "model": request.get("model", "stub")}
+
+    def chunk(delta: dict, finish_reason=None) -> str:
+        return f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]})}\n\n"
+
+    await asyncio.sleep(time_to_first_token(request))
+    if calls:
+        yield chunk({"role": "assistant", "tool_calls": [_tool_call(name, args, index) for index, (name, args) in enumerate(calls)]})
+        yield chunk({}, "tool_calls")
+    else:
+        yield chunk({"role": "assistant", "content": ""})
+        interval = 1.0 / CONFIG["tokens_per_sec"]
+        for n, word in enumerate(words):
+            await asyncio.sleep(interval)
+            yield chunk({"content": word if n == 0 else " " + word})
+        yield chunk({}, "stop")
+    if (request.get("stream_options") or {}).get("include_usage"):
+        yield f"data: {json.dumps({**base, 'choices': [], 'usage': usage(request, len(words) if not calls else TOOL_CALL_TOKENS * len(calls))})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+@app.post("/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    calls = choose_tool_calls(body)
+    words = [] if calls else reply_words(min(CONFIG["reply_tokens"], body.get("max_tokens") or CONFIG["reply_tokens"]))
+    if body.get("stream"):
+        return StreamingResponse(_stream(body, calls, words), media_type="text/event-stream")
+    # A tool call is a handful of tokens; text takes reply_tokens at the token rate
+    await asyncio.sleep(time_to_first_token(body) + (TOOL_CALL_TOKENS * len(calls) if calls else len(words)) / CONFIG["tokens_per_sec"])
+    return _completion(body, calls, words)
+
+
+@app.get("/v1/models")
+@app.get("/models")
+async def models():
+    return {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "local"}]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=60.0, help="generation speed after the first token")
+    parser.add_argument("--reply-tokens", type=int, default=120, help="tokens in a text reply")
+    parser.add_argument("--prefill-tokens-per-sec", type=float, default=0.0, help="prompt processing speed, adds to time to first token (0: off)")
+    args = parser.parse_args()
+    CONFIG.update(
+        latency=args.latency,
+        tokens_per_sec=args.tokens_per_sec,
+        reply_tokens=args.reply_tokens,
+        prefill_tokens_per_sec=args.prefill_tokens_per_sec,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Per-turn tool and instruction selection for the cooking ChatAgent.
+
+Sending every tool schema and the whole instruction block on every model call
+costs prompt tokens and time to first token, even when the user only asks for
+a recipe. ToolRouter is a ContextProvider: before each agent.run() it matches
+the new user message against keyword patterns (no model call, microseconds)
+and hands the agent only the tools and instruction sections of the intents
+that matched. When nothing matches, for example a follow-up such as "yes,
+go ahead", the full tool set and all sections are sent, so the agent can
+always do what it could before.
+
+Usage:
+    router = ToolRouter(BASE_INSTRUCTIONS, SECTIONS)
+    agent = ChatAgent(chat_client=client, instructions=router.base_instructions, context_providers=router)
+"""
+import re
+from collections import Counter
+
+from agent_framework import ChatMessage, Context, ContextProvider
+
+
+class ToolSection:
+    """One intent: the words that signal it, the tools it needs and the instructions for them."""
+
+    def __init__(self, name: str, pattern: str, tools: list, instructions=()):
+        self.name = name
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self.tools = tools
+        # Sections may share a piece (e.g. one note on all MCP tools); it is sent once per turn
+        pieces = [instructions] if isinstance(instructions, str) else instructions
+        self.instructions = [piece.strip() for piece in pieces if piece.strip()]
+
+
+def _text(messages) -> str:
+    if isinstance(messages, ChatMessage):
+        messages = [messages]
+    return " ".join(message.text or "" for message in messages if message.role.value == "user")
+
+
+class ToolRouter(ContextProvider):
+    """Gives each turn the tools and instruction sections its message needs, or all of them."""
+
+    def __init__(self, base_instructions: str, sections: list):
+        self.base_instructions = base_instructions.strip()
+        self.sections = sections
+        self.turns = 0
+        self.fallbacks = 0
+        self.selected = Counter()
+
+    def select(self, text: str) -> list:
+        """Sections whose pattern matches text; every section when none does.
+
+        Args:
+            text (str): The user's message
+
+        Returns:
+            list: Matching ToolSection objects, in declaration order
+        """
+        matched = [section for section in self.sections if section.pattern.search(text)]
+        return matched or self.sections
+
+    def context_for(self, sections: list) -> Context:
+        tools, instructions = [], []
+        for section in sections:
+            tools.extend(tool for tool in section.tools if tool not in tools)
+            instructions.extend(piece for piece in section.instructions if piece not in instructions)
+        return Context(instructions="\n\n".join(instructions) or None, tools=tools)
+
+    def full_instructions(self) -> str:
+        """Base instructions plus every section: what the agent sends without routing."""
+        return "\n\n".join([self.base_instructions, self.context_for(self.sections).instructions])
+
+    def all_tools(self) -> list:
+        return self.context_for(self.sections).tools
+
+    async def invoking(self, messages, **kwargs) -> Context:
+        sections = self.select(_text(messages))
+        self.turns += 1
+        if sections is self.sections:
+            self.fallbacks += 1
+        self.selected.update(section.name for section in sections)
+        return self.context_for(sections)
+
+    def stats(self) -> dict:
+        """Report how turns were routed.
+
+        Returns:
+            dict: Turns, turns that fell back to the full set, and turns per section
+        """
+        return {"turns": self.turns, "fallbacks": self.fallbacks, "sections": dict(self.selected)}
@@ -0,0 +1,129 @@
+"""Compare prompt tokens and time to first token with and without per-turn tool routing.
+
+Runs each message through the cooking agent twice, once with every tool and
+the whole instruction block (TOOL_ROUTING=off) and once routed by ToolRouter,
+against the local stub model server. The stub charges prompt tokens for the
+messages and tool schemas and, with --prefill-tokens-per-sec, takes time to
+process them before the first token, like a real model. MCP tools go to
+mcp_stub_server.py (--mcp-delay seconds per call), so no network is needed.
+Prompt tokens are summed over all model calls of a turn; time to first token
+is measured from agent.run_stream() to the first text of the reply, so for
+messages that call tools it includes the tool round trips.
+
+Usage:
+    python tool_routing_report.py --repeat 3
+    python tool_routing_report.py --prefill-tokens-per-sec 1500 --json routing.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+
+from agent_framework import UsageContent
+
+from load_test import MESSAGES, free_port, wait_until_up
+
+REPORT_MESSAGES = MESSAGES + [
+    "Does a walnut brownie contain nuts?",
+    "Please echo 'hello kitchen'",
+    "Thanks, that sounds great!",
+]
+
+
+async def run_turn(agent, message: str) -> dict:
+    start = time.perf_counter()
+    first_text = None
+    prompt_tokens = 0
+    async for update in agent.run_stream(message, thread=agent.get_new_thread()):
+        for content in update.contents:
+            if isinstance(content, UsageContent):
+                prompt_tokens += content.details.input_token_count or 0
+        if first_text is None and update.text:
+            first_text = time.perf_counter()
+    end = time.perf_counter()
+    return {
+        "prompt_tokens": prompt_tokens,
+        "ttft_ms": ((first_text or end) - start) * 1000,
+        "turn_ms": (end - start) * 1000,
+    }
+
+
+async def measure(agent, message: str, repeat: int) -> dict:
+    with contextlib.redirect_stdout(io.StringIO()):  # Tools print a LOG line per call
+        runs = [await run_turn(agent, message) for _ in range(repeat)]
+    return {key: round(statistics.median(run[key] for run in runs), 1) for key in runs[0]}
+
+
+def change(before: float, after: float) -> str:
+    return f"{(after - before) / before:+.0%}" if before else "n/a"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per message and mode (median is reported)")
+    parser.add_argument("--model-latency", type=float, default=0.2, help="stub fixed delay before the first token")
+    parser.add_argument("--prefill-tokens-per-sec", type=float, default=2000.0, help="stub prompt processing speed")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0, help="stub generation speed")
+    parser.add_argument("--mcp-delay", type=float, default=0.2, help="seconds per MCP tool call")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    port = free_port()
+    stub = subprocess.Popen(
+        [sys.executable, "stub_model_server.py", "--port", str(port), "--latency", str(args.model_latency),
+         "--tokens-per-sec", str(args.tokens_per_sec), "--prefill-tokens-per-sec", str(args.prefill_tokens_per_sec)],
+        cwd=here,
+    )
+    os.environ["MODEL_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    os.environ["MCP_SERVER_COMMAND"] = shlex.join([sys.executable, os.path.join(here, "mcp_stub_server.py"), "--delay", str(args.mcp_delay)])
+    try:
+        await wait_until_up(f"http://127.0.0.1:{port}/v1/models")
+        # Imported after MODEL_BASE_URL and MCP_SERVER_COMMAND point at the stubs
+        from agent_framework.openai import OpenAIChatClient
+        from cooking_agent import MODEL_ID, build_agent, get_openai_client, tool_router
+
+        chat_client = OpenAIChatClient(async_client=get_openai_client("stub"), model_id=MODEL_ID)
+        full, routed = build_agent(chat_client, routed=False), build_agent(chat_client, routed=True)
+
+        results = []
+        print(f"{'message':<66} {'prompt tokens':>22} {'time to first token (ms)':>28}")
+        for message in REPORT_MESSAGES:
+            before = await measure(full, message, args.repeat)
+            after = await measure(routed, message, args.repeat)
+            selected = tool_router.select(message)
+            fallback = selected is tool_router.sections
+            results.append({"message": message, "sections": "all" if fallback else [section.name for section in selected], "full": before, "routed": after})
+            print(
+                f"{message[:66]:<66} {before['prompt_tokens']:>6.0f} -> {after['prompt_tokens']:>5.0f} {change(before['prompt_tokens'], after['prompt_tokens']):>5} "
+                f"{before['ttft_ms']:>9.0f} -> {after['ttft_ms']:>6.0f} {change(before['ttft_ms'], after['ttft_ms']):>5}"
+                + ("  (fallback: full set)" if fallback else "")
+            )
+
+        totals = {
+            mode: {key: sum(result[mode][key] for result in results) for key in ("prompt_tokens", "ttft_ms")}
+            for mode in ("full", "routed")
+        }
+        print(
+            f"{'total':<66} {totals['full']['prompt_tokens']:>6.0f} -> {totals['routed']['prompt_tokens']:>5.0f} "
+            f"{change(totals['full']['prompt_tokens'], totals['routed']['prompt_tokens']):>5} "
+            f"{totals['full']['ttft_ms']:>9.0f} -> {totals['routed']['ttft_ms']:>6.0f} {change(totals['full']['ttft_ms'], totals['routed']['ttft_ms']):>5}"
+        )
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results, "totals": totals}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
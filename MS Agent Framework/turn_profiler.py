@@ -0,0 +1,146 @@
+"""Opt-in per-turn timeline profiler for the cooking ChatAgent.
+
+Each sampled agent.run() is written to its own Chrome trace JSON file (open it
+in chrome://tracing or https://ui.perfetto.dev), with nested spans for the
+turn, every model call, every tool call and every MCP round trip.
+
+Enable it with environment variables:
+    TURN_PROFILE_DIR=traces        write traces to this directory
+    TURN_PROFILE_SAMPLE=0.01       trace 1% of turns (default: all)
+
+When TURN_PROFILE_DIR is not set, no middleware is installed, and span() costs
+one context variable lookup.
+"""
+import asyncio
+import contextlib
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+import uuid
+
+from agent_framework import AgentMiddleware, ChatMiddleware, FunctionMiddleware
+
+# The trace of the turn being recorded in this context, None when not profiling
+_active_trace = contextvars.ContextVar("turn_trace", default=None)
+_NO_SPAN = contextlib.nullcontext()
+
+
+class TurnTrace:
+    """Spans of one turn as Chrome trace complete events, one track per asyncio task or thread."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.events = []
+        self._tracks = {}
+
+    def _track(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        owner = task or threading.current_thread()
+        track = self._tracks.get(id(owner))
+        if track is None:
+            track = self._tracks[id(owner)] = len(self._tracks) + 1
+            label = task.get_name() if task else owner.name
+            self.events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": track, "args": {"name": label}})
+        return track
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str, args: dict = None):
+        track, start = self._track(), time.perf_counter()
+        try:
+            yield
+        finally:
+            self.events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": round((start - self.start) * 1e6, 1),
+                "dur": round((time.perf_counter() - start) * 1e6, 1),
+                "pid": os.getpid(),
+                "tid": track,
+                "args": args or {},
+            })
+
+
+def span(name: str, category: str = "app", **args):
+    """Record a span in the turn being profiled, if any (a no-op context otherwise)."""
+    trace = _active_trace.get()
+    if trace is None:
+        return _NO_SPAN
+    return trace.span(name, category, args)
+
+
+class _TurnMiddleware(AgentMiddleware):
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    async def process(self, context, next):
+        if _active_trace.get() is not None or random.random() >= self.profiler.sample_rate:
+            await next(context)
+            return
+        trace = TurnTrace(context.agent.name or "agent")
+        token = _active_trace.set(trace)
+        try:
+            with trace.span(f"turn {trace.name}", "turn", {"messages": len(context.messages)}):
+                await next(context)
+        finally:
+            _active_trace.reset(token)
+            await self.profiler.write(trace)
+
+
+class _ModelMiddleware(ChatMiddleware):
+    async def process(self, context, next):
+        model = getattr(context.chat_client, "model_id", None) or "model"
+        # For streaming calls this covers the request only, not the consumed stream
+        with span(f"model {model}", "model", messages=len(context.messages)):
+            await next(context)
+
+
+class _ToolMiddleware(FunctionMiddleware):
+    async def process(self, context, next):
+        with span(f"tool {context.function.name}", "tool"):
+            await next(context)
+
+
+class TurnProfiler:
+    """Writes a Chrome trace per sampled turn of a ChatAgent.
+
+    Usage:
+        profiler = TurnProfiler.from_env()
+        agent = ChatAgent(..., middleware=profiler.middleware() if profiler else None)
+    """
+
+    def __init__(self, output_dir: str = "turn_traces", sample_rate: float = 1.0):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.traced = 0
+
+    @classmethod
+    def from_env(cls):
+        """Profiler configured by TURN_PROFILE_DIR and TURN_PROFILE_SAMPLE, or None when disabled."""
+        output_dir = os.getenv("TURN_PROFILE_DIR")
+        if not output_dir:
+            return None
+        return cls(output_dir=output_dir, sample_rate=float(os.getenv("TURN_PROFILE_SAMPLE", "1.0")))
+
+    def middleware(self) -> list:
+        """Agent, chat and function middleware to pass to ChatAgent(middleware=...)."""
+        return [_TurnMiddleware(self), _ModelMiddleware(), _ToolMiddleware()]
+
+    async def write(self, trace: TurnTrace) -> str:
+        self.traced += 1
+        path = os.path.join(self.output_dir, f"turn-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.json")
+        data = {"traceEvents": trace.events, "displayTimeUnit": "ms", "otherData": {"turn": trace.name}}
+        await asyncio.to_thread(self._write, path, data)
+        return path
+
+    def _write(self, path: str, data: dict):
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(data, f)